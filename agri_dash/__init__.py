@@ -0,0 +1 @@
+"""各ダッシュボードで共有するデータ層。"""
@@ -0,0 +1,11 @@
+"""ダッシュボードのグラフを組み立てる関数。
+
+各関数は読み込んだデータと画面の選択（パラメータ）だけから go.Figure を返し、Streamlit には依存しない。
+ダッシュボードのスクリプトはウィジェットの値を集めてこれらを呼び出し、結果を表示するだけにする。
+同じ引数からは同じグラフができるので、キャッシュ・静的な書き出し・ベンチマークからもそのまま呼び出せる。
+
+    rice         稲作10aあたりの経営概要・生産費・労働時間のワークブックとそのグラフ
+    prefectures  都道府県別の平均年齢と基幹的農業従事者数のグラフと地図
+    workers      基幹的農業従事者数の実測値・推定値・年齢構成のグラフと地図の値
+    vegetables   野菜取引データの推移の比較と為替・原油との相関のグラフ
+"""
@@ -0,0 +1,90 @@
+"""都道府県別の平均年齢と基幹的農業従事者数のグラフと地図。
+
+各関数は PrefectureStore（prefecture_store を参照）を受け取る。
+"""
+import plotly.graph_objects as go
+
+from agri_dash.prefecture_map import map_figure
+from agri_dash.prefecture_store import AVERAGE_AGE, CORE_AVERAGE_AGE, CORE_WORKERS
+from agri_dash.trace_packing import legend_entries, packed_bar, packed_lines, series_colors, should_pack
+
+# データセット（画面の選択肢）
+DATASETS = ['農業従事者', '基幹的農業従事者']
+
+
+def age_metric(dataset_choice):
+    """データセットの平均年齢の指標。"""
+    return AVERAGE_AGE if dataset_choice == '農業従事者' else CORE_AVERAGE_AGE
+
+
+def age_and_workers(store, dataset_choice, prefectures, by_metric=False, width=None, height=None):
+    """都道府県ごとの平均年齢の折れ線と基幹的農業従事者数の棒を重ねたグラフ。
+
+    by_metric なら平均年齢の折れ線を全て追加してから人数の棒を追加し、そうでなければ都道府県ごとに交互に追加する
+    （凡例の並び順が変わる）。都道府県が多い場合は、折れ線と棒をそれぞれ1つのトレースにまとめる。
+    """
+    metric = age_metric(dataset_choice)
+
+    fig = go.Figure()
+    pack = should_pack(2 * len(prefectures))
+    if pack:
+        colors = series_colors(prefectures)
+        fig.add_trace(packed_lines(
+            [(prefecture, *store.series(metric, prefecture), colors[prefecture]) for prefecture in prefectures],
+            yaxis="y1"
+        ))
+        fig.add_trace(packed_bar(
+            [(prefecture, *store.series(CORE_WORKERS, prefecture), colors[prefecture], 0.6)
+             for prefecture in prefectures],
+            barmode='group',
+            yaxis="y2"
+        ))
+        fig.add_traces(legend_entries(colors))
+    else:
+        lines = []
+        bars = []
+        for prefecture in prefectures:
+            years, average_age = store.series(metric, prefecture)
+            lines.append(go.Scatter(
+                x=years,
+                y=average_age,
+                mode='lines+markers',
+                name=f"{prefecture} - 平均年齢",
+                yaxis="y1",
+                hovertemplate='西暦: %{x}<br>平均年齢: %{y}歳<extra></extra>'
+            ))
+            years, workers = store.series(CORE_WORKERS, prefecture)
+            bars.append(go.Bar(
+                x=years,
+                y=workers,
+                name=f"{prefecture} - 基幹的農業従事者数",
+                yaxis="y2",
+                opacity=0.6,
+                hovertemplate='西暦: %{x}<br>従事者数: %{y}人<extra></extra>'
+            ))
+        fig.add_traces(lines + bars if by_metric else [trace for pair in zip(lines, bars) for trace in pair])
+
+    fig.update_layout(
+        title=f'{dataset_choice}の平均年齢と基幹的農業従事者数の推移',
+        xaxis_title='西暦',
+        yaxis=dict(title="平均年齢", side="left"),
+        yaxis2=dict(title="基幹的農業従事者数", overlaying="y", side="right"),
+        barmode='overlay' if pack else None,
+        hovermode='closest' if pack else 'x unified',
+        width=width,
+        height=height,
+        legend=dict(x=1.2, y=1, xanchor='left', orientation='v')
+    )
+    return fig
+
+
+def metric_map(store, metric, year, geometry=None):
+    """ある西暦の指標（平均年齢か基幹的農業従事者数）で都道府県を塗り分けた地図。"""
+    is_age = metric != CORE_WORKERS
+    return map_figure(
+        store.snapshot(metric, year),
+        f'{metric}（{year}年）',
+        '平均年齢（歳）' if is_age else '人数',
+        geometry=geometry,
+        value_format='.1f' if is_age else ',.0f'
+    )
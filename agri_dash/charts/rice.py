@@ -0,0 +1,260 @@
+"""稲作10aあたりの経営概要・生産費・労働時間のグラフ。
+
+各関数は RiceWorkbooks（rice_workbooks を参照）を受け取り、年度別推移のグラフを返す。
+SUMMARY_FIGURES と OVERVIEW_FIGURES は各ダッシュボードの項目からグラフの関数を引く表。
+"""
+import plotly.graph_objects as go
+
+# 物財費の内訳の列
+MATERIAL_COST_COMPONENTS = [
+    '物財費-種苗費（円）', '物財費-肥料費（円）', '物財費-土地改良及び水利費（円）',
+    '物財費-建物費（円）', '物財費-自動車費（円）', '物財費-農機具費（円）', '物財費-その他（円）'
+]
+
+FAMILY_LABOR_TIME = '総労働時間-直接労働時間-家族（h）'
+EMPLOYED_LABOR_TIME = '総労働時間-直接労働時間-雇用（h）'
+
+# 労働時間の内訳に含めない列（直接労働時間とその家族・雇用の内訳）
+LABOR_TIME_TOTALS = ['総労働時間-直接労働時間（h）', FAMILY_LABOR_TIME, EMPLOYED_LABOR_TIME]
+
+
+def trend(workbooks, column, title):
+    """経営概要の1つの列の折れ線グラフ。"""
+    data_main = workbooks.main
+    fig = go.Figure(data=go.Scatter(x=data_main['西暦'], y=data_main[column], mode='lines+markers'))
+    fig.update_layout(title=title, xaxis_title='西暦', yaxis_title=column, width=1000, height=600)
+    return fig
+
+
+def capital_income(workbooks):
+    """所得と粗収益（所得以外）の積み上げ棒に、資本額と所得割合の折れ線を重ねたグラフ。"""
+    data_main = workbooks.main
+    fig = go.Figure()
+
+    # 所得を積み上げ棒グラフに追加
+    fig.add_trace(go.Bar(
+        x=data_main['西暦'],
+        y=data_main['所得（円）'],
+        name='所得',
+        marker_color='red'
+    ))
+
+    # 粗収益から所得を引いた部分を追加
+    fig.add_trace(go.Bar(
+        x=data_main['西暦'],
+        y=data_main['粗収益（円）'] - data_main['所得（円）'],
+        name='粗収益 (所得以外)',
+        marker_color='blue'
+    ))
+
+    # 資本額の折れ線グラフを追加
+    fig.add_trace(go.Scatter(
+        x=data_main['西暦'],
+        y=data_main['資本額（円）'],
+        mode='lines+markers',
+        name='資本額',
+        line=dict(color='green', width=2),
+        marker=dict(size=8)
+    ))
+
+    # 所得割合を折れ線グラフに追加
+    fig.add_trace(go.Scatter(
+        x=data_main['西暦'],
+        y=data_main['所得（円）'] / data_main['粗収益（円）'],
+        mode='lines+markers',
+        name='所得割合',
+        yaxis="y2",  # 右側の軸に表示
+        line=dict(color='orange', width=2),
+        marker=dict(size=8)
+    ))
+
+    # レイアウト設定
+    fig.update_layout(
+        title='資本金＆粗収益＆所得の年度別推移',
+        xaxis_title='西暦',
+        yaxis=dict(title='金額（円）'),
+        yaxis2=dict(
+            title='割合',
+            overlaying='y',
+            side='right',
+            tickformat=".0%"
+        ),
+        barmode='stack',  # 棒グラフを積み上げ
+        width=1000,
+        height=600,
+        legend=dict(
+            title='凡例',
+            x=1.1,
+            y=1,
+            bordercolor='Black',
+            borderwidth=1
+        )
+    )
+    return fig
+
+
+def revenue_income(workbooks):
+    """所得と粗収益（所得以外）の積み上げ棒に、所得割合の折れ線を重ねたグラフ。"""
+    data_main = workbooks.main
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=data_main['西暦'], y=data_main['所得（円）'], name='所得', marker_color='red'))
+    fig.add_trace(go.Bar(x=data_main['西暦'], y=data_main['粗収益（円）'] - data_main['所得（円）'], name='粗収益 (所得以外)', marker_color='blue'))
+    fig.add_trace(go.Scatter(x=data_main['西暦'], y=data_main['所得（円）'] / data_main['粗収益（円）'], mode='lines+markers', name='所得割合', yaxis="y2", line=dict(color='orange')))
+    fig.update_layout(title='粗収益とその中の所得の年度別推移と所得割合', xaxis_title='西暦', yaxis=dict(title="金額（円）"), yaxis2=dict(title='所得割合', overlaying='y', side='right', tickformat=".2%"), barmode='stack', width=1000, height=600)
+    return fig
+
+
+def production_cost(workbooks, title='生産費（労働費＆物財費）の年度別推移'):
+    """物財費と労働費の積み上げ棒グラフ。"""
+    data_cost = workbooks.cost
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=data_cost['西暦'],
+        y=data_cost['物財費（円）'],
+        name='物財費',
+        marker_color='blue'
+    ))
+    fig.add_trace(go.Bar(
+        x=data_cost['西暦'],
+        y=data_cost['労働費（円）'],
+        name='労働費',
+        marker_color='green'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title='西暦',
+        yaxis_title='金額（円）',
+        barmode='stack',
+        width=1000,
+        height=600
+    )
+    return fig
+
+
+def material_cost_breakdown(workbooks):
+    """物財費の内訳の積み上げ棒グラフ。"""
+    data_cost = workbooks.cost
+    fig = go.Figure()
+    for component in MATERIAL_COST_COMPONENTS:
+        fig.add_trace(go.Bar(
+            x=data_cost['西暦'],
+            y=data_cost[component],
+            name=component.replace('物財費-', '').replace('（円）', '')
+        ))
+    fig.update_layout(
+        title='物財費の内訳の年度別推移',
+        xaxis_title='西暦',
+        yaxis_title='金額（円）',
+        barmode='stack',
+        width=1000,
+        height=600
+    )
+    return fig
+
+
+def labor_time_breakdown(workbooks, title='労働時間の詳細の年度別推移'):
+    """総労働時間の内訳（直接労働時間の合計と家族・雇用の内訳を除く）の積み上げ棒グラフ。"""
+    data_labor_time = workbooks.labor_time
+    fig = go.Figure()
+    labor_components = [
+        col for col in data_labor_time.columns if col.startswith('総労働時間-') and col not in LABOR_TIME_TOTALS
+    ]
+    for component in labor_components:
+        fig.add_trace(go.Bar(
+            x=data_labor_time['西暦'],
+            y=data_labor_time[component],
+            name=component.replace('総労働時間-', '').replace('（h）', '')
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis_title='西暦',
+        yaxis_title='時間（h）',
+        barmode='stack',
+        width=1000,
+        height=600
+    )
+    return fig
+
+
+def family_employed_labor_time(workbooks, shares=False):
+    """家族労働時間と雇用労働時間の積み上げ棒グラフ。shares なら吹き出しに合計に占める割合を表示する。"""
+    data_labor_time = workbooks.labor_time
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=data_labor_time['西暦'],
+        y=data_labor_time[FAMILY_LABOR_TIME],
+        name='家族労働時間',
+        marker_color='blue'
+    ))
+    fig.add_trace(go.Bar(
+        x=data_labor_time['西暦'],
+        y=data_labor_time[EMPLOYED_LABOR_TIME],
+        name='雇用労働時間',
+        marker_color='orange'
+    ))
+    if shares:
+        total_labor_time = data_labor_time[FAMILY_LABOR_TIME] + data_labor_time[EMPLOYED_LABOR_TIME]
+        for trace, column in zip(fig.data, (FAMILY_LABOR_TIME, EMPLOYED_LABOR_TIME)):
+            trace.update(
+                hovertemplate=f'西暦: %{{x}}<br>{trace.name}: %{{y}} 時間<br>割合: %{{customdata[0]:.2f}}%',
+                customdata=data_labor_time[column] / total_labor_time * 100
+            )
+    fig.update_layout(
+        title='家族労働時間と雇用労働時間の年度別推移',
+        xaxis_title='西暦',
+        yaxis_title='時間（h）',
+        barmode='stack',
+        width=1000,
+        height=600
+    )
+    return fig
+
+
+def family_members(workbooks):
+    """家族員数とその内の農業就業者数を重ねた棒グラフ。"""
+    data_main = workbooks.main
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=data_main['西暦'],
+        y=data_main['家族員数（人）'],
+        name='家族員数',
+        marker_color='blue'
+    ))
+    fig.add_trace(go.Bar(
+        x=data_main['西暦'],
+        y=data_main['農業就業者（人）'],
+        name='農業就業者数',
+        marker_color='orange'
+    ))
+    fig.update_layout(
+        title='家族員数とその内の農業就業者数',
+        xaxis_title='西暦',
+        yaxis_title='人数（人）',
+        barmode='overlay',
+        width=1000,
+        height=600
+    )
+    return fig
+
+
+# 稲作10aあたりの経営概要_dash.py の項目 → グラフを組み立てる関数（workbooks を受け取る）
+SUMMARY_FIGURES = {
+    '資本金＆粗収益＆所得': capital_income,
+    '生産費（労働費＆物財費）': production_cost,
+    '物財費の内訳': material_cost_breakdown,
+    '労働時間の詳細': labor_time_breakdown,
+    '家族労働時間と雇用労働時間': family_employed_labor_time,
+    '家族員数とその内の農業就業者数': family_members,
+}
+
+# streamlit_dash2.py の稲作の項目 → グラフを組み立てる関数（workbooks を受け取る）
+OVERVIEW_FIGURES = {
+    '資本額（円）': lambda workbooks: trend(workbooks, '資本額（円）', '資本額の推移'),
+    '家族員数（人）': lambda workbooks: trend(workbooks, '家族員数（人）', '家族員数の推移'),
+    '農業就業者（人）': lambda workbooks: trend(workbooks, '農業就業者（人）', '農業就業者の推移'),
+    '粗収益＆所得（円）': revenue_income,
+    '生産費': lambda workbooks: production_cost(workbooks, '生産費の年度別推移'),
+    '物財費の内訳': material_cost_breakdown,
+    '労働時間': lambda workbooks: labor_time_breakdown(workbooks, '労働時間の内訳の年度別推移'),
+    '家族労働時間と雇用労働時間': lambda workbooks: family_employed_labor_time(workbooks, shares=True),
+}
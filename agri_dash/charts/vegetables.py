@@ -0,0 +1,270 @@
+"""野菜取引データの推移の比較と、為替・原油との相関のグラフ。
+
+推移の比較は TradeIndex（日次、または週次・月次・年次の集計表の索引）から系列を切り出し、
+点数が max_points を超える系列は山と谷を残して間引く。間引いたかどうかも一緒に返す。
+"""
+import pandas as pd
+import plotly.graph_objects as go
+
+from agri_dash.downsample import downsample, point_budget
+from agri_dash.macro_panel import FX_COLUMN, WTI_COLUMN
+from agri_dash.rollups import MEAN_COLUMN, MEDIAN_COLUMN, WEIGHTED_COLUMN
+
+# 野菜の種類に対応する色
+COLOR_MAP = {
+    'だいこん': 'lightgray',
+    'にんじん': 'orange',
+    'はくさい': 'limegreen',
+    'キャベツ': 'mediumseagreen',
+    'ほうれんそう': 'forestgreen',
+    'ねぎ': 'cyan',
+    'ブロッコリー': 'darkolivegreen',
+    'レタス': 'springgreen',
+    'きゅうり': 'mediumaquamarine',
+    'なす': 'mediumpurple',
+    'トマト': 'tomato',
+    'ピーマン': 'lightgreen',
+    'ばれいしょ': 'saddlebrown',
+    'さといも': 'slategray',
+    'たまねぎ': 'goldenrod'
+}
+
+MACRO_LABELS = {FX_COLUMN: '為替レート (USD/JPY)', WTI_COLUMN: 'WTI原油価格'}
+
+# 集計単位と、集計表の価格の集計方法の表示名
+GRANULARITY_LABELS = {'daily': '日次', 'weekly': '週次', 'monthly': '月次', 'yearly': '年次'}
+PRICE_LABELS = {MEAN_COLUMN: '平均', MEDIAN_COLUMN: '中央値', WEIGHTED_COLUMN: '数量加重平均'}
+
+
+def period_suffix(granularity, price_column):
+    """グラフのタイトルに付ける集計単位と集計方法の説明（日次は空）。"""
+    if granularity == 'daily':
+        return ''
+    return f'（{GRANULARITY_LABELS[granularity]}、価格は{PRICE_LABELS[price_column]}・数量は合計）'
+
+# 推移のグラフの凡例（グラフの右側に置く）
+LEGEND = dict(
+    x=1.2,
+    y=1,
+    xanchor='left',
+    yanchor='top',
+    font=dict(size=10)
+)
+
+
+def item_figures(series_index, macro_panel, city, items, start_date, end_date, series_start=None,
+                 price_column='価格', period_suffix='', show_exchange_rate=True, show_wti=True, max_points=None):
+    """1都市の品目ごとの価格（為替レートとWTI原油価格を重ねる）と数量のグラフ。
+
+    (価格のグラフ, 数量のグラフ, 間引いた系列があるか) を返す。series_start は集計表の期間の開始日
+    （省略時は start_date）で、為替レートとWTI原油価格は start_date から end_date までを表示する。
+    """
+    max_points = point_budget() if max_points is None else max_points
+    series_start = start_date if series_start is None else series_start
+    fig_items = go.Figure()
+    fig_quantity = go.Figure()
+    items_downsampled = False
+
+    for item in items:
+        # 索引から (都市, 品目, 期間) の行を二分探索で切り出す
+        item_data = series_index.slice(city, item, series_start, end_date)
+        items_downsampled |= len(item_data['日付']) > max_points
+        price_x, price_y = downsample(item_data['日付'], item_data[price_column], max_points)
+        quantity_x, quantity_y = downsample(item_data['日付'], item_data['数量'], max_points)
+
+        # 価格グラフ
+        fig_items.add_trace(go.Scatter(
+            x=price_x,
+            y=price_y,
+            mode='lines',
+            name=item,
+            hovertemplate=item + ' : %{y:.2f}<extra></extra>',
+            line=dict(color=COLOR_MAP[item])
+        ))
+
+        # 数量グラフ
+        fig_quantity.add_trace(go.Scatter(
+            x=quantity_x,
+            y=quantity_y,  # 数量列に基づいてグラフを作成
+            mode='lines',
+            name=item,
+            hovertemplate=item + ' : %{y:.0f}<extra></extra>',
+            line=dict(color=COLOR_MAP[item])
+        ))
+
+    # 期間内の取引日の為替レートとWTI原油価格
+    macro_data = macro_panel.slice(start_date, end_date)
+
+    # 為替レートを表示
+    if show_exchange_rate:
+        items_downsampled |= len(macro_data['日付']) > max_points
+        exchange_x, exchange_y = downsample(macro_data['日付'], macro_data[FX_COLUMN], max_points)
+        fig_items.add_trace(go.Scatter(
+            x=exchange_x,
+            y=exchange_y,
+            mode='lines',
+            name=MACRO_LABELS[FX_COLUMN],
+            hovertemplate='USD/JPY : %{y:.2f}<extra></extra>',
+            line=dict(color='blue', dash='dash'),
+            yaxis='y2'  # 右側に為替レートのy軸を配置
+        ))
+
+    # WTI原油価格を表示
+    if show_wti:
+        items_downsampled |= len(macro_data['日付']) > max_points
+        wti_x, wti_y = downsample(macro_data['日付'], macro_data[WTI_COLUMN], max_points)
+        fig_items.add_trace(go.Scatter(
+            x=wti_x,
+            y=wti_y,
+            mode='lines',
+            name=MACRO_LABELS[WTI_COLUMN],
+            hovertemplate='WTI : %{y:.2f}<extra></extra>',
+            line=dict(color='black', dash='dot'),
+            yaxis='y3'  # さらに右側にWTI原油価格のy軸を配置
+        ))
+
+    # 価格グラフのレイアウト設定
+    fig_items.update_layout(
+        title=f'{city}の選択された野菜の価格、為替レート、WTI原油価格の推移{period_suffix}',
+        xaxis_title='日付',
+        yaxis_title='価格',
+        yaxis2=dict(
+            title=MACRO_LABELS[FX_COLUMN],
+            overlaying='y',  # y軸と重ねて表示
+            side='right',
+            showgrid=show_exchange_rate
+        ),
+        yaxis3=dict(
+            title=MACRO_LABELS[WTI_COLUMN],
+            overlaying='y',
+            side='right',
+            position=1.0,  # 右側にWTI原油価格のy軸を配置
+            showgrid=show_wti
+        ),
+        hovermode='x unified',
+        legend=LEGEND,
+        margin=dict(r=180)
+    )
+
+    # 数量グラフのレイアウト設定
+    fig_quantity.update_layout(
+        title=f'{city}の選択された野菜の取引数量の推移{period_suffix}',
+        xaxis_title='日付',
+        yaxis_title='取引数量',
+        hovermode='x unified',
+        legend=LEGEND,
+        margin=dict(r=180)
+    )
+    return fig_items, fig_quantity, items_downsampled
+
+
+def city_figures(series_index, item, cities, start_date, end_date, price_column='価格', period_suffix='',
+                 max_points=None):
+    """1品目の都市ごとの価格と数量のグラフ。(価格のグラフ, 数量のグラフ, 間引いた系列があるか) を返す。"""
+    max_points = point_budget() if max_points is None else max_points
+
+    # 都市ごとの行を索引から切り出す
+    cities_data = {city: series_index.slice(city, item, start_date, end_date) for city in cities}
+    cities_downsampled = any(len(city_data['日付']) > max_points for city_data in cities_data.values())
+
+    # 都市ごとの価格グラフと取引数量グラフ
+    fig_cities_price = go.Figure()
+    fig_cities_quantity = go.Figure()
+    for fig, column, value_format in ((fig_cities_price, price_column, '.2f'), (fig_cities_quantity, '数量', '.0f')):
+        for city in cities:
+            city_data = cities_data[city]
+            x, y = downsample(city_data['日付'], city_data[column], max_points)
+            fig.add_trace(go.Scatter(
+                x=x,
+                y=y,
+                mode='lines',
+                name=city,
+                hovertemplate=city + ' : %{y:' + value_format + '}<extra></extra>'
+            ))
+
+    # 価格グラフのレイアウト設定
+    fig_cities_price.update_layout(
+        title=f'選択された品目「{item}」の都市間価格比較{period_suffix}',
+        xaxis_title='日付',
+        yaxis_title='価格',
+        hovermode='x unified',
+        legend=LEGEND,
+        margin=dict(r=180)
+    )
+
+    # 数量グラフのレイアウト設定
+    fig_cities_quantity.update_layout(
+        title=f'選択された品目「{item}」の都市間取引数量比較{period_suffix}',
+        xaxis_title='日付',
+        yaxis_title='取引数量',
+        hovermode='x unified',
+        legend=LEGEND,
+        margin=dict(r=180)
+    )
+    return fig_cities_price, fig_cities_quantity, cities_downsampled
+
+
+def correlation_heatmap(engine, cities, items, cross, max_lag, macro_name):
+    """全ての都市×品目の時差0の相関のヒートマップ。cross は engine.cross() のマクロ系列 macro_name の配列。"""
+    heatmap = []
+    for city in cities:
+        rows = [engine.row(city, item) for item in items]
+        heatmap.append([cross[row, max_lag] if row is not None else None for row in rows])
+    fig = go.Figure(go.Heatmap(
+        z=heatmap,
+        x=items,
+        y=cities,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        hovertemplate='%{y} - %{x} : %{z:.2f}<extra></extra>'
+    ))
+    fig.update_layout(title=f'都市×品目ごとの{MACRO_LABELS[macro_name]}との相関（全期間、時差0）')
+    return fig
+
+
+def correlation_figures(engine, city, items, rolling, cross, macro_name, window, max_lag, max_points=None):
+    """1都市の品目ごとのローリング相関と時差相関のグラフ。(ローリング相関, 時差相関) を返す。
+
+    rolling と cross は engine.rolling() と engine.cross() のマクロ系列 macro_name の配列。
+    """
+    max_points = point_budget() if max_points is None else max_points
+    lags = list(range(-max_lag, max_lag + 1))
+    fig_rolling = go.Figure()
+    fig_cross = go.Figure()
+    dates = pd.DatetimeIndex(engine.dates)
+    for item in items:
+        row = engine.row(city, item)
+        if row is None:
+            continue
+        rolling_x, rolling_y = downsample(dates, rolling[row], max_points)
+        fig_rolling.add_trace(go.Scatter(
+            x=rolling_x,
+            y=rolling_y,
+            mode='lines',
+            name=item,
+            hovertemplate=item + ' : %{y:.2f}<extra></extra>',
+            line=dict(color=COLOR_MAP.get(item))
+        ))
+        fig_cross.add_trace(go.Scatter(
+            x=lags,
+            y=cross[row],
+            mode='lines+markers',
+            name=item,
+            hovertemplate=item + ' (時差 %{x}) : %{y:.2f}<extra></extra>',
+            line=dict(color=COLOR_MAP.get(item))
+        ))
+
+    fig_rolling.update_layout(
+        title=f'{city}の{MACRO_LABELS[macro_name]}とのローリング相関（窓幅{window}取引日）',
+        xaxis_title='日付',
+        yaxis=dict(title='相関係数', range=[-1, 1]),
+        hovermode='x unified'
+    )
+    fig_cross.update_layout(
+        title=f'{city}の{MACRO_LABELS[macro_name]}との時差相関（全期間）',
+        xaxis_title='時差（取引日、正の値は指標が先行）',
+        yaxis=dict(title='相関係数', range=[-1, 1]),
+        hovermode='x unified'
+    )
+    return fig_rolling, fig_cross
@@ -0,0 +1,198 @@
+"""基幹的農業従事者数の実測値・推定値・年齢構成のグラフと地図の値。
+
+各関数は WorkerCube（worker_cube を参照。推計値を入れたものを含む）と選択された都道府県を受け取る。
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+from agri_dash.prefecture_store import CORE_AVERAGE_AGE
+from agri_dash.trace_packing import legend_entries, packed_bar, should_pack
+from agri_dash.worker_cube import ACTUAL, FORECAST
+
+
+def _totals_trace(total_years, total_values):
+    # 各年の合計値をテキストで表示（棒グラフの上部）
+    return go.Scatter(
+        x=total_years,
+        y=total_values,
+        mode='text',
+        text=[f"{x:,.0f}" for x in total_values],  # 合計値の表示
+        textposition='top center',
+        showlegend=False  # 凡例に表示しない
+    )
+
+
+def actual_and_forecast(forecast_cube, prefectures, by_region_category, interval=None):
+    """実測値と推定値の積み上げ棒グラフ。
+
+    by_region_category なら地域カテゴリごと、そうでなければ都道府県ごとにまとめて色分けする。
+    interval に ForecastBands.interval() の (西暦, 下限, 上限) を渡すと予測区間を網掛けで重ねる。
+    """
+    # カラーマップ生成
+    color_map = px.colors.qualitative.Set2 if by_region_category else px.colors.qualitative.Plotly
+    groups = forecast_cube.groups(prefectures, by_region_category)
+    colors = {group: color_map[i % len(color_map)] for i, (group, _) in enumerate(groups)}
+
+    fig = go.Figure()
+
+    # 実測値を積み上げ、続けて推定値を積み上げ
+    bars = []
+    for kind in (ACTUAL, FORECAST):
+        for group, members in groups:
+            years, values = forecast_cube.total(members, kinds=[kind])
+            # 推定値は薄く表示
+            bars.append((f"{group}（{kind}）", years, values, colors[group], 0.6 if kind == FORECAST else None))
+
+    # 棒のトレースが多い場合は1つのトレースにまとめる（凡例は色の見本だけにする）
+    pack_bars = should_pack(len(bars))
+    if pack_bars:
+        fig.add_trace(packed_bar(bars))
+        fig.add_traces(legend_entries(colors))
+    else:
+        for name, years, values, color, opacity in bars:
+            fig.add_trace(go.Bar(
+                x=years,
+                y=values,
+                name=name,
+                marker_color=color,
+                marker=dict(opacity=opacity)
+            ))
+
+    fig.add_trace(_totals_trace(*forecast_cube.total(prefectures)))
+
+    # 予測区間を網掛けで追加
+    if interval is not None:
+        band_years, lower, upper = interval
+        fig.add_trace(go.Scatter(
+            x=band_years,
+            y=upper,
+            mode='lines',
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=band_years,
+            y=lower,
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',  # 上限との間を塗りつぶす
+            fillcolor='rgba(100, 100, 100, 0.25)',
+            name="90%予測区間",
+            hovertemplate='%{y:,.0f}'
+        ))
+
+    # レイアウト調整
+    fig.update_layout(
+        title="基幹的農業従事者数（実測値と推定値）",
+        xaxis=dict(title='年', tickmode='linear', dtick=5),
+        yaxis=dict(title='基幹적農業従事者数'),
+        barmode='overlay' if pack_bars else 'stack',  # 積み上げ棒グラフ（まとめた場合は棒ごとの下端で積み上げ済み）
+        width=1000,
+        height=600,
+        legend=dict(title='凡例')
+    )
+    return fig
+
+
+def workers_and_average_age(worker_cube, prefecture_store, prefectures, age_groups, region_category):
+    """年齢区分ごとの実測値の積み上げ棒グラフ。
+
+    1つの都道府県を選んだときはその都道府県、全国の地域カテゴリでは全国の平均年齢の折れ線を重ねる。
+    """
+    fig = go.Figure()
+
+    # 棒グラフ追加（年齢区分ごとの人数をラベルとして表示）
+    for age_group in age_groups:
+        years, values = worker_cube.total(prefectures, kinds=[ACTUAL], age_groups=[age_group])
+        fig.add_trace(go.Bar(
+            x=years,
+            y=values,
+            name=age_group,
+            text=values,  # ラベルに人数を表示
+            texttemplate='%{text:.0f}',  # 横表示
+            textposition='inside'
+        ))
+
+    fig.add_trace(_totals_trace(*worker_cube.total(prefectures, kinds=[ACTUAL], age_groups=age_groups)))
+
+    # 平均年齢の折れ線グラフを追加（条件付き）
+    line_region = None
+    line_label = None
+
+    if len(prefectures) == 1:  # 単一都道府県が選択された場合
+        line_region = prefectures[0]
+        line_label = f"{line_region} 平均年齢"
+    elif region_category == '全国' and prefectures:  # 全国が選択され、都道府県も選択されている場合
+        line_region = '全国'
+        line_label = "全国 平均年齢"
+
+    line_years, line_values = prefecture_store.series(CORE_AVERAGE_AGE, line_region) if line_region else ((), ())
+    if len(line_years):
+        fig.add_trace(go.Scatter(
+            x=line_years,
+            y=line_values,
+            mode='lines+markers',
+            name=line_label,
+            yaxis="y2",
+            line=dict(color='red', width=2),
+            marker=dict(size=8)
+        ))
+
+    # レイアウト調整（凡例を右側に移動）
+    fig.update_layout(
+        title="基幹的農業従事者数と平均年齢",
+        xaxis=dict(title='年', tickmode='linear', dtick=5),
+        yaxis=dict(title='基幹的農業従事者数'),
+        yaxis2=dict(
+            title='平均年齢',
+            overlaying='y',
+            side='right'
+        ),
+        barmode='stack',
+        width=1000,
+        height=600,
+        legend=dict(
+            x=1.12,  # グラフの右側にずらす
+            y=1,  # 上端に配置
+            bordercolor="Black",
+            borderwidth=1
+        )
+    )
+    return fig
+
+
+def cohort(cohort_cube, prefectures):
+    """年齢区分ごとの実測値と推定値の積み上げ棒グラフ（年齢区分ごとの色は実測値と推定値で揃える）。"""
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for kind in (ACTUAL, FORECAST):
+        for i, age_group in enumerate(cohort_cube.age_groups):
+            years, values = cohort_cube.total(prefectures, kinds=[kind], age_groups=[age_group])
+            fig.add_trace(go.Bar(
+                x=years,
+                y=values,
+                name=f"{age_group}（{kind}）",
+                legendgroup=age_group,
+                marker_color=colors[i % len(colors)],
+                marker=dict(opacity=0.6 if kind == FORECAST else None)  # 推定値は薄く表示
+            ))
+
+    fig.add_trace(_totals_trace(*cohort_cube.total(prefectures, age_groups=cohort_cube.age_groups)))
+
+    fig.update_layout(
+        title="年齢構成の将来推計（コーホート変化率法）",
+        xaxis=dict(title='年', tickmode='linear', dtick=5),
+        yaxis=dict(title='基幹的農業従事者数'),
+        barmode='stack',
+        width=1000,
+        height=600,
+        legend=dict(title='凡例')
+    )
+    return fig
+
+
+def decline_rate(worker_cube, forecast_cube, year):
+    """実測の最終年から year までの都道府県ごとの推計減少率（%）。"""
+    base = worker_cube.by_prefecture(worker_cube.history()[0][-1], kinds=[ACTUAL])
+    return (1 - forecast_cube.by_prefecture(year, kinds=[FORECAST]) / base.where(base > 0)) * 100
@@ -0,0 +1,145 @@
+"""コーホート変化率法による年齢構成の推計。
+
+5年ごとに、各年齢区分の人は次の区分へ移る。区分の幅は 15~19 が5歳、20代〜60代が10歳で、70歳以上は上限がない。
+5年後にある区分に入る人の元になる人数（元の人数）は、5年前の前の区分の上側5歳分と、同じ区分の下側（幅-5歳）分とし、
+区分の中では年齢が一様に分布していると仮定する。最初の区分（15~19）だけは5年前の同じ区分の人数を元とする。
+これを区分×区分の行列 SHIFT で表すと、元の人数 = 人数 @ SHIFT.T となる。
+
+区分ごとの変化率（5年後の人数 / 元の人数）は、新規就農・離農・移動をまとめて表す。
+過去の変化率を都道府県×年齢区分ごとに推定し、それを5年ごとに繰り返し掛けて将来の人数を求める。
+計算は全ての都道府県・年齢区分をまとめた行列演算で行う。
+"""
+import numpy as np
+
+# 年齢区分と幅（歳）。None は上限のない区分
+AGE_BANDS = ['15~19', '20代', '30代', '40代', '50代', '60代', '70歳以上']
+BAND_WIDTHS = [5, 10, 10, 10, 10, 10, None]
+STEP_YEARS = 5
+
+# 若年層（15~19, 20代, 30代）の区分の数
+YOUNG_BANDS = 3
+
+# 試算の条件の既定値（ダッシュボードのスライダーの初期値と、書き出すビューの条件）
+DEFAULT_CONDITIONS = dict(young_entry=1.0, elderly_exit=1.0, window=5)
+
+
+def shift_matrix(widths=BAND_WIDTHS, step=STEP_YEARS):
+    """SHIFT[b, a]: 5年前の区分 a の人数のうち、区分 b の元の人数に数える割合。"""
+    n = len(widths)
+    shift = np.zeros((n, n))
+    shift[0, 0] = 1.0
+    for band in range(1, n):
+        shift[band, band - 1] = step / widths[band - 1]
+        shift[band, band] = 1.0 if widths[band] is None else (widths[band] - step) / widths[band]
+    return shift
+
+
+SHIFT = shift_matrix()
+
+
+def _transitions(counts, present, window=None):
+    """5年間ごとの (元の人数, 5年後の人数, 有効か) を [都道府県, 期間, 区分] で返す。直近 window 回に絞る。"""
+    sources = counts[:, :-1] @ SHIFT.T
+    targets = counts[:, 1:]
+    valid = present[:, 1:] & (present[:, :-1] @ SHIFT.T.astype(bool))
+    if window is not None:
+        sources, targets, valid = sources[:, -window:], targets[:, -window:], valid[:, -window:]
+    return np.where(valid, sources, 0.0), np.where(valid, targets, 0.0), valid
+
+
+def _ratio(targets, sources):
+    return np.divide(targets, sources, out=np.zeros_like(sources), where=sources > 0)
+
+
+def change_ratios(counts, present, window=None):
+    """過去の変化率を推定する。
+
+    counts と present は [都道府県, 西暦, 区分]。直近 window 回（None なら全て）の5年間の
+    5年後の人数の合計 / 元の人数の合計 を [都道府県, 区分] で返す。元の人数が0の区分は0とする。
+    """
+    sources, targets, _ = _transitions(counts, present, window)
+    return _ratio(targets.sum(axis=1), sources.sum(axis=1))
+
+
+def period_ratios(counts, present, window=None):
+    """5年間ごとの変化率 [都道府県, 期間, 区分]。元の人数がない期間は全期間の変化率で埋める。"""
+    sources, targets, valid = _transitions(counts, present, window)
+    pooled = _ratio(targets.sum(axis=1), sources.sum(axis=1))
+    return np.where(valid & (sources > 0), _ratio(targets, sources), pooled[:, None])
+
+
+def adjust_exit(ratios, elderly_exit):
+    """70歳以上の区分の減少分（離農）を elderly_exit 倍した変化率を返す。"""
+    ratios = ratios.copy()
+    ratios[..., -1] = np.maximum(1.0 - (1.0 - ratios[..., -1]) * elderly_exit, 0.0)
+    return ratios
+
+
+def advance(current, entrants, ratios, young_entry=1.0):
+    """5年進めた (人数, 新規就農者の傾向値) を返す。人数は [..., 都道府県, 区分]。
+
+    変化率は定着（1以下の部分）と純流入（1を超える部分）に分け、若年層の純流入と
+    15~19 の人数（過去の傾向で推移させた新規就農者）だけを young_entry 倍する。
+    倍率は毎回の流入に掛かるので、推計が進んでも複利的には膨らまない。
+    """
+    retention = np.minimum(ratios, 1.0)
+    entry = ratios - retention
+    entry[..., :YOUNG_BANDS] *= young_entry
+    current = (retention + entry) * (current @ SHIFT.T)
+    entrants = entrants * ratios[..., 0]
+    current[..., 0] = entrants * young_entry
+    return current, entrants
+
+
+def simulate(latest, ratios, steps, young_entry=1.0):
+    """最新の人数 [都道府県, 区分] から steps 回（5年ごと）推計し、[steps, 都道府県, 区分] を返す。"""
+    projection = np.empty((steps,) + latest.shape)
+    current, entrants = latest, latest[:, 0]
+    for step in range(steps):
+        current, entrants = advance(current, entrants, ratios, young_entry)
+        projection[step] = current
+    return projection
+
+
+def _steps(years, targets):
+    """推計の最終年までの回数と、各推計年に当たる回の番号。"""
+    index = np.round((np.asarray(targets) - years[-1]) / STEP_YEARS).astype(int) - 1
+    return (int(index[-1]) + 1 if len(index) else 0), index
+
+
+def cohort_forecast(years, values, present, targets, window=None, young_entry=1.0, elderly_exit=1.0):
+    """コーホート変化率法での推計。values と present は [年齢区分, 都道府県, 西暦]（AGE_BANDS の順）。
+
+    young_entry は若年層（15〜39歳）の新規就農（純流入）の倍率、
+    elderly_exit は70歳以上の区分の減少分（離農）の倍率。
+    """
+    if len(values) != len(AGE_BANDS):
+        raise ValueError('コーホート変化率法には年齢区分ごとの人数が必要です')
+    counts = np.moveaxis(values, 0, -1)
+    ratios = adjust_exit(change_ratios(counts, np.moveaxis(present, 0, -1), window), elderly_exit)
+    steps, index = _steps(years, targets)
+    projection = simulate(counts[:, -1], ratios, steps, young_entry)
+    # 推計年に当たる段だけを [年齢区分, 都道府県, 推計年] で返す
+    return np.moveaxis(projection[index], 0, -1).transpose(1, 0, 2)
+
+
+def cohort_draws(rng, draws, years, values, present, targets, window=None, young_entry=1.0, elderly_exit=1.0):
+    """各回の変化率を過去の5年間の変化率から都道府県ごとに無作為に選んで draws 回推計する。
+
+    [試行, 年齢区分, 都道府県, 推計年] を返す。全試行をまとめた [試行, 都道府県, 区分] の配列で進める。
+    """
+    counts = np.moveaxis(values, 0, -1)
+    periods = adjust_exit(period_ratios(counts, np.moveaxis(present, 0, -1), window), elderly_exit)
+    prefectures, period_count, _ = periods.shape
+    steps, index = _steps(years, targets)
+
+    latest = np.broadcast_to(counts[:, -1], (draws,) + counts[:, -1].shape)
+    current, entrants = latest, latest[..., 0]
+    projection = np.empty((steps,) + latest.shape)
+    rows = np.arange(prefectures)
+    for step in range(steps):
+        chosen = rng.integers(period_count, size=(draws, prefectures))
+        current, entrants = advance(current, entrants, periods[rows, chosen], young_entry)
+        projection[step] = current
+    # [推計年, 試行, 都道府県, 区分] → [試行, 区分, 都道府県, 推計年]
+    return projection[index].transpose(1, 3, 2, 0)
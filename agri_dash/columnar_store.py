@@ -0,0 +1,146 @@
+"""追記型の列指向ストア。
+
+1つのデータソースにつき1つのディレクトリを使い、マニフェスト（manifest.json）と
+Feather（Arrow IPC）形式のパーツファイルを置く。追記は新しいパーツを書き足して
+マニフェストのバージョンを上げるだけで、既存のパーツには手を触れない。
+パーツは非圧縮で書き出し、読み込み時はメモリマップする。
+"""
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# ストア形式のバージョン（レイアウトや列の型を変えたときに上げる）
+STORE_FORMAT = 2
+
+MANIFEST_NAME = 'manifest.json'
+
+# パーツがこれより増えたら1つにまとめ直す
+MAX_PARTS = 64
+
+# マニフェストのうちストアが管理する項目
+MANAGED_KEYS = ('format', 'version', 'parts', 'rows', 'dtypes')
+
+
+def file_signature(path):
+    """ファイルの更新時刻（ns）とサイズを返す。"""
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def is_unchanged(signature, manifest):
+    """元ファイルがマニフェストに記録した時点から変わっていないか。"""
+    return signature['size'] == manifest.get('size') and signature['mtime_ns'] == manifest.get('mtime_ns')
+
+
+def read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    # 書き込み途中のファイルを読まれないよう、一時ファイル経由で置き換える
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def to_table(df, schema=None):
+    """DataFrame を Arrow の表に変換する。schema を渡した場合はその型に揃える。"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is None:
+        # カテゴリ列の符号の幅をパーツ間で揃えておく
+        schema = pa.schema([
+            pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+            if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ])
+    return table.select(schema.names).cast(schema)
+
+
+class ColumnarStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+
+    def manifest(self):
+        manifest = read_json(self.manifest_path)
+        if not manifest or manifest.get('format') != STORE_FORMAT:
+            return None
+        return manifest
+
+    @property
+    def version(self):
+        manifest = self.manifest()
+        return manifest['version'] if manifest else 0
+
+    def _part_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write_part(self, table, version):
+        name = f'part-{version:06d}.feather'
+        tmp_path = self._part_path(name) + '.tmp'
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, self._part_path(name))
+        return name
+
+    def read_table(self, manifest=None):
+        manifest = manifest or self.manifest()
+        tables = [feather.read_table(self._part_path(name), memory_map=True) for name in manifest['parts']]
+        return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+    def read(self, manifest=None):
+        """全パーツを1つの DataFrame として読み込む。"""
+        return self.read_table(manifest).to_pandas(split_blocks=True)
+
+    def replace(self, df, **meta):
+        """ストアの中身を df で置き換える。"""
+        os.makedirs(self.directory, exist_ok=True)
+        previous = read_json(self.manifest_path) or {}
+        version = previous.get('version', 0) + 1
+        part = self._write_part(to_table(df), version)
+        write_json(self.manifest_path, {
+            **meta,
+            'format': STORE_FORMAT,
+            'version': version,
+            'parts': [part],
+            'rows': len(df),
+            'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()},
+        })
+        for name in previous.get('parts', []):
+            if name != part and os.path.exists(self._part_path(name)):
+                os.remove(self._part_path(name))
+        return version
+
+    def append(self, df, **meta):
+        """df を新しいパーツとして追記する。列の型は既存のパーツに揃える。"""
+        manifest = self.manifest()
+        schema = feather.read_table(self._part_path(manifest['parts'][0]), memory_map=True).schema
+        version = manifest['version'] + 1
+        part = self._write_part(to_table(df, schema), version)
+        manifest.update(meta)
+        manifest['version'] = version
+        manifest['parts'].append(part)
+        manifest['rows'] += len(df)
+        write_json(self.manifest_path, manifest)
+
+        if len(manifest['parts']) > MAX_PARTS:
+            self.compact()
+        return self.version
+
+    def update(self, **meta):
+        """データはそのままでマニフェストの付帯情報だけを更新する。"""
+        manifest = self.manifest()
+        manifest.update(meta)
+        write_json(self.manifest_path, manifest)
+
+    def compact(self):
+        """全パーツを1つにまとめ直す。"""
+        manifest = self.manifest()
+        meta = {key: value for key, value in manifest.items() if key not in MANAGED_KEYS}
+        return self.replace(self.read(manifest), **meta)
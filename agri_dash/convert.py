@@ -0,0 +1,31 @@
+"""Excel ワークブックを Feather のストアに変換するコマンド。
+
+data/ 以下と直下の .xlsx/.xls（または指定したファイル）をシートごとに変換し、マニフェストを更新する。
+内容が変わっていないファイルは変換し直さない。変換後のダッシュボードは Excel を読まずに起動する。
+変換できなかったファイルがあれば、残りを変換してから終了コード 1 で終わる。
+
+    python -m agri_dash.convert [ファイル ...] [--force]
+"""
+import argparse
+import json
+import sys
+
+from agri_dash import workbook_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Excel ワークブックを Feather のストアに変換します。')
+    parser.add_argument('paths', nargs='*', help='変換するワークブック（省略時は data/ 以下と直下の全て）')
+    parser.add_argument('--cache-dir', default=workbook_store.DEFAULT_CACHE_DIR, help='ストアの保存先')
+    parser.add_argument('--force', action='store_true', help='変わっていないファイルも変換し直す')
+    args = parser.parse_args(argv)
+
+    summaries = workbook_store.convert_all(args.paths or None, args.cache_dir, args.force)
+    for summary in summaries:
+        print(json.dumps(summary, ensure_ascii=False))
+    if any(summary['status'] == 'error' for summary in summaries):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""野菜価格と為替レート・WTI 原油価格の相関分析。
+
+全ての (都市, 品目) の価格を取引日を列とする1つの行列に並べ、
+ローリング相関と時差相関（クロス相関）を全系列まとめて NumPy で計算する。
+窓の和は累積和の差で求めるため、系列数や窓幅によらず計算量は O(系列数 × 日数) になる。
+
+スピアマン相関は、各系列を期間全体で一度だけ順位に変換してからピアソン相関を計算する。
+窓ごとに順位を付け直さないため、ローリングのスピアマン相関は近似値になる。
+"""
+import numpy as np
+import pandas as pd
+
+from agri_dash.macro_panel import FX_COLUMN, WTI_COLUMN
+
+MACRO_COLUMNS = (FX_COLUMN, WTI_COLUMN)
+METHODS = ('pearson', 'spearman')
+
+
+def _window_sums(a, window):
+    """最後の軸に沿った長さ window の移動和（先頭の窓は途中までの和）。"""
+    zeros = np.zeros(a.shape[:-1] + (1,))
+    cumulative = np.concatenate([zeros, np.cumsum(a, axis=-1)], axis=-1)
+    stop = np.arange(1, a.shape[-1] + 1)
+    start = np.maximum(stop - window, 0)
+    return cumulative[..., stop] - cumulative[..., start]
+
+
+def _pearson(x, m, reduce, min_periods):
+    """x（系列×日）と m（日）の相関。reduce は日方向の和（移動和または全体の和）。"""
+    valid = ~np.isnan(x) & ~np.isnan(m)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 桁落ちを避けるため、系列ごとの平均を引いてから和を取る
+        x = x - np.nanmean(x, axis=-1, keepdims=True)
+        m = m - np.nanmean(m)
+        x0 = np.where(valid, x, 0.0)
+        m0 = np.where(valid, m, 0.0)
+
+        n = reduce(valid.astype('float64'))
+        sx, sm = reduce(x0), reduce(m0)
+        covariance = reduce(x0 * m0) - sx * sm / n
+        x_variance = reduce(x0 * x0) - sx * sx / n
+        m_variance = reduce(m0 * m0) - sm * sm / n
+        r = covariance / np.sqrt(x_variance * m_variance)
+
+    r[~(n >= min_periods)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def _lagged(m, max_lag):
+    """列 j に m を (j - max_lag) 日だけ後ろにずらした値を並べた (日 × 時差) の行列。"""
+    padding = np.full(max_lag, np.nan)
+    padded = np.concatenate([padding, m, padding])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, len(m))
+    return windows[::-1].T
+
+
+def _lagged_pearson(x, m, max_lag, min_periods, lo=0, hi=None):
+    """x（系列×日）と、時差 -max_lag..max_lag でずらした m との相関（系列×時差）。
+
+    取引日の範囲 [lo, hi) で相関を取る。ずらした m には範囲外の値も使う。
+    有効な組のマスクは x の有効マスクと m の有効マスクの積に分解できるので、
+    全系列・全時差の和は (系列×日) と (日×時差) の行列積でまとめて求まる。
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = x[:, lo:hi]
+        x = x - np.nanmean(x, axis=-1, keepdims=True)
+        lagged = _lagged(m, max_lag)[lo:hi]
+        lagged = lagged - np.nanmean(m[lo:hi])
+        x_valid = (~np.isnan(x)).astype('float64')
+        m_valid = (~np.isnan(lagged)).astype('float64')
+        x0 = np.nan_to_num(x)
+        m0 = np.nan_to_num(lagged)
+
+        n = x_valid @ m_valid
+        sx, sm = x0 @ m_valid, x_valid @ m0
+        covariance = x0 @ m0 - sx * sm / n
+        x_variance = (x0 * x0) @ m_valid - sx * sx / n
+        m_variance = x_valid @ (m0 * m0) - sm * sm / n
+        r = covariance / np.sqrt(x_variance * m_variance)
+
+    r[~(n >= min_periods)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def _to_returns(a):
+    """対数変化率。前の取引日に値がない日は NaN。"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        logs = np.log(np.where(a > 0, a, np.nan))
+    returns = np.full_like(logs, np.nan)
+    returns[..., 1:] = np.diff(logs, axis=-1)
+    return returns
+
+
+def _to_ranks(a):
+    """最後の軸に沿った順位（NaN は NaN のまま、同順位は平均）。"""
+    if a.ndim == 1:
+        return pd.Series(a).rank().to_numpy()
+    return pd.DataFrame(a.T).rank().to_numpy().T
+
+
+class CorrelationEngine:
+    """全 (都市, 品目) の価格と為替・原油の相関をまとめて計算する。
+
+    結果はパラメータごとにインスタンス内の辞書で保持し、インスタンスと一緒に捨てる。データが変わったら作り直すこと。
+    """
+
+    def __init__(self, trade_index, macro_panel, value_column='価格'):
+        self.dates = macro_panel.dates
+        self.keys = list(trade_index.offsets)
+        self.position = {key: i for i, key in enumerate(self.keys)}
+
+        # (都市, 品目) を行、取引日を列とする価格行列。取引のない日は NaN
+        spans = np.array(list(trade_index.offsets.values()), dtype=np.int64).reshape(-1, 2)
+        rows = np.repeat(np.arange(len(self.keys)), spans[:, 1] - spans[:, 0])
+        columns = np.searchsorted(self.dates, trade_index.dates)
+        self.prices = np.full((len(self.keys), len(self.dates)), np.nan)
+        self.prices[rows, columns] = trade_index.values[value_column]
+        self.macro = {name: macro_panel.values[name].astype('float64') for name in MACRO_COLUMNS}
+        self._results = {}
+
+    def _memo(self, key, compute):
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+    def _inputs(self, method, use_returns):
+        def compute():
+            prices = _to_returns(self.prices) if use_returns else self.prices
+            macro = {name: _to_returns(values) if use_returns else values for name, values in self.macro.items()}
+            if method == 'spearman':
+                prices = _to_ranks(prices)
+                macro = {name: _to_ranks(values) for name, values in macro.items()}
+            return prices, macro
+
+        return self._memo(('inputs', method, use_returns), compute)
+
+    def rolling(self, method='pearson', window=60, min_periods=None, use_returns=True):
+        """ローリング相関。マクロ系列名 → (系列 × 取引日) の配列。"""
+        def compute():
+            prices, macro = self._inputs(method, use_returns)
+            reduce = lambda a: _window_sums(a, window)
+            return {name: _pearson(prices, values, reduce, min_periods) for name, values in macro.items()}
+
+        min_periods = window // 2 if min_periods is None else min_periods
+        return self._memo(('rolling', method, window, min_periods, use_returns), compute)
+
+    def cross(self, method='pearson', max_lag=20, lo=0, hi=None, use_returns=True, min_periods=20):
+        """時差相関。マクロ系列名 → (系列 × 時差 -max_lag..max_lag) の配列。
+
+        時差 k は k 取引日前のマクロ系列との相関（k > 0 ならマクロ系列が先行）。
+        lo, hi で相関を取る取引日の範囲 [lo, hi) を指定する。
+        """
+        def compute():
+            prices, macro = self._inputs(method, use_returns)
+            return {name: _lagged_pearson(prices, values, max_lag, min_periods, lo, hi)
+                    for name, values in macro.items()}
+
+        return self._memo(('cross', method, max_lag, lo, hi, use_returns, min_periods), compute)
+
+    def row(self, city, item):
+        return self.position.get((city, item))
@@ -0,0 +1,237 @@
+"""ダッシュボード共通のデータ読み込み。
+
+読み込んだ DataFrame はサーバープロセス内で1つだけ保持し、全セッション・全再実行で共有する。
+Excel はファイルパスと更新時刻で、取引データ・為替・原油は列指向ストアのバージョンでエントリを管理し、
+データが更新されていれば古いエントリを破棄して読み直す。
+返す DataFrame は共有オブジェクトなので、呼び出し側で直接変更しないこと。
+Excel は python -m agri_dash.convert で変換済みなら Feather のストアから読む（workbook_store を参照）。
+"""
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from agri_dash import market_store, rice_workbooks, rollups, trade_store, workbook_store
+from agri_dash.correlation import CorrelationEngine
+from agri_dash.figure_cache import FigureCache
+from agri_dash.forecast import DEFAULT_HORIZON, run_forecast
+from agri_dash.macro_panel import MacroPanel
+from agri_dash.prefecture_map import GEOJSON_PATH, load_geometry
+from agri_dash.prefecture_store import SOURCE_FILES, PrefectureStore
+from agri_dash.trade_index import TradeIndex
+from agri_dash.uncertainty import DEFAULT_DRAWS, ForecastBands
+from agri_dash.worker_cube import WorkerCube
+
+
+class FrameCache:
+    """キーごとに (データのバージョン, DataFrame) を保持するプロセス共通のキャッシュ。"""
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key, version, load):
+        # 同じファイルを複数のセッションが同時に読み込まないよう、キー単位でロックする
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            frame = load()
+            self._entries[key] = (version, frame)
+            return frame
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def frame_cache():
+    return FrameCache()
+
+
+@st.cache_resource(show_spinner=False)
+def figure_cache():
+    return FigureCache()
+
+
+@st.cache_resource(show_spinner=False)
+def forecast_cache():
+    # 推計はスライダーの値の組ごとにできるため、件数に上限のある LRU で保持する
+    return FigureCache(maxsize=32)
+
+
+def cached_figure(key, paths, build):
+    """画面の選択状態 key と、グラフの元になるファイル群の更新時刻をキーに Figure を返す。"""
+    return figure_cache().get(tuple(key) + (data_version(*paths),), build)
+
+
+def file_mtime(path):
+    return os.stat(path).st_mtime_ns
+
+
+def data_version(*paths):
+    """ファイル群の更新時刻のタプル。派生データのキャッシュキーに使う。"""
+    return tuple(file_mtime(path) for path in paths)
+
+
+def _cached(path, options, load):
+    key = (os.path.abspath(path),) + options
+    return frame_cache().get(key, file_mtime(path), load)
+
+
+def read_excel(path, index_col=None, numeric_columns=()):
+    """Excel を読み込む。numeric_columns は数値型に変換し、index_col をインデックスにする。"""
+    numeric_columns = tuple(numeric_columns)
+
+    def load():
+        df = workbook_store.read_excel(path)
+        for column in numeric_columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        if index_col is not None:
+            df = df.set_index(index_col)
+        return df
+
+    return _cached(path, ('excel', index_col, numeric_columns), load)
+
+
+def read_rice_workbook(name, paths=rice_workbooks.SOURCE_FILES):
+    """稲作のワークブックを1つ読み込む（グラフに使う金額の列は数値型に変換する）。"""
+    path = paths[name]
+    return _cached(path, ('rice_workbook', name),
+                   lambda: rice_workbooks.read_workbook(path, rice_workbooks.NUMERIC_COLUMNS[name]))
+
+
+def load_rice_workbooks(paths=rice_workbooks.SOURCE_FILES):
+    """稲作の経営概要・生産費・労働時間のワークブックの登録簿を返す。
+
+    各ワークブックはグラフが初めて参照したときに読み込み、以降は全セッションで共有する（ファイルが変われば読み直す）。
+    """
+    return rice_workbooks.RiceWorkbooks(lambda name: read_rice_workbook(name, paths))
+
+
+def load_prefecture_store(paths=SOURCE_FILES):
+    """都道府県別のワークブックをまとめた縦持ちの表を返す。いずれかのファイルが変われば作り直す。"""
+    key = ('prefecture_store',) + tuple((metric, os.path.abspath(path)) for metric, path in paths.items())
+    return frame_cache().get(key, data_version(*paths.values()), lambda: PrefectureStore.from_excel(paths))
+
+
+def load_worker_cube(paths=SOURCE_FILES):
+    """基幹的農業従事者数の集計キューブを返す。元ファイルが変わるまで作り直さない。"""
+    key = ('worker_cube',) + tuple((metric, os.path.abspath(path)) for metric, path in paths.items())
+    return frame_cache().get(key, data_version(*paths.values()), lambda: WorkerCube(load_prefecture_store(paths)))
+
+
+def load_prefecture_geometry(path=GEOJSON_PATH):
+    """地図用に間引いた都道府県境界を返す。GeoJSON がなければ None（タイル地図で表示する）。"""
+    version = data_version(path) if os.path.exists(path) else None
+    return frame_cache().get(('prefecture_geometry', os.path.abspath(path)), version, lambda: load_geometry(path))
+
+
+def load_worker_forecast(model, horizon=DEFAULT_HORIZON, by_age=False, paths=SOURCE_FILES, **params):
+    """推計値を入れた集計キューブを返す。モデル・最終年・推計の単位・パラメータの組ごとに LRU で保持する。
+
+    by_age なら都道府県×年齢区分ごと、そうでなければ都道府県ごとの合計を推計する。
+    """
+    def load():
+        cube = load_worker_cube(paths)
+        years, values = run_forecast(model, *cube.history(by_age), horizon=horizon, **params)
+        return cube.with_forecast(years, values)
+
+    key = ((model, horizon, by_age, tuple(sorted(params.items())))
+           + tuple((metric, os.path.abspath(path)) for metric, path in paths.items())
+           + (data_version(*paths.values()),))
+    return forecast_cache().get(key, load)
+
+
+def load_worker_bands(model, horizon=DEFAULT_HORIZON, by_age=False, draws=DEFAULT_DRAWS, workers=None,
+                      paths=SOURCE_FILES, **params):
+    """推計のブートストラップ試行（ForecastBands）を返す。推計値と同じ条件の組ごとに LRU で保持する。
+
+    workers を2以上にすると試行をプロセスプールで分割して計算する。
+    """
+    def load():
+        return ForecastBands.from_cube(load_worker_cube(paths), model, horizon, by_age,
+                                       draws=draws, workers=workers, **params)
+
+    key = (('bands', model, horizon, by_age, draws, tuple(sorted(params.items())))
+           + tuple((metric, os.path.abspath(path)) for metric, path in paths.items())
+           + (data_version(*paths.values()),))
+    return forecast_cache().get(key, load)
+
+
+def trade_version(path):
+    """取引データのストアを CSV に追いつかせ、そのバージョンを返す。
+
+    新しい行が追記されていれば、その分だけがストアに取り込まれてバージョンが上がる。
+    """
+    return trade_store.sync_trade_store(path).version
+
+
+def load_trade_data(path):
+    """野菜取引データを読み込む（列指向ストア経由）。"""
+    store = trade_store.sync_trade_store(path)
+    return frame_cache().get((os.path.abspath(path), 'trades'), store.version, store.read)
+
+
+def load_trade_index(path):
+    """野菜取引データの (都市名, 品目名, 日付) 索引を返す。"""
+    return frame_cache().get((os.path.abspath(path), 'trade_index'), trade_version(path),
+                             lambda: TradeIndex(load_trade_data(path)))
+
+
+def load_rollup_index(path, granularity):
+    """週次・月次・年次の集計表の索引を返す。取引データに行が追記されていれば、その期間だけ集計し直す。"""
+    def load():
+        rollups.sync_rollup(path, granularity, trades=load_trade_data(path))
+        return TradeIndex(rollups.store_for(path, granularity).read(), value_columns=rollups.VALUE_COLUMNS)
+
+    return frame_cache().get((os.path.abspath(path), 'rollup', granularity), trade_version(path), load)
+
+
+def read_market(path):
+    """為替レート・原油価格の CSV を、日付の昇順に並んだ「日付」「終値」の表として読み込む（列指向ストア経由）。"""
+    store = market_store.sync_market_store(path)
+    return frame_cache().get((os.path.abspath(path), 'market'), store.version, store.read)
+
+
+def read_exchange_rates(path):
+    """為替レート（USD/JPY）の日付と終値を読み込む。"""
+    return read_market(path)
+
+
+def read_wti(path):
+    """WTI 原油価格の日付と終値を読み込む。"""
+    return read_market(path)
+
+
+def macro_version(trade_path, exchange_path, wti_path):
+    return (trade_version(trade_path),
+            market_store.sync_market_store(exchange_path).version,
+            market_store.sync_market_store(wti_path).version)
+
+
+def load_macro_panel(trade_path, exchange_path, wti_path):
+    """取引日に為替レートと WTI を as-of 結合した表を返す。3つのデータのいずれかが変われば作り直す。"""
+    def load():
+        trade_index = load_trade_index(trade_path)
+        return MacroPanel(trade_index.dates, read_exchange_rates(exchange_path), read_wti(wti_path))
+
+    key = (os.path.abspath(trade_path), os.path.abspath(exchange_path), os.path.abspath(wti_path), 'macro_panel')
+    return frame_cache().get(key, macro_version(trade_path, exchange_path, wti_path), load)
+
+
+def load_correlation_engine(trade_path, exchange_path, wti_path):
+    """価格と為替・原油の相関エンジンを返す。計算結果はエンジンごとに保持される。"""
+    def load():
+        return CorrelationEngine(load_trade_index(trade_path),
+                                 load_macro_panel(trade_path, exchange_path, wti_path))
+
+    key = (os.path.abspath(trade_path), os.path.abspath(exchange_path), os.path.abspath(wti_path), 'correlation')
+    return frame_cache().get(key, macro_version(trade_path, exchange_path, wti_path), load)
@@ -0,0 +1,44 @@
+"""長い時系列の間引き（min/max バケット法）。
+
+系列を等幅のバケットに分け、各バケットの最小値と最大値の点だけを残す。
+山と谷を保ったまま、点数をグラフの横幅（ピクセル）に見合う数まで減らす。
+"""
+import numpy as np
+
+# st.plotly_chart で幅を指定しない場合の Plotly の既定の横幅
+DEFAULT_CHART_WIDTH = 700
+
+
+def point_budget(width=DEFAULT_CHART_WIDTH, points_per_pixel=2):
+    """横幅 width ピクセルのグラフに送る1系列あたりの点数。"""
+    return int(width * points_per_pixel)
+
+
+def minmax_indices(y, n_buckets):
+    """各バケットの最小値・最大値の位置を昇順で返す。先頭と末尾の点は常に含める。"""
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    bucket_size = -(-n // n_buckets)
+    n_buckets = -(-n // bucket_size)
+
+    # 端数を埋めてバケット×点の2次元配列にし、バケットごとの最小・最大を一度に求める
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+    missing = np.isnan(buckets)
+    offsets = np.arange(n_buckets) * bucket_size
+    argmin = np.where(missing, np.inf, buckets).argmin(axis=1) + offsets
+    argmax = np.where(missing, -np.inf, buckets).argmax(axis=1) + offsets
+
+    indices = np.unique(np.concatenate(([0, n - 1], argmin, argmax)))
+    return indices[indices < n]
+
+
+def downsample(x, y, max_points):
+    """(x, y) を max_points（2以上）点以下に間引く。点数が収まっていればそのまま返す。"""
+    if len(y) <= max_points:
+        return x, y
+    # 先頭と末尾の2点と、バケットごとの最小・最大の2点を残す（4点に満たない上限では先頭と末尾だけ）
+    n_buckets = max_points // 2 - 1
+    indices = minmax_indices(y, n_buckets) if n_buckets > 0 else np.array([0, len(y) - 1])
+    return x.take(indices), y.take(indices)
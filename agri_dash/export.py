@@ -0,0 +1,31 @@
+"""ダッシュボードのよく見られる表示を静的な HTML と JSON に書き出すコマンド。
+
+各ダッシュボードの代表的なウィジェットの状態ごとに、ダッシュボードと同じグラフの関数で図を組み立てて
+書き出す（page_export を参照）。書き出したファイルは Python なしでファイルサーバーや CDN から配信できる。
+失敗したビューがあれば、残りを書き出してから終了コード 1 で終わる。
+
+    python -m agri_dash.export [--out ./export] [--dashboard rice ...]
+"""
+import argparse
+import json
+
+from agri_dash import page_export
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ダッシュボードの表示を静的な HTML と JSON に書き出します。')
+    parser.add_argument('--out', default=page_export.DEFAULT_OUT, help='書き出し先のディレクトリ')
+    parser.add_argument('--dashboard', action='append', choices=list(page_export.DASHBOARDS),
+                        help='書き出すダッシュボード（複数指定可、省略時は全て）')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for entry in page_export.export_all(args.out, args.dashboard):
+        failed |= entry['status'] != 'ok'
+        print(json.dumps(entry, ensure_ascii=False))
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""組み立て済みのグラフ（go.Figure）のプロセス共通 LRU キャッシュ。
+
+画面の選択状態とデータのバージョンをキーに go.Figure を保持し、同じ選択での再実行では
+トレースの追加、update_layout、Plotly の検証をすべて省く。
+st.plotly_chart は dict を受け取ると Figure を組み立て直して検証するため、JSON ではなく Figure のまま保持する
+（Figure を渡した場合は to_dict と JSON への変換だけが行われる）。
+キャッシュした Figure は全セッションで共有するので、呼び出し側で変更しないこと。
+"""
+import threading
+from collections import OrderedDict
+
+# 保持する Figure の数の上限（超えたら最も長く使われていないものから捨てる）
+DEFAULT_MAXSIZE = 64
+
+
+class FigureCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """key の Figure を返す。なければ build() で組み立てて保持する。"""
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return figure
+
+        figure = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,116 @@
+"""基幹的農業従事者数の将来推計。
+
+全ての (対象年齢区分, 都道府県) の系列を [系列, 西暦] の2次元配列として並べ、
+最小二乗法の正規方程式を全系列まとめて解く（Python のループは使わない）。
+欠けている年（実測値のない年）は重み0として扱う。
+
+モデルは MODELS に登録する。各モデルは (実測の西暦, 値, 値の有無, 推計する西暦, パラメータ) を受け取り、
+[..., 推計する西暦] の推計値を返す関数で、推計値は0未満にしない。
+年齢区分ごとの人数が必要なモデル（コーホート変化率法）は AGE_MODELS にも入れる。
+"""
+import numpy as np
+
+from agri_dash.cohort import cohort_forecast
+
+# 推計の刻み（年）と既定の最終年
+STEP_YEARS = 5
+DEFAULT_HORIZON = 2050
+
+
+def target_years(last_year, horizon, step=STEP_YEARS):
+    """実測の最終年の次から horizon 年までの推計年。"""
+    return np.arange(last_year + step, horizon + 1, step)
+
+
+def weighted_linear_fit(x, y, weights):
+    """y ≒ intercept + slope * x を系列ごとの重み付き最小二乗法でまとめて当てはめる。
+
+    x は [T]、y と weights は [..., T]。(intercept, slope) を [...] の配列で返す。
+    観測が1点以下の系列は傾き0（観測値の平均）、観測がない系列は0とする。
+    """
+    x = np.asarray(x, dtype='float64')
+    center = x.mean()
+    x = x - center
+    y = np.where(weights > 0, y, 0.0)
+    sw = weights.sum(axis=-1)
+    sx = (weights * x).sum(axis=-1)
+    sy = (weights * y).sum(axis=-1)
+    sxx = (weights * x * x).sum(axis=-1)
+    sxy = (weights * x * y).sum(axis=-1)
+
+    denominator = sw * sxx - sx * sx
+    slope = np.divide(sw * sxy - sx * sy, denominator, out=np.zeros_like(sy), where=denominator > 1e-12)
+    intercept = np.divide(sy - slope * sx, sw, out=np.zeros_like(sy), where=sw > 0)
+    # x を中心化した分を戻す
+    return intercept - slope * center, slope
+
+
+def linear_forecast(years, values, present, targets):
+    """線形回帰。負になる推計値は0に丸める。"""
+    intercept, slope = weighted_linear_fit(years, values, present.astype('float64'))
+    predicted = intercept[..., None] + slope[..., None] * np.asarray(targets, dtype='float64')
+    return np.maximum(predicted, 0.0)
+
+
+def log_linear_forecast(years, values, present, targets):
+    """対数線形回帰（一定の率での増減）。値が0の年は当てはめに使わない。"""
+    positive = present & (values > 0)
+    log_values = np.log(np.where(positive, values, 1.0))
+    intercept, slope = weighted_linear_fit(years, log_values, positive.astype('float64'))
+    predicted = np.exp(intercept[..., None] + slope[..., None] * np.asarray(targets, dtype='float64'))
+    # 正の値が1つもない系列は0
+    return np.where(positive.any(axis=-1)[..., None], predicted, 0.0)
+
+
+# 推計モデル: 名前 → (表示名, 推計関数, 推計方法の説明)
+# 説明の {first}・{last} は実測の最初と最後の年、{start}・{horizon} は推計の最初と最後の年に置き換える
+MODELS = {
+    'linear': (
+        '線形回帰',
+        linear_forecast,
+        [
+            '・線形回帰を使用',
+            '  ・{first}年から{last}年のデータを基に、基幹的農業従事者数の直線的な減少傾向をモデル化',
+            '  ・モデルに基づき、{start}年から{horizon}年まで5年ごとの数値を推定',
+            '  ・推定値が負になる場合は、0に丸める',
+        ],
+    ),
+    'log_linear': (
+        '対数線形回帰',
+        log_linear_forecast,
+        [
+            '・対数線形回帰を使用',
+            '  ・{first}年から{last}年のデータを基に、基幹的農業従事者数が一定の率で減少する傾向をモデル化',
+            '  ・モデルに基づき、{start}年から{horizon}年まで5年ごとの数値を推定',
+            '  ・人数が0の年は当てはめに使わない（推定値は負にならない）',
+        ],
+    ),
+    'cohort': (
+        'コーホート変化率法',
+        cohort_forecast,
+        [
+            '・コーホート変化率法を使用',
+            '  ・{first}年から{last}年のデータを基に、5年後に一つ上の年齢区分へ移る際の変化率を都道府県×年齢区分ごとに算出',
+            '  ・10歳幅の年齢区分は、区分内で年齢が一様に分布していると仮定して5歳分ずつ移す',
+            '  ・変化率を{last}年の人数に繰り返し掛け、{start}年から{horizon}年まで5年ごとの数値を推定',
+            '  ・若年層（15〜39歳）の新規就農と70歳以上の離農は、倍率を変えて試算できる',
+        ],
+    ),
+}
+
+# 年齢区分ごとの人数を入力とするモデル
+AGE_MODELS = {'cohort'}
+
+
+def describe(model, years, targets):
+    """推計方法の説明文（行のリスト）。"""
+    _, _, lines = MODELS[model]
+    fields = dict(first=int(years[0]), last=int(years[-1]), start=int(targets[0]), horizon=int(targets[-1]))
+    return [line.format(**fields) for line in lines]
+
+
+def run_forecast(model, years, values, present, horizon=DEFAULT_HORIZON, **params):
+    """登録されたモデルで推計し、(推計年, 推計値) を返す。"""
+    _, predict, _ = MODELS[model]
+    targets = target_years(int(np.max(years)), horizon)
+    return targets, predict(years, values, present, targets, **params)
@@ -0,0 +1,43 @@
+"""野菜取引データ・為替レート・WTI 原油価格の CSV を列指向ストアに取り込むコマンド。
+
+新しく追加された行だけを読み込み、検証・重複除去をしてストアに追記する。
+取引データの週次・月次・年次の集計表も、追記された期間だけ集計し直す。
+実行中のダッシュボードは、次の再実行時にストアのバージョンが上がったことを検知して新しいデータを読み込む。
+
+    python -m agri_dash.ingest
+"""
+import argparse
+import json
+
+from agri_dash import market_store, rollups, trade_store
+
+DEFAULT_TRADES_PATH = './2015-2024_rev2.csv'
+DEFAULT_EXCHANGE_PATH = './USD_JPY 2015-2024.7.csv'
+DEFAULT_WTI_PATH = './WTI_2015-2024.7.csv'
+
+
+def ingest_all(trades_path=DEFAULT_TRADES_PATH, exchange_path=DEFAULT_EXCHANGE_PATH, wti_path=DEFAULT_WTI_PATH,
+               cache_dir=trade_store.DEFAULT_CACHE_DIR):
+    """3つの CSV を取り込み、取引データの集計表も更新して、それぞれの結果の要約を返す。"""
+    return [
+        trade_store.ingest_trades(trades_path, cache_dir),
+        *rollups.sync_rollups(trades_path, cache_dir),
+        market_store.ingest_market(exchange_path, cache_dir),
+        market_store.ingest_market(wti_path, cache_dir),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CSV の新しい行を列指向ストアに取り込みます。')
+    parser.add_argument('--trades', default=DEFAULT_TRADES_PATH, help='野菜取引データの CSV')
+    parser.add_argument('--exchange', default=DEFAULT_EXCHANGE_PATH, help='為替レート（USD/JPY）の CSV')
+    parser.add_argument('--wti', default=DEFAULT_WTI_PATH, help='WTI 原油価格の CSV')
+    parser.add_argument('--cache-dir', default=trade_store.DEFAULT_CACHE_DIR, help='ストアの保存先')
+    args = parser.parse_args(argv)
+
+    for summary in ingest_all(args.trades, args.exchange, args.wti, args.cache_dir):
+        print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""野菜の取引日に為替レート（USD/JPY）と WTI 原油価格を揃えた表。
+
+取引日ごとに、その日以前で直近の終値を as-of 結合する（merge_asof）。
+為替・原油の表は market_store が日付の昇順に並べ、列名を「日付」「終値」に揃えたものを受け取る。
+一度作っておけば、重ね描きや相関の計算は列の参照と期間の二分探索だけで済む。
+"""
+import numpy as np
+import pandas as pd
+
+from agri_dash.market_store import VALUE_COLUMN
+from agri_dash.trade_index import DATE_COLUMN, to_datetime64
+
+FX_COLUMN = 'USD/JPY'
+WTI_COLUMN = 'WTI'
+
+# これより古い終値は結合しない（系列の末尾より後の取引日に値を延ばさないため）
+DEFAULT_TOLERANCE = pd.Timedelta(days=7)
+
+
+def _closing_prices(df, name):
+    return df[[DATE_COLUMN, VALUE_COLUMN]].rename(columns={VALUE_COLUMN: name})
+
+
+class MacroPanel:
+    def __init__(self, trade_dates, exchange_df, wti_df, tolerance=DEFAULT_TOLERANCE):
+        panel = pd.DataFrame({DATE_COLUMN: np.unique(np.asarray(trade_dates, dtype='datetime64[ns]'))})
+        for df, name in ((exchange_df, FX_COLUMN), (wti_df, WTI_COLUMN)):
+            panel = pd.merge_asof(panel, _closing_prices(df, name), on=DATE_COLUMN,
+                                  direction='backward', tolerance=tolerance)
+
+        self.frame = panel
+        self.dates = panel[DATE_COLUMN].to_numpy()
+        self.values = {name: panel[name].to_numpy() for name in (FX_COLUMN, WTI_COLUMN)}
+
+    def span(self, start=None, end=None):
+        lo = np.searchsorted(self.dates, to_datetime64(start), side='left') if start is not None else 0
+        hi = np.searchsorted(self.dates, to_datetime64(end), side='right') if end is not None else len(self.dates)
+        return lo, hi
+
+    def slice(self, start=None, end=None):
+        """期間内の取引日と各系列を列名→配列ビューの辞書で返す。"""
+        lo, hi = self.span(start, end)
+        data = {DATE_COLUMN: pd.DatetimeIndex(self.dates[lo:hi])}
+        for name, values in self.values.items():
+            data[name] = values[lo:hi]
+        return data
@@ -0,0 +1,118 @@
+"""為替レート（USD/JPY）と WTI 原油価格の CSV の列指向ストア。
+
+これらの CSV は新しい日付の行が先頭に書き足されていく（日付の降順）。
+取り込み済みの最新日付をマニフェストに記録しておき、次回は先頭からチャンク単位で読んで
+その日付に達したところで読み込みを打ち切り、新しい行だけをパーツとして追記する。
+それ以外の変更（昇順のファイル、過去の行の削除など）があった場合は全体を作り直す。
+
+CSV は BOM 付きで、各行の末尾に空の列が5つある。日付列の見出しもファイルによって
+「日付け」「日付」と異なるため、見出し行は使わずに先頭2列だけを位置で指定して読み、
+日付は固定の書式で変換する。ストアには列名を「日付」「終値」に揃え、日付の昇順で保存する。
+"""
+import os
+import threading
+
+import pandas as pd
+
+from agri_dash.columnar_store import ColumnarStore, file_signature, is_unchanged
+from agri_dash.trade_store import DEFAULT_CACHE_DIR
+
+DATE_COLUMN = '日付'
+VALUE_COLUMN = '終値'
+COLUMNS = [DATE_COLUMN, VALUE_COLUMN]
+DATE_FORMAT = '%Y/%m/%d'
+
+# CSV を読み込むチャンクの行数
+CHUNK_ROWS = 250
+
+_lock = threading.Lock()
+
+
+def store_for(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    return ColumnarStore(os.path.join(cache_dir, os.path.basename(csv_path)))
+
+
+def clean_market_chunk(df):
+    """日付と終値を型付きに変換し、変換できない行を除く。"""
+    return pd.DataFrame({
+        DATE_COLUMN: pd.to_datetime(df[DATE_COLUMN], format=DATE_FORMAT, errors='coerce'),
+        VALUE_COLUMN: df[VALUE_COLUMN],
+    }).dropna()
+
+
+def _read_csv(csv_path, **kwargs):
+    """先頭2列（日付・終値）だけを読む。見出し行は読み飛ばして列名を付け直す。"""
+    return pd.read_csv(csv_path, header=0, usecols=[0, 1], names=COLUMNS,
+                       dtype={DATE_COLUMN: str, VALUE_COLUMN: 'float64'}, **kwargs)
+
+
+def read_market_csv(csv_path):
+    """CSV 全体を型付きの DataFrame として読む（ファイルの行順のまま）。"""
+    return clean_market_chunk(_read_csv(csv_path))
+
+
+def read_market_chunks(csv_path):
+    """先頭からチャンクごとに型付きの DataFrame を返す。"""
+    for chunk in _read_csv(csv_path, chunksize=CHUNK_ROWS):
+        yield clean_market_chunk(chunk)
+
+
+def _finish(df):
+    """日付の昇順に並べ、同じ日付の行は1つにする。"""
+    df = df.drop_duplicates(DATE_COLUMN, keep='first')
+    return df.sort_values(DATE_COLUMN, kind='mergesort').reset_index(drop=True)
+
+
+def _rebuild(csv_path, store, signature):
+    raw = read_market_csv(csv_path)
+    order = 'descending' if raw[DATE_COLUMN].is_monotonic_decreasing else 'ascending'
+    df = _finish(raw)
+    version = store.replace(df, source=os.path.abspath(csv_path), **signature, order=order,
+                            last_date=str(df[DATE_COLUMN].max()))
+    return {'status': 'rebuilt', 'rows': len(df), 'version': version}
+
+
+def _read_new_head(csv_path, last_date):
+    """先頭から last_date より新しい行を読む。last_date に達しなければ None を返す。"""
+    new_chunks = []
+    for chunk in read_market_chunks(csv_path):
+        newer = chunk[chunk[DATE_COLUMN] > last_date]
+        new_chunks.append(newer)
+        if len(newer) < len(chunk):
+            return pd.concat(new_chunks, ignore_index=True)
+    return None
+
+
+def ingest_market(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """CSV の先頭に追加された行をストアに取り込み、結果の要約を返す。"""
+    with _lock:
+        store = store_for(csv_path, cache_dir)
+        manifest = store.manifest()
+        signature = file_signature(csv_path)
+        summary = {'source': csv_path}
+
+        if manifest is not None and list(manifest.get('dtypes', {})) != COLUMNS:
+            # 列名を揃える前に作られたストア
+            manifest = None
+        if manifest is not None and is_unchanged(signature, manifest):
+            return {**summary, 'status': 'unchanged', 'rows': 0, 'version': manifest['version']}
+        if manifest is None or manifest.get('order') != 'descending':
+            return {**summary, **_rebuild(csv_path, store, signature)}
+
+        # 先頭に追加された行だけを読む
+        new_rows = _read_new_head(csv_path, pd.Timestamp(manifest['last_date']))
+        if new_rows is None or (new_rows.empty and signature['size'] != manifest['size']):
+            return {**summary, **_rebuild(csv_path, store, signature)}
+        if new_rows.empty:
+            store.update(**signature)
+            return {**summary, 'status': 'unchanged', 'rows': 0, 'version': manifest['version']}
+
+        new_rows = _finish(new_rows)
+        version = store.append(new_rows, **signature, last_date=str(new_rows[DATE_COLUMN].max()))
+        return {**summary, 'status': 'appended', 'rows': len(new_rows), 'version': version}
+
+
+def sync_market_store(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """ストアを CSV に追いつかせてから返す。"""
+    ingest_market(csv_path, cache_dir)
+    return store_for(csv_path, cache_dir)
@@ -0,0 +1,253 @@
+"""ダッシュボードのよく見られる表示を、静的な HTML と Plotly の JSON に書き出す。
+
+ウィジェットの代表的な状態（ビュー）ごとに、ダッシュボードと同じ data_access の読み込みと
+agri_dash.charts のグラフの関数を直接呼んで図を組み立てる（スクリプトや Streamlit は実行しない）。
+条件はダッシュボードの既定値に揃えるので、画面に表示されるものと同じ図になる
+（Streamlit のテーマは適用されず、Plotly の既定の見た目になる）。
+データはダッシュボードごとに一度読み込んでビューの間で使い回し、ビューは順に書き出す。
+ビューの列挙と図の組み立ては、ダッシュボードごと・ビューごとに失敗を記録して残りを続ける。
+
+書き出し先には <ダッシュボード>/<番号>.html（そのビューの図を並べたページ）と
+<ダッシュボード>/<番号>-<図の番号>.json（Plotly の図の JSON）、plotly.min.js、
+一覧の index.html と manifest.json を置く。Python なしでファイルサーバーや CDN から配信できる。
+コマンドは agri_dash.export。
+"""
+import html
+import json
+import os
+import time
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from agri_dash import data_access
+from agri_dash.charts import prefectures as prefecture_charts
+from agri_dash.charts import rice
+from agri_dash.charts import vegetables as vegetable_charts
+from agri_dash.charts import workers as worker_charts
+from agri_dash.cohort import DEFAULT_CONDITIONS
+from agri_dash.downsample import point_budget
+from agri_dash.forecast import DEFAULT_HORIZON, MODELS
+from agri_dash.macro_panel import FX_COLUMN
+from agri_dash.prefecture_map import map_figure
+from agri_dash.prefecture_store import CORE_WORKERS
+from agri_dash.regions import REGION_ORDER
+from agri_dash.rollups import FREQUENCIES, MEAN_COLUMN, bucket_floor
+from agri_dash.worker_cube import ACTUAL
+
+DEFAULT_OUT = './export'
+
+# ダッシュボード → (スクリプト, 表示名)
+DASHBOARDS = {
+    'rice': ('稲作10aあたりの経営概要_dash.py', '稲作10aあたりの経営概要'),
+    'rice_overview': ('streamlit_dash2.py', '稲作10aあたりの経営概要 ダッシュボード'),
+    'core_workers': ('基幹的農業従事者_dash.py', '基幹的農業従事者数の可視化'),
+    'vegetables': ('vegetable_dash_streamlit.py', '野菜取引データの可視化'),
+}
+
+# 野菜のダッシュボードが読むファイル
+TRADE_PATH = './2015-2024_rev2.csv'
+EXCHANGE_PATH = './USD_JPY 2015-2024.7.csv'
+WTI_PATH = './WTI_2015-2024.7.csv'
+
+
+# ======= ビューの列挙 =======
+# ビューは (表示名, 図のリストを返す関数) で、関数はビューを書き出すときに呼ぶ。
+# データの読み込みは data_access のキャッシュを通すので、同じダッシュボードのビューで使い回す。
+def rice_views():
+    """表示する項目ごとに1ビュー。"""
+    workbooks = data_access.load_rice_workbooks()
+    return [(option, lambda build=build: [build(workbooks)]) for option, build in rice.SUMMARY_FIGURES.items()]
+
+
+def rice_overview_views():
+    """表示する項目ごとに1ビュー。平均年齢とその人数は地図（指標ごと、データセットと西暦は既定値）。"""
+    workbooks = data_access.load_rice_workbooks()
+    views = [(option, lambda build=build: [build(workbooks)]) for option, build in rice.OVERVIEW_FIGURES.items()]
+    store = data_access.load_prefecture_store()
+    dataset = prefecture_charts.DATASETS[0]
+    for label, metric in (('平均年齢', prefecture_charts.age_metric(dataset)), ('基幹的農業従事者数', CORE_WORKERS)):
+        year = store.metric_years(metric)[-1]
+        views.append((f'農業従事者の平均年齢とその人数（地図・{label}）',
+                      lambda metric=metric, year=year: [prefecture_charts.metric_map(
+                          store, metric, year, geometry=data_access.load_prefecture_geometry())]))
+    return views
+
+
+def core_workers_views():
+    """グラフ × 地域カテゴリ（都道府県は全て選択、その他の条件は既定値）。"""
+    worker_cube = data_access.load_worker_cube()
+    prefecture_store = data_access.load_prefecture_store()
+    model = next(iter(MODELS))
+
+    def forecast(prefectures, region):
+        cube = data_access.load_worker_forecast(model, DEFAULT_HORIZON)
+        interval = data_access.load_worker_bands(model, DEFAULT_HORIZON).interval(prefectures) if prefectures else None
+        return [worker_charts.actual_and_forecast(cube, prefectures, region == '全国', interval)]
+
+    def age(prefectures, region):
+        if not worker_cube.age_groups:
+            return []
+        return [worker_charts.workers_and_average_age(worker_cube, prefecture_store, prefectures,
+                                                      worker_cube.available_age_groups(prefectures), region)]
+
+    def cohort(prefectures, region):
+        if not worker_cube.age_groups:
+            return []
+        cube = data_access.load_worker_forecast('cohort', DEFAULT_HORIZON, by_age=True, **DEFAULT_CONDITIONS)
+        return [worker_charts.cohort(cube, prefectures)]
+
+    def prefecture_map(prefectures, region):
+        year = int(worker_cube.history()[0][-1])
+        values = worker_cube.by_prefecture(year, kinds=[ACTUAL])
+        values = values[values.index.isin(prefectures)]
+        return [map_figure(values, f"{CORE_WORKERS}（{year}年）", '人数',
+                           geometry=data_access.load_prefecture_geometry(), value_format=',.0f')]
+
+    graphs = {
+        '基幹的農業従事者数（実測値と推定値）': forecast,
+        '基幹的農業従事者数と平均年齢': age,
+        '年齢構成の将来推計（コーホート）': cohort,
+        '都道府県別の地図': prefecture_map,
+    }
+    return [(f'{graph}（{region}）',
+             lambda build=build, region=region: build(worker_cube.prefectures_in(region), region))
+            for graph, build in graphs.items() for region in REGION_ORDER]
+
+
+def vegetables_views():
+    """集計単位 × 都市（品目・都市は全て選択、全期間、集計表の価格は平均）と、相関分析の既定の表示。"""
+    trade_index = data_access.load_trade_index(TRADE_PATH)
+    macro_panel = data_access.load_macro_panel(TRADE_PATH, EXCHANGE_PATH, WTI_PATH)
+    items, cities = trade_index.items, trade_index.cities
+    start_date, end_date = trade_index.first_date, trade_index.last_date
+    max_points = point_budget()
+
+    def comparison(granularity, city):
+        if granularity == 'daily':
+            series_index, price_column, series_start = trade_index, '価格', start_date
+        else:
+            series_index = data_access.load_rollup_index(TRADE_PATH, granularity)
+            price_column, series_start = MEAN_COLUMN, bucket_floor(start_date, granularity)
+        suffix = vegetable_charts.period_suffix(granularity, price_column)
+        fig_items, fig_quantity, _ = vegetable_charts.item_figures(
+            series_index, macro_panel, city, items, start_date, end_date, series_start, price_column, suffix,
+            True, True, max_points)
+        fig_price, fig_city_quantity, _ = vegetable_charts.city_figures(
+            series_index, items[0], cities, series_start, end_date, price_column, suffix, max_points)
+        return [fig_items, fig_quantity, fig_price, fig_city_quantity]
+
+    def correlation(window=60, max_lag=20):
+        engine = data_access.load_correlation_engine(TRADE_PATH, EXCHANGE_PATH, WTI_PATH)
+        cross = engine.cross('pearson', max_lag, use_returns=True)[FX_COLUMN]
+        rolling = engine.rolling('pearson', window, use_returns=True)[FX_COLUMN]
+        heatmap = vegetable_charts.correlation_heatmap(engine, cities, items, cross, max_lag, FX_COLUMN)
+        return [heatmap, *vegetable_charts.correlation_figures(engine, cities[0], items[:3], rolling, cross,
+                                                               FX_COLUMN, window, max_lag, max_points)]
+
+    views = [(f'{city}（{vegetable_charts.GRANULARITY_LABELS[granularity]}）',
+              lambda granularity=granularity, city=city: comparison(granularity, city))
+             for granularity in ['daily', *FREQUENCIES] for city in cities]
+    views.append(('為替・原油との相関分析', correlation))
+    return views
+
+
+VIEWS = {
+    'rice': rice_views,
+    'rice_overview': rice_overview_views,
+    'core_workers': core_workers_views,
+    'vegetables': vegetables_views,
+}
+
+
+def enumerate_views(dashboard):
+    """ダッシュボードのデータを読み込み、(表示名, 図のリストを返す関数) のリストを返す。"""
+    return VIEWS[dashboard]()
+
+
+# ======= 書き出し =======
+def page_html(title, specs, plotlyjs='../plotly.min.js'):
+    """図を縦に並べた静的なページ。plotly.js は書き出し先の直下のファイルを読む。"""
+    charts = [pio.to_html(json.loads(spec), full_html=False, include_plotlyjs=False, validate=False)
+              for spec in specs]
+    return '\n'.join([
+        '<!DOCTYPE html>',
+        '<html lang="ja">',
+        '<head><meta charset="utf-8">',
+        f'<title>{html.escape(title)}</title>',
+        f'<script src="{plotlyjs}"></script>',
+        '</head>',
+        '<body>',
+        f'<h1>{html.escape(title)}</h1>',
+        *charts,
+        '</body>',
+        '</html>',
+    ])
+
+
+def export_view(out, dashboard, number, label, build):
+    """1ビューの図を組み立てて書き出し、manifest の1項目を返す。"""
+    _, title = DASHBOARDS[dashboard]
+    started = time.perf_counter()
+    specs = [fig.to_json() for fig in build()]
+    directory = os.path.join(out, dashboard)
+    os.makedirs(directory, exist_ok=True)
+    figures = []
+    for index, spec in enumerate(specs, start=1):
+        name = f'{number:02d}-{index}.json'
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(spec)
+        figures.append(f'{dashboard}/{name}')
+    page = f'{dashboard}/{number:02d}.html'
+    with open(os.path.join(out, page), 'w', encoding='utf-8') as f:
+        f.write(page_html(f'{title} - {label}', specs))
+    return {'dashboard': dashboard, 'view': label, 'page': page, 'figures': figures,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+
+def index_html(entries):
+    items = []
+    for dashboard, (_, title) in DASHBOARDS.items():
+        links = [f'<li><a href="{entry["page"]}">{html.escape(entry["view"])}</a></li>'
+                 for entry in entries if entry['dashboard'] == dashboard]
+        if links:
+            items += [f'<h2>{html.escape(title)}</h2>', '<ul>', *links, '</ul>']
+    return '\n'.join(['<!DOCTYPE html>', '<html lang="ja">', '<head><meta charset="utf-8">',
+                      '<title>ダッシュボード</title>', '</head>', '<body>', *items, '</body>', '</html>'])
+
+
+def _error(dashboard, view, error):
+    return {'dashboard': dashboard, 'view': view, 'status': 'error', 'error': f'{type(error).__name__}: {error}'}
+
+
+def export_all(out=DEFAULT_OUT, dashboards=None):
+    """ビューを列挙して順に書き出し、manifest の項目を1件ずつ返すジェネレーター。
+
+    ビューの列挙に失敗したダッシュボードは view を None、図の組み立てや書き出しに失敗したビューは
+    その表示名で status を error にして返し、他のダッシュボード・ビューの書き出しは続ける。
+    """
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    entries = []
+    for dashboard in dashboards or list(DASHBOARDS):
+        try:
+            views = enumerate_views(dashboard)
+        except Exception as e:
+            entries.append(_error(dashboard, None, e))
+            yield entries[-1]
+            continue
+        for number, (label, build) in enumerate(views, start=1):
+            try:
+                entry = dict(export_view(out, dashboard, number, label, build), status='ok')
+            except Exception as e:
+                entry = _error(dashboard, label, e)
+            entries.append(entry)
+            yield entry
+
+    exported = [entry for entry in entries if entry['status'] == 'ok']
+    with open(os.path.join(out, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(exported, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(out, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(index_html(exported))
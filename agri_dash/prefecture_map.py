@@ -0,0 +1,180 @@
+"""都道府県別の値を塗り分けた地図。
+
+全ての都道府県を1つのトレースで描く（都道府県ごとにトレースを作らない）。
+GEOJSON_PATH に都道府県境界の GeoJSON があれば、一度だけ読み込んで座標を間引き（Douglas-Peucker 法）、
+小さくした FeatureCollection を .cache に保存して使い回す。各地物の id は都道府県名（REGION_MAPPING のキー）にする。
+GeoJSON がない場合は、都道府県を格子状に並べたタイル地図で表示する。
+"""
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+from agri_dash.columnar_store import file_signature, is_unchanged, read_json, write_json
+from agri_dash.regions import REGION_MAPPING
+
+GEOJSON_PATH = './data/japan_prefectures.geojson'
+DEFAULT_CACHE_DIR = './.cache'
+
+# 間引きの許容誤差（度。0.01度はおよそ1km）と、座標を丸める小数点以下の桁数
+TOLERANCE = 0.01
+DECIMALS = 3
+
+# 都道府県名が入っている可能性のある属性
+NAME_PROPERTIES = ('nam_ja', 'name_ja', 'N03_001', 'name')
+
+# タイル地図での位置（行, 列）。北海道が右上、沖縄が左下
+TILE_POSITIONS = {
+    '北海道': (0, 12),
+    '青森': (1, 12),
+    '秋田': (2, 11), '岩手': (2, 12),
+    '山形': (3, 11), '宮城': (3, 12),
+    '石川': (4, 9), '富山': (4, 10), '新潟': (4, 11), '福島': (4, 12),
+    '福井': (5, 8), '岐阜': (5, 9), '長野': (5, 10), '群馬': (5, 11), '栃木': (5, 12),
+    '島根': (6, 4), '鳥取': (6, 5), '兵庫': (6, 6), '京都': (6, 7), '滋賀': (6, 8),
+    '愛知': (6, 9), '山梨': (6, 10), '埼玉': (6, 11), '茨城': (6, 12),
+    '山口': (7, 3), '広島': (7, 4), '岡山': (7, 5), '大阪': (7, 6), '奈良': (7, 7),
+    '三重': (7, 8), '静岡': (7, 9), '神奈川': (7, 10), '東京': (7, 11), '千葉': (7, 12),
+    '長崎': (8, 0), '佐賀': (8, 1), '福岡': (8, 2), '愛媛': (8, 4), '香川': (8, 5), '和歌山': (8, 7),
+    '熊本': (9, 1), '大分': (9, 2), '高知': (9, 4), '徳島': (9, 5),
+    '鹿児島': (10, 1), '宮崎': (10, 2),
+    '沖縄': (11, 0),
+}
+
+
+def prefecture_name(properties):
+    """地物の属性から都道府県名（「都」「府」「県」を除いた名前）を返す。見つからなければ None。"""
+    for key in NAME_PROPERTIES:
+        name = properties.get(key)
+        if not name:
+            continue
+        if name not in REGION_MAPPING and name[-1] in '都府県':
+            name = name[:-1]
+        if name in REGION_MAPPING:
+            return name
+    return None
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker 法で折れ線の点を間引く。points は [点, 2] の配列。"""
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, stop = stack.pop()
+        if stop - start < 2:
+            continue
+        segment = points[stop] - points[start]
+        offsets = points[start + 1:stop] - points[start]
+        length = np.hypot(*segment)
+        if length > 0:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            stack.extend([(start, middle), (middle, stop)])
+    return points[keep]
+
+
+def _simplify_polygon(rings, tolerance, decimals):
+    """外周と穴を間引く。点が4つ未満になった輪（小さな島など）は捨て、外周が残らなければ None。"""
+    simplified = []
+    for ring in rings:
+        points = np.round(simplify_line(np.asarray(ring, dtype='float64'), tolerance), decimals)
+        if len(points) >= 4:
+            simplified.append(points.tolist())
+    return simplified or None
+
+
+def simplify_geojson(geojson, tolerance=TOLERANCE, decimals=DECIMALS):
+    """都道府県ごとの地物を間引き、id を都道府県名にした FeatureCollection を返す。"""
+    features = []
+    for feature in geojson['features']:
+        name = prefecture_name(feature.get('properties') or {})
+        geometry = feature.get('geometry') or {}
+        if name is None or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+            continue
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        polygons = [p for p in (_simplify_polygon(rings, tolerance, decimals) for rings in polygons) if p]
+        if polygons:
+            features.append({
+                'type': 'Feature',
+                'id': name,
+                'properties': {},
+                'geometry': {'type': 'MultiPolygon', 'coordinates': polygons},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def load_geometry(path=GEOJSON_PATH, cache_dir=DEFAULT_CACHE_DIR, tolerance=TOLERANCE):
+    """間引いた都道府県境界を返す。元ファイルがなければ None。
+
+    間引いた結果は元ファイルの更新時刻・サイズと一緒に保存し、元ファイルが変わるまで読み直さない。
+    """
+    if not os.path.exists(path):
+        return None
+    signature = file_signature(path)
+    cache_path = os.path.join(cache_dir, os.path.basename(path) + '.simplified.json')
+    cached = read_json(cache_path)
+    if cached and is_unchanged(signature, cached) and cached.get('tolerance') == tolerance:
+        return cached['geojson']
+
+    source = read_json(path)
+    if source is None:
+        return None
+    geojson = simplify_geojson(source, tolerance)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_json(cache_path, dict(signature, tolerance=tolerance, geojson=geojson))
+    return geojson
+
+
+def map_figure(values, title, colorbar_title, geometry=None, value_format=',.0f', colorscale='YlOrRd'):
+    """都道府県名 → 値 の Series を1トレースで塗り分けた Figure を返す。
+
+    geometry（load_geometry の戻り値）があれば Choropleth、なければタイル地図で描く。
+    """
+    values = values.dropna()
+    hovertemplate = f'%{{text}}<br>%{{customdata:{value_format}}}<extra></extra>'
+    if geometry is not None:
+        fig = go.Figure(go.Choropleth(
+            geojson=geometry,
+            locations=values.index,
+            z=values.to_numpy(),
+            text=values.index,
+            customdata=values.to_numpy(),
+            hovertemplate=hovertemplate,
+            colorscale=colorscale,
+            colorbar=dict(title=colorbar_title),
+            marker_line_width=0.5,
+        ))
+        fig.update_geos(fitbounds='locations', visible=False)
+    else:
+        names = [name for name in values.index if name in TILE_POSITIONS]
+        rows, columns = np.array([TILE_POSITIONS[name] for name in names]).reshape(-1, 2).T
+        fig = go.Figure(go.Scatter(
+            x=columns,
+            y=-rows,
+            mode='markers+text',
+            text=names,
+            customdata=values[names].to_numpy(),
+            hovertemplate=hovertemplate,
+            textfont=dict(size=10),
+            marker=dict(
+                symbol='square',
+                size=40,
+                color=values[names].to_numpy(),
+                colorscale=colorscale,
+                colorbar=dict(title=colorbar_title),
+                line=dict(color='white', width=1),
+            ),
+        ))
+        fig.update_xaxes(visible=False)
+        fig.update_yaxes(visible=False, scaleanchor='x')
+        fig.update_layout(plot_bgcolor='white')
+    fig.update_layout(title=title, width=1000, height=700)
+    return fig
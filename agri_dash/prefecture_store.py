@@ -0,0 +1,126 @@
+"""都道府県別データの縦持ちの表。
+
+平均年齢・基幹的農業従事者数（全体・年代別）の各ワークブックは、横持ち（都道府県が列）と
+縦持ちが混在している。これらを (地域, 西暦, 対象年齢区分, 指標) をキーとする1つの縦持ちの表にまとめ、
+地域・対象年齢区分・指標はカテゴリ型で持つ。年代別でない値の対象年齢区分は「全体」とする。
+各ダッシュボードはこの表から必要な系列を切り出すだけで、ワークブックごとの形の違いを意識しない。
+"""
+import numpy as np
+import pandas as pd
+
+from agri_dash.regions import NATIONAL
+from agri_dash.workbook_store import read_excel
+
+REGION_COLUMN = '地域'
+YEAR_COLUMN = '西暦'
+AGE_GROUP_COLUMN = '対象年齢区分'
+METRIC_COLUMN = '指標'
+VALUE_COLUMN = '値'
+KEY_COLUMNS = [REGION_COLUMN, YEAR_COLUMN, AGE_GROUP_COLUMN, METRIC_COLUMN]
+
+TOTAL_AGE_GROUP = '全体'
+
+# 指標
+AVERAGE_AGE = '農業従事者の平均年齢'
+CORE_AVERAGE_AGE = '基幹的農業従事者の平均年齢'
+CORE_WORKERS = '基幹的農業従事者数'
+
+# 指標ごとの元ファイル
+SOURCE_FILES = {
+    AVERAGE_AGE: './data/都道府県別_農業従事者の平均年齢_1995-2020_5年毎.xlsx',
+    CORE_AVERAGE_AGE: './data/都道府県別_基幹的農業従事者の平均年齢_1995-2020_5年毎.xlsx',
+    CORE_WORKERS: './data/都道府県別_基幹的農業従事者数-全体_1985-2020_5年毎.xlsx',
+    f'{CORE_WORKERS}（年代別）': './data/都道府県別_基幹的農業従事者数_年代別_1995-2020_5年毎/基幹的農業従事者数_統合データ.xlsx',
+}
+
+
+def _rows(region, year, value, metric, age_group=TOTAL_AGE_GROUP):
+    return pd.DataFrame({
+        REGION_COLUMN: np.asarray(region, dtype=object),
+        YEAR_COLUMN: np.asarray(year, dtype='int16'),
+        AGE_GROUP_COLUMN: age_group,
+        METRIC_COLUMN: metric,
+        VALUE_COLUMN: pd.to_numeric(pd.Series(np.asarray(value, dtype=object)), errors='coerce').to_numpy('float64'),
+    })
+
+
+def from_long(df, value_column, metric):
+    """西暦・地域・値（・対象年齢区分）の列を持つ縦持ちの表を変換する。"""
+    age_group = df[AGE_GROUP_COLUMN].to_numpy(dtype=object) if AGE_GROUP_COLUMN in df else TOTAL_AGE_GROUP
+    return _rows(df[REGION_COLUMN], df[YEAR_COLUMN], df[value_column], metric, age_group)
+
+
+def from_wide(df, metric):
+    """西暦の列と都道府県ごとの列を持つ横持ちの表を変換する。"""
+    long = df.melt(id_vars=YEAR_COLUMN, var_name=REGION_COLUMN, value_name=VALUE_COLUMN)
+    return _rows(long[REGION_COLUMN], long[YEAR_COLUMN], long[VALUE_COLUMN], metric)
+
+
+def read_sources(paths=SOURCE_FILES):
+    """元ファイルを読み込み、縦持ちの表のリストを返す。"""
+    workers_by_age = f'{CORE_WORKERS}（年代別）'
+    return [
+        from_wide(read_excel(paths[CORE_WORKERS]), CORE_WORKERS),
+        from_long(read_excel(paths[workers_by_age]), CORE_WORKERS, CORE_WORKERS),
+        # 農業従事者の平均年齢のファイルも値の列名は「基幹的農業従事者の平均年齢」になっている
+        from_long(read_excel(paths[AVERAGE_AGE]), CORE_AVERAGE_AGE, AVERAGE_AGE),
+        from_long(read_excel(paths[CORE_AVERAGE_AGE]), CORE_AVERAGE_AGE, CORE_AVERAGE_AGE),
+    ]
+
+
+class PrefectureStore:
+    def __init__(self, frames):
+        df = pd.concat(frames, ignore_index=True)
+        # カテゴリの順序は元データでの出現順（地域は全国、北海道、青森、…の順）
+        for column in (REGION_COLUMN, AGE_GROUP_COLUMN, METRIC_COLUMN):
+            df[column] = pd.Categorical(df[column], categories=pd.unique(df[column]))
+        df = df.drop_duplicates(KEY_COLUMNS, keep='first')
+        df = df.sort_values([METRIC_COLUMN, AGE_GROUP_COLUMN, REGION_COLUMN, YEAR_COLUMN], kind='mergesort')
+        self.frame = df.reset_index(drop=True)
+
+        # (指標, 対象年齢区分, 地域) ごとの [開始, 終了) 位置
+        keys = self.frame[[METRIC_COLUMN, AGE_GROUP_COLUMN, REGION_COLUMN]]
+        codes = np.stack([keys[column].cat.codes.to_numpy() for column in keys.columns], axis=1)
+        starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]).any(axis=1)])
+        stops = np.r_[starts[1:], len(codes)]
+        self.years = self.frame[YEAR_COLUMN].to_numpy()
+        self.values = self.frame[VALUE_COLUMN].to_numpy()
+        self.offsets = {tuple(keys.iloc[start]): (start, stop) for start, stop in zip(starts, stops)}
+
+        self.regions = list(self.frame[REGION_COLUMN].cat.categories)
+        self.prefectures = [region for region in self.regions if region != NATIONAL]
+
+    @classmethod
+    def from_excel(cls, paths=SOURCE_FILES):
+        return cls(read_sources(paths))
+
+    def series(self, metric, region, age_group=TOTAL_AGE_GROUP):
+        """(指標, 地域, 対象年齢区分) の西暦と値の配列（西暦の昇順）を返す。"""
+        start, stop = self.offsets.get((metric, age_group, region), (0, 0))
+        return self.years[start:stop], self.values[start:stop]
+
+    def age_groups(self, metric):
+        """指標の年代別の区分（「全体」を除く）。"""
+        groups = self.frame.loc[self.frame[METRIC_COLUMN] == metric, AGE_GROUP_COLUMN].unique()
+        return [group for group in groups if group != TOTAL_AGE_GROUP]
+
+    def metric_years(self, metric, age_group=TOTAL_AGE_GROUP):
+        """指標に値のある西暦（昇順）。"""
+        df = self.query(metric, age_groups=[age_group])
+        return sorted(df.loc[df[VALUE_COLUMN].notna(), YEAR_COLUMN].unique().tolist())
+
+    def snapshot(self, metric, year, age_group=TOTAL_AGE_GROUP):
+        """ある西暦の都道府県ごとの値（都道府県名を索引とする Series。全国は含めない）。"""
+        df = self.query(metric, self.prefectures, [age_group])
+        df = df[df[YEAR_COLUMN] == year]
+        return pd.Series(df[VALUE_COLUMN].to_numpy(), index=df[REGION_COLUMN].astype(str).to_numpy())
+
+    def query(self, metrics, regions=None, age_groups=None):
+        """指標（と地域・対象年齢区分）で絞り込んだ行を返す。"""
+        df = self.frame
+        mask = df[METRIC_COLUMN].isin([metrics] if isinstance(metrics, str) else metrics)
+        if regions is not None:
+            mask &= df[REGION_COLUMN].isin(regions)
+        if age_groups is not None:
+            mask &= df[AGE_GROUP_COLUMN].isin(age_groups)
+        return df[mask]
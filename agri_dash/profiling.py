@@ -0,0 +1,148 @@
+"""ダッシュボードの再実行ごとの段階別の計測（時間とメモリ）。
+
+環境変数 AGRI_DASH_PROFILE を設定して起動したときだけ有効になる。
+
+    AGRI_DASH_PROFILE=1       段階ごとの時間を計測する
+    AGRI_DASH_PROFILE=memory  時間に加えて tracemalloc でメモリの増分とピークを計測する（処理は遅くなる）
+    AGRI_DASH_PROFILE_LOG     JSON lines のログの保存先（既定は ./.cache/profile.jsonl）
+
+スクリプトでは start() で計測を始め、各段階の最初で stage('load') のように段階名を付けると、
+次の stage() または finish() までをその段階として計測する。finish() で1行の JSON をログに追記し、
+サイドバーのデバッグ用パネルに段階ごとの結果を表示する。
+無効なときは start() が何もしないオブジェクトを返すので、計測の呼び出しはほぼ負荷にならない。
+
+フラグメントの中では fragment() で計測する。スクリプト全体の実行中なら段階名に「フラグメント名/」を付けて
+全体の計測に加え、フラグメントだけの再実行なら別に計測してパネルをフラグメントの中に表示する
+（フラグメントからはサイドバーに書き込めないため）。
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+MODE = os.environ.get('AGRI_DASH_PROFILE', '').strip().lower()
+ENABLED = MODE not in ('', '0', 'false', 'off')
+TRACE_MEMORY = MODE == 'memory'
+LOG_PATH = os.environ.get('AGRI_DASH_PROFILE_LOG', './.cache/profile.jsonl')
+
+# 同じプロセスの複数のセッションからログに同時に書き込まないためのロック
+_lock = threading.Lock()
+
+
+def write_log(entry, path=LOG_PATH):
+    """1回分の計測結果を JSON lines のログに追記する。"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    with _lock, open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+class Profile:
+    """1回の再実行（またはフラグメントの再実行）の段階ごとの計測。"""
+
+    def __init__(self, dashboard, trace_memory=TRACE_MEMORY):
+        self.dashboard = dashboard
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._current = None
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._started = time.perf_counter()
+
+    def stage(self, name):
+        """直前の段階を閉じ、以降の処理を name の段階として計測する。"""
+        now = time.perf_counter()
+        self._close(now)
+        memory = None
+        if self.trace_memory:
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._current = (name, now, memory)
+
+    def end_stage(self):
+        """現在の段階を閉じる。次の stage() までの処理は計測しない。"""
+        self._close(time.perf_counter())
+
+    def _close(self, now):
+        if self._current is None:
+            return
+        name, started, memory = self._current
+        record = {'stage': name, 'ms': round((now - started) * 1000, 3)}
+        if memory is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            record['memory_kib'] = round((current - memory) / 1024, 1)
+            record['peak_kib'] = round((peak - memory) / 1024, 1)
+        self.stages.append(record)
+        self._current = None
+
+    def entry(self):
+        ctx = get_script_run_ctx()
+        return {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'dashboard': self.dashboard,
+            'session': ctx.session_id if ctx else None,
+            'total_ms': round(sum(record['ms'] for record in self.stages), 3),
+            'stages': self.stages,
+        }
+
+    def finish(self, container=None):
+        """最後の段階を閉じ、ログに追記してパネルに表示する。container を省略するとサイドバーに表示する。"""
+        self._close(time.perf_counter())
+        entry = self.entry()
+        write_log(entry)
+        panel = (container or st.sidebar).expander(f'計測（{self.dashboard}）')
+        panel.dataframe(self.stages, hide_index=True)
+        panel.caption(f"合計 {entry['total_ms']:,.1f} ms")
+        return entry
+
+
+class _Section:
+    """スクリプト全体の実行中のフラグメント。段階は全体の計測に加える。"""
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def stage(self, name):
+        self.profile.stage(f'{self.name}/{name}')
+
+    def finish(self, container=None):
+        self.profile.end_stage()
+
+
+class _Disabled:
+    """計測が無効なときの、何もしない Profile。"""
+
+    def stage(self, name):
+        pass
+
+    def end_stage(self):
+        pass
+
+    def finish(self, container=None):
+        pass
+
+
+_DISABLED = _Disabled()
+
+
+def start(dashboard):
+    """計測を始める。AGRI_DASH_PROFILE が設定されていなければ何もしないオブジェクトを返す。"""
+    return Profile(dashboard) if ENABLED else _DISABLED
+
+
+def fragment(profile, name):
+    """フラグメントの中での計測を始める。profile はスクリプトの start() が返したもの。"""
+    if not ENABLED:
+        return _DISABLED
+    ctx = get_script_run_ctx()
+    if ctx and ctx.fragment_ids_this_run:
+        return Profile(f'{profile.dashboard}/{name}')
+    return _Section(profile, name)
@@ -0,0 +1,23 @@
+"""都道府県と地域カテゴリの対応。"""
+
+NATIONAL = '全国'
+
+# 地域カテゴリ定義
+REGION_MAPPING = {
+    '北海道': '北海道-東北',
+    '青森': '北海道-東北', '岩手': '北海道-東北', '宮城': '北海道-東北', '秋田': '北海道-東北',
+    '山形': '北海道-東北', '福島': '北海道-東北',
+    '茨城': '関東', '栃木': '関東', '群馬': '関東', '埼玉': '関東', '千葉': '関東',
+    '東京': '関東', '神奈川': '関東',
+    '新潟': '中部', '富山': '中部', '石川': '中部', '福井': '中部', '山梨': '中部',
+    '長野': '中部', '岐阜': '中部', '静岡': '中部', '愛知': '中部',
+    '三重': '近畿', '滋賀': '近畿', '京都': '近畿', '大阪': '近畿', '兵庫': '近畿',
+    '奈良': '近畿', '和歌山': '近畿',
+    '鳥取': '中国', '島根': '中国', '岡山': '中国', '広島': '中国', '山口': '中国',
+    '徳島': '四国', '香川': '四国', '愛媛': '四国', '高知': '四国',
+    '福岡': '九州-沖縄', '佐賀': '九州-沖縄', '長崎': '九州-沖縄', '熊本': '九州-沖縄',
+    '大分': '九州-沖縄', '宮崎': '九州-沖縄', '鹿児島': '九州-沖縄', '沖縄': '九州-沖縄'
+}
+
+# 地域カテゴリ順序
+REGION_ORDER = [NATIONAL, '北海道-東北', '関東', '中部', '近畿', '中国', '四国', '九州-沖縄']
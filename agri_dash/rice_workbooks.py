@@ -0,0 +1,67 @@
+"""稲作10aあたりの経営概要・生産費・労働時間のワークブック。
+
+稲作のダッシュボード（稲作10aあたりの経営概要_dash.py と streamlit_dash2.py）は同じ3つのワークブックを使う。
+RiceWorkbooks は3つのワークブックの登録簿で、各ワークブックは main・cost・labor_time を初めて参照したときに
+読み込む（グラフに使う金額の列は数値型に変換する）。例えば「資本額（円）」のグラフだけなら経営概要だけを読む。
+"""
+import pandas as pd
+
+from agri_dash.workbook_store import read_excel
+
+MAIN = '経営概要'
+COST = '生産費'
+LABOR_TIME = '労働時間'
+
+SOURCE_FILES = {
+    MAIN: './data/稲作10aあたりの経営概要_累年_1970-2022_1年毎.xlsx',
+    COST: './data/稲作10aあたりの生産費_累年_1951-2022_1年毎.xlsx',
+    LABOR_TIME: './data/稲作10aあたりの労働時間_累年_1951-2022_1年毎.xlsx',
+}
+
+# 読み込み時に数値型に変換する列
+NUMERIC_COLUMNS = {
+    MAIN: ['資本額（円）', '所得（円）', '粗収益（円）'],
+    COST: ['物財費（円）', '労働費（円）'],
+    LABOR_TIME: [],
+}
+
+
+def read_workbook(path, numeric_columns=()):
+    df = read_excel(path)
+    for column in numeric_columns:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+class RiceWorkbooks:
+    """ワークブック名 → DataFrame の登録簿。参照のたびに load(name) を呼ぶので、使い回しは load 側で行う。"""
+
+    def __init__(self, load):
+        self._load = load
+
+    @classmethod
+    def from_excel(cls, paths=SOURCE_FILES):
+        """Excel（変換済みなら Feather）から直接読み込み、読み込んだものはインスタンス内で使い回す。"""
+        frames = {}
+
+        def load(name):
+            if name not in frames:
+                frames[name] = read_workbook(paths[name], NUMERIC_COLUMNS[name])
+            return frames[name]
+
+        return cls(load)
+
+    def workbook(self, name):
+        return self._load(name)
+
+    @property
+    def main(self):
+        return self.workbook(MAIN)
+
+    @property
+    def cost(self):
+        return self.workbook(COST)
+
+    @property
+    def labor_time(self):
+        return self.workbook(LABOR_TIME)
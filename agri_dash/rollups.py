@@ -0,0 +1,120 @@
+"""野菜取引データの週次・月次・年次の集計表（ロールアップ）。
+
+(都市, 品目, 期間の開始日) ごとに価格の平均・中央値・数量加重平均と数量の合計を求め、
+取引データのストアの隣に列指向ストアとして保存する。
+取引データに行が追記された場合は、追記された行の最も古い日付を含む期間から後だけを集計し直す。
+取引データが作り直された場合（generation が変わった場合）は全体を集計し直す。
+期間の開始日は「日付」列に入れるので、TradeIndex でそのまま索引を作れる。
+"""
+import os
+import threading
+
+import pandas as pd
+
+from agri_dash import trade_store
+from agri_dash.columnar_store import ColumnarStore
+from agri_dash.trade_index import CITY_COLUMN, DATE_COLUMN, ITEM_COLUMN
+
+# 集計単位 → pandas の期間の頻度（週は月曜始まり）
+FREQUENCIES = {
+    'weekly': 'W-SUN',
+    'monthly': 'M',
+    'yearly': 'A',
+}
+
+MEAN_COLUMN = '平均価格'
+MEDIAN_COLUMN = '中央値価格'
+WEIGHTED_COLUMN = '加重平均価格'
+QUANTITY_COLUMN = '数量'
+VALUE_COLUMNS = (MEAN_COLUMN, MEDIAN_COLUMN, WEIGHTED_COLUMN, QUANTITY_COLUMN)
+KEY_COLUMNS = [CITY_COLUMN, ITEM_COLUMN, DATE_COLUMN]
+
+_lock = threading.Lock()
+
+
+def bucket_start(dates, granularity):
+    """日付の列を、その日付を含む期間の開始日に変換する。"""
+    return dates.dt.to_period(FREQUENCIES[granularity]).dt.start_time
+
+
+def bucket_floor(date, granularity):
+    """1つの日付を、その日付を含む期間の開始日に変換する。"""
+    return pd.Timestamp(date).to_period(FREQUENCIES[granularity]).start_time
+
+
+def compute_rollup(df, granularity):
+    """取引データを (都市, 品目, 期間) ごとに集計する。"""
+    quantity = df['数量']
+    frame = pd.DataFrame({
+        CITY_COLUMN: df[CITY_COLUMN],
+        ITEM_COLUMN: df[ITEM_COLUMN],
+        DATE_COLUMN: bucket_start(df[DATE_COLUMN], granularity),
+        '価格': df['価格'],
+        QUANTITY_COLUMN: quantity,
+        # 数量加重平均の分子（数量が欠けた行は分子・分母とも除く）
+        '_amount': df['価格'] * quantity,
+    })
+    grouped = frame.groupby(KEY_COLUMNS, observed=True, sort=True)
+    amount = grouped['_amount'].sum(min_count=1)
+    weight = grouped[QUANTITY_COLUMN].sum(min_count=1)
+    rollup = pd.DataFrame({
+        MEAN_COLUMN: grouped['価格'].mean(),
+        MEDIAN_COLUMN: grouped['価格'].median(),
+        WEIGHTED_COLUMN: amount / weight.where(weight > 0),
+        QUANTITY_COLUMN: weight,
+    }).reset_index()
+    for column in (CITY_COLUMN, ITEM_COLUMN):
+        rollup[column] = rollup[column].astype('category')
+    return rollup
+
+
+def store_for(csv_path, granularity, cache_dir=trade_store.DEFAULT_CACHE_DIR):
+    return ColumnarStore(os.path.join(cache_dir, f'{os.path.basename(csv_path)}.rollup-{granularity}'))
+
+
+def _merge(existing, recomputed, since):
+    """既存の集計のうち since より前の期間と、集計し直した期間をつなげる。"""
+    rollup = pd.concat([existing[existing[DATE_COLUMN] < since], recomputed], ignore_index=True)
+    for column in (CITY_COLUMN, ITEM_COLUMN):
+        rollup[column] = rollup[column].astype(object).astype('category')
+    return rollup.sort_values(KEY_COLUMNS, kind='mergesort').reset_index(drop=True)
+
+
+def sync_rollup(csv_path, granularity, cache_dir=trade_store.DEFAULT_CACHE_DIR, trades=None):
+    """集計表を取引データのストアに追いつかせ、結果の要約を返す。
+
+    trades には取引データのストアを読み込んだ DataFrame を渡せる（読み直しを省くため）。
+    """
+    with _lock:
+        source = trade_store.store_for(csv_path, cache_dir)
+        source_manifest = source.manifest()
+        store = store_for(csv_path, granularity, cache_dir)
+        manifest = store.manifest()
+        summary = {'source': csv_path, 'granularity': granularity}
+
+        if manifest is not None and manifest['source_version'] == source_manifest['version']:
+            return {**summary, 'status': 'unchanged', 'buckets': 0, 'version': manifest['version']}
+        if trades is None or len(trades) != source_manifest['rows']:
+            trades = source.read(source_manifest)
+        meta = {'source_version': source_manifest['version'], 'generation': source_manifest['generation'],
+                'source_rows': len(trades)}
+
+        if manifest is None or manifest['generation'] != source_manifest['generation']:
+            rollup = compute_rollup(trades, granularity)
+            version = store.replace(rollup, **meta)
+            return {**summary, 'status': 'rebuilt', 'buckets': len(rollup), 'version': version}
+
+        # 追記された行の最も古い日付を含む期間から後だけを集計し直す
+        new_rows = trades.iloc[manifest['source_rows']:]
+        if new_rows.empty:
+            store.update(**meta)
+            return {**summary, 'status': 'unchanged', 'buckets': 0, 'version': manifest['version']}
+        since = bucket_floor(new_rows[DATE_COLUMN].min(), granularity)
+        recomputed = compute_rollup(trades[trades[DATE_COLUMN] >= since], granularity)
+        version = store.replace(_merge(store.read(manifest), recomputed, since), **meta)
+        return {**summary, 'status': 'updated', 'buckets': len(recomputed), 'version': version}
+
+
+def sync_rollups(csv_path, cache_dir=trade_store.DEFAULT_CACHE_DIR, trades=None):
+    """全ての集計単位の集計表を更新し、結果の要約のリストを返す。"""
+    return [sync_rollup(csv_path, granularity, cache_dir, trades) for granularity in FREQUENCIES]
@@ -0,0 +1,87 @@
+"""st.session_state と st.form による複数選択。
+
+チェックボックスの一覧を st.form の中に置き、変更は「適用」を押したときにまとめて確定する
+（チェックを付け外しするたびにスクリプト全体を再実行しない）。確定した選択は session_state に保持し、
+各グラフはその確定済みの選択だけを見る。
+section はグラフの組み立て結果を、入力（選択など）の組と一緒にセッションごとに1つ保持し、
+入力が変わっていないグラフは組み立て直さない。
+"""
+import datetime
+
+import streamlit as st
+
+PLAIN_TYPES = (str, int, float, bool, tuple, datetime.date, type(None))
+
+
+class Selection:
+    """options からの複数選択。key ごとに確定済みの選択を session_state に持つ。
+
+    widget_prefix は各チェックボックスのキーの接頭辞（キーは f'{widget_prefix}{選択肢}'）。
+    """
+
+    def __init__(self, key, options, default=(), widget_prefix=None):
+        self.key = key
+        self.options = list(options)
+        self.widget_prefix = widget_prefix if widget_prefix is not None else f'{key}_'
+        self._state_key = f'{key}__selected'
+        if self._state_key not in st.session_state:
+            st.session_state[self._state_key] = [option for option in self.options if option in set(default)]
+
+    def widget_key(self, option):
+        return f'{self.widget_prefix}{option}'
+
+    @property
+    def selected(self):
+        """確定済みの選択（options の順）。"""
+        chosen = set(st.session_state[self._state_key])
+        return [option for option in self.options if option in chosen]
+
+    def _set_all(self, value):
+        for option in self.options:
+            st.session_state[self.widget_key(option)] = value
+        self._apply()
+
+    def _apply(self):
+        st.session_state[self._state_key] = [option for option in self.options
+                                             if st.session_state.get(self.widget_key(option))]
+
+    def render(self, container=st, columns=3, submit_label='適用'):
+        """チェックボックスの一覧をフォームとして表示し、確定済みの選択を返す。"""
+        chosen = set(self.selected)
+        with container.form(self.key, border=False):
+            cols = st.columns(columns) if columns > 1 else [st]
+            for i, option in enumerate(self.options):
+                key = self.widget_key(option)
+                # 確定済みの選択をチェックボックスの初期値にする（フォーム内の未確定の変更は保持される）
+                if key not in st.session_state:
+                    st.session_state[key] = option in chosen
+                cols[i % columns].checkbox(option, key=key)
+            buttons = st.columns(3)
+            with buttons[0]:
+                st.form_submit_button(submit_label, on_click=self._apply, type='primary')
+            with buttons[1]:
+                st.form_submit_button('すべて選択', on_click=self._set_all, args=(True,))
+            with buttons[2]:
+                st.form_submit_button('すべて解除', on_click=self._set_all, args=(False,))
+        return self.selected
+
+
+def section(key, inputs, build):
+    """inputs が前回と同じなら前回の build() の結果を、違えば build() し直した結果を返す。
+
+    結果はセッションごと・key ごとに1つだけ保持する。inputs にはグラフが依存する選択や
+    データのオブジェクト（読み直すと別のオブジェクトになる）を入れる。
+    """
+    state_key = f'{key}__section'
+    cached = st.session_state.get(state_key)
+    if cached is not None and _same(cached[0], inputs):
+        return cached[1]
+    result = build()
+    st.session_state[state_key] = (inputs, result)
+    return result
+
+
+def _same(a, b):
+    # 値（文字列・数値・日付・タプル）は等しいかどうか、データのオブジェクトは同一かどうかで比べる
+    return len(a) == len(b) and all(x is y or (isinstance(x, PLAIN_TYPES) and type(x) is type(y) and x == y)
+                                    for x, y in zip(a, b))
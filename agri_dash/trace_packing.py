@@ -0,0 +1,130 @@
+"""多数の系列を少数のトレースにまとめて描く。
+
+Plotly はトレースの数に比例して描画（と JSON の大きさ）が重くなるため、選択された系列が
+PACK_THRESHOLD を超えたら、系列ごとのトレースの代わりに次のトレースを使う。
+- 棒グラフ: 全系列の棒を1つの go.Bar に入れ、色・不透明度は配列で指定する。
+  積み上げは棒ごとの base（下端）、横並びは棒ごとの offset と width で位置を決める。
+- 折れ線: 全系列を None で区切って1つの go.Scattergl（WebGL）に入れ、点の色を系列ごとに変える。
+系列名はホバーで表示し、系列が少なければデータを持たない凡例だけのトレースを添える。
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+# これより多くの系列を選択したらトレースをまとめる
+PACK_THRESHOLD = 10
+
+# 系列ごとの色（Plotly の既定の色の順）
+PALETTE = px.colors.qualitative.Plotly
+
+
+def should_pack(series_count, threshold=PACK_THRESHOLD):
+    return series_count > threshold
+
+
+def series_colors(names, palette=PALETTE):
+    """系列名 → 色。"""
+    return {name: palette[i % len(palette)] for i, name in enumerate(names)}
+
+
+def color_codes(colors):
+    """点ごとの色を (色の番号の配列, 離散のカラースケールの設定) にする。
+
+    色の文字列を点ごとに並べるより JSON が小さくなる。
+    """
+    palette, codes = np.unique(np.asarray(colors, dtype=object), return_inverse=True)
+    steps = max(len(palette), 1)
+    colorscale = []
+    for i, color in enumerate(palette):
+        colorscale += [[i / steps, color], [(i + 1) / steps, color]]
+    return codes.tolist(), dict(colorscale=colorscale or None, cmin=-0.5, cmax=steps - 0.5, showscale=False)
+
+
+def _flatten(series):
+    """[(名前, x, y, 色, 不透明度)] を点ごとの配列（名前, x, y, 色, 不透明度, 系列番号）にする。"""
+    lengths = [len(x) for _, x, _, _, _ in series]
+    names = [name for (name, *_), length in zip(series, lengths) for _ in range(length)]
+    x = np.concatenate([np.asarray(x) for _, x, _, _, _ in series] or [np.empty(0)])
+    y = np.concatenate([np.asarray(y, dtype='float64') for _, _, y, _, _ in series] or [np.empty(0)])
+    colors = [color for (*_, color, _), length in zip(series, lengths) for _ in range(length)]
+    opacity = np.repeat([1.0 if opacity is None else opacity for *_, opacity in series], lengths)
+    # 全て同じなら配列にしない（JSON を小さくする）
+    if len(opacity) and (opacity == opacity[0]).all():
+        opacity = opacity[0]
+    index = np.repeat(np.arange(len(series)), lengths)
+    return names, x, y, colors, opacity, index
+
+
+def stack_base(x, y, index):
+    """同じ x の棒を系列番号の順に積み上げたときの各棒の下端。"""
+    order = np.lexsort((index, x))
+    heights = y[order]
+    cumulative = np.cumsum(heights) - heights
+    # 各 x の最初の棒までの累積を引いて、x ごとに0から積み上げる
+    starts = np.r_[True, x[order][1:] != x[order][:-1]] if len(order) else np.empty(0, dtype=bool)
+    first = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+    base = np.empty_like(y)
+    base[order] = cumulative - cumulative[first] if len(order) else cumulative
+    return base
+
+
+def packed_bar(series, barmode='stack', bar_fraction=0.8, hover_format=',.0f', **trace_options):
+    """series は [(名前, x, y, 色, 不透明度)]。全ての棒を1つの go.Bar にまとめて返す。
+
+    barmode='stack' なら series の順に下から積み上げ、'group' なら同じ x の中で series の順に横に並べる。
+    レイアウトの barmode は 'overlay' にすること（棒の位置はトレース側で決めている）。
+    """
+    names, x, y, colors, opacity, index = _flatten(series)
+    y = np.nan_to_num(y)
+    if barmode == 'stack':
+        position = dict(base=stack_base(x, y, index))
+    else:
+        steps = np.diff(np.unique(x))
+        span = (steps.min() if len(steps) else 1.0) * bar_fraction
+        width = span / max(len(series), 1)
+        position = dict(width=width, offset=np.round(-span / 2 + index * width, 6))
+    codes, scale = color_codes(colors)
+    return go.Bar(
+        x=x,
+        y=y,
+        marker=dict(color=codes, opacity=opacity, **scale),
+        customdata=names,
+        hovertemplate=f'%{{customdata}}<br>%{{x}}: %{{y:{hover_format}}}<extra></extra>',
+        showlegend=False,
+        **position,
+        **trace_options
+    )
+
+
+def legend_entries(colors, max_entries=PACK_THRESHOLD):
+    """まとめたトレースの凡例の代わりに、データを持たない凡例だけのトレースを返す。
+
+    colors は 系列名 → 色。系列が max_entries を超える場合は凡例を出さない（ホバーで系列名を見る）。
+    """
+    if len(colors) > max_entries:
+        return []
+    return [go.Scatter(x=[None], y=[None], mode='markers', name=name,
+                       marker=dict(color=color, symbol='square', size=10))
+            for name, color in colors.items()]
+
+
+def packed_lines(series, hover_format='.1f', line_color='rgba(120, 120, 120, 0.5)', **trace_options):
+    """series は [(名前, x, y, 色)]。全ての折れ線を None で区切って1つの go.Scattergl にまとめて返す。"""
+    x, y, names, colors = [], [], [], []
+    for name, xs, ys, color in series:
+        x.extend(list(xs) + [None])
+        y.extend(list(ys) + [None])
+        names.extend([name] * len(xs) + [None])
+        colors.extend([color] * len(xs) + [color])
+    codes, scale = color_codes(colors)
+    return go.Scattergl(
+        x=x,
+        y=y,
+        mode='lines+markers',
+        line=dict(color=line_color, width=1),
+        marker=dict(color=codes, size=6, **scale),
+        customdata=names,
+        hovertemplate=f'%{{customdata}}<br>%{{x}}: %{{y:{hover_format}}}<extra></extra>',
+        showlegend=False,
+        **trace_options
+    )
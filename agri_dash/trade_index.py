@@ -0,0 +1,70 @@
+"""(都市名, 品目名, 日付) の順に並べた取引データの索引。
+
+行を (都市, 品目, 日付) でソートした連続配列と、(都市, 品目) ごとの開始・終了位置の表を持つ。
+(都市, 品目, 期間) の切り出しは二分探索だけで済み、結果はコピーを伴わない配列のビューになる。
+"""
+import numpy as np
+import pandas as pd
+
+DATE_COLUMN = '日付'
+CITY_COLUMN = '都市名'
+ITEM_COLUMN = '品目名'
+
+
+def to_datetime64(value):
+    if value is None:
+        return None
+    return pd.Timestamp(value).to_datetime64()
+
+
+class TradeIndex:
+    def __init__(self, df, value_columns=('価格', '数量')):
+        cities = df[CITY_COLUMN].astype('category')
+        items = df[ITEM_COLUMN].astype('category')
+        city_codes = cities.cat.codes.to_numpy().astype(np.int64)
+        item_codes = items.cat.codes.to_numpy().astype(np.int64)
+        dates = df[DATE_COLUMN].to_numpy(dtype='datetime64[ns]')
+
+        order = np.lexsort((dates, item_codes, city_codes))
+        self.dates = dates[order]
+        self.values = {column: df[column].to_numpy()[order] for column in value_columns}
+
+        # (都市, 品目) の組ごとの [開始, 終了) 位置
+        keys = city_codes[order] * len(items.cat.categories) + item_codes[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        stops = np.r_[starts[1:], len(keys)]
+        city_names = cities.cat.categories
+        item_names = items.cat.categories
+        self.offsets = {
+            (city_names[city_codes[order[start]]], item_names[item_codes[order[start]]]): (start, stop)
+            for start, stop in zip(starts, stops)
+        }
+
+        # 画面の選択肢は元データでの出現順に並べる
+        self.cities = list(pd.unique(df[CITY_COLUMN]))
+        self.items = list(pd.unique(df[ITEM_COLUMN]))
+        self.first_date = pd.Timestamp(self.dates.min()) if len(self.dates) else None
+        self.last_date = pd.Timestamp(self.dates.max()) if len(self.dates) else None
+
+    def span(self, city, item, start=None, end=None):
+        """(都市, 品目) のうち start 以上 end 以下の行の位置 [lo, hi) を返す。"""
+        lo, hi = self.offsets.get((city, item), (0, 0))
+        dates = self.dates[lo:hi]
+        if start is not None:
+            lo_offset = np.searchsorted(dates, to_datetime64(start), side='left')
+        else:
+            lo_offset = 0
+        if end is not None:
+            hi_offset = np.searchsorted(dates, to_datetime64(end), side='right')
+        else:
+            hi_offset = len(dates)
+        return lo + lo_offset, lo + hi_offset
+
+    def slice(self, city, item, start=None, end=None):
+        """(都市, 品目, 期間) の行を列名→配列ビューの辞書で返す。"""
+        lo, hi = self.span(city, item, start, end)
+        # DatetimeIndex は配列をコピーせずに包む（Plotly の日付シリアライズを揃えるため）
+        data = {DATE_COLUMN: pd.DatetimeIndex(self.dates[lo:hi])}
+        for column, values in self.values.items():
+            data[column] = values[lo:hi]
+        return data
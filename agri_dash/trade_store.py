@@ -0,0 +1,172 @@
+"""野菜取引データ（2015-2024_rev2.csv）の列指向ストア。
+
+CSV は初回だけ解析し、型付きの列指向ストア（columnar_store）に変換して保存する。
+CSV は末尾に行が追記されていく前提で、取り込み済みの位置（バイト数）と、その直前の
+末尾ブロックのハッシュをマニフェストに記録する。次回は新しく追記された行だけを
+チャンク単位で読み込み、検証と重複除去をしてからパーツとして追記する。
+同じ取引（日付, 都市名, 品目名）の行が複数ある場合は、作り直しでも追記でも CSV で先に現れた行を残す。
+取り込み済みの部分が書き換えられていた場合は全体を作り直す。
+作り直すたびにマニフェストの generation を新しくするので、派生データ（rollups）は
+generation が同じなら先頭から rows 行目までは変わっていないとみなせる。
+"""
+import hashlib
+import io
+import os
+import threading
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from agri_dash.columnar_store import ColumnarStore, file_signature, is_unchanged
+
+# キャッシュの保存先
+DEFAULT_CACHE_DIR = './.cache'
+
+# 列ごとの型
+DATE_COLUMN = '日付'
+CATEGORY_COLUMNS = ['品目名', '都市名']
+FLOAT_COLUMNS = ['価格', '数量']
+
+# 1取引を識別する列
+KEY_COLUMNS = [DATE_COLUMN, '都市名', '品目名']
+
+# 重複した取引のうち残す行（マニフェストに記録し、異なる規則で作られたストアは作り直す）
+KEEP = 'first'
+
+# 取り込み済み部分の書き換えを検出するために比べる末尾ブロックの大きさ
+TAIL_BYTES = 64 * 1024
+
+# CSV を読み込むチャンクの行数
+CHUNK_ROWS = 100_000
+
+# 同じプロセス内で同じストアに同時に追記しないためのロック
+_lock = threading.Lock()
+
+
+def tail_hash(path, offset, length=TAIL_BYTES):
+    """ファイルの offset バイト目の直前 length バイトの SHA-256 を返す。"""
+    start = max(offset - length, 0)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def store_for(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    return ColumnarStore(os.path.join(cache_dir, os.path.basename(csv_path)))
+
+
+def clean_trade_chunk(df):
+    """列を所定の型に変換し、日付・都市・品目・価格が欠けた行を除く。"""
+    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], errors='coerce')
+    for column in FLOAT_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    valid = df[DATE_COLUMN].notna() & df['価格'].notna()
+    for column in CATEGORY_COLUMNS:
+        valid &= df[column].notna()
+    return df[valid]
+
+
+def parse_trade_csv(source, names=None):
+    """CSV をチャンク単位で読み込み、型付きの DataFrame と除外した行数を返す。
+
+    names を渡した場合はヘッダー行のない CSV（追記部分）として読む。
+    """
+    reader = pd.read_csv(source, header=None if names else 'infer', names=names,
+                         dtype={column: str for column in CATEGORY_COLUMNS}, chunksize=CHUNK_ROWS)
+    chunks = []
+    rejected = 0
+    for chunk in reader:
+        cleaned = clean_trade_chunk(chunk)
+        rejected += len(chunk) - len(cleaned)
+        chunks.append(cleaned)
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=names)
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    return df, rejected
+
+
+def _keys(df):
+    """取引のキー（日付, 都市名, 品目名）。カテゴリの違いに影響されないよう値で比べる。"""
+    return pd.MultiIndex.from_arrays([df[DATE_COLUMN]] + [df[column].astype(object) for column in KEY_COLUMNS[1:]])
+
+
+def _existing_keys(store, since):
+    """ストアのうち since 以降の取引のキー。Arrow の表のまま絞り込み、キーの列だけを DataFrame にする。"""
+    table = store.read_table()
+    dates = table[DATE_COLUMN]
+    recent = table.filter(pc.greater_equal(dates, pa.scalar(pd.Timestamp(since), dates.type)))
+    return _keys(recent.select(KEY_COLUMNS).to_pandas())
+
+
+def _rebuild(csv_path, store, signature):
+    df, rejected = parse_trade_csv(csv_path)
+    duplicated = df.duplicated(KEY_COLUMNS, keep=KEEP)
+    df = df[~duplicated].reset_index(drop=True)
+    version = store.replace(df, source=os.path.abspath(csv_path), **signature,
+                            generation=uuid.uuid4().hex, keep=KEEP, columns=list(df.columns),
+                            offset=signature['size'], tail_sha256=tail_hash(csv_path, signature['size']))
+    return {'status': 'rebuilt', 'rows': len(df), 'rejected': rejected,
+            'duplicates': int(duplicated.sum()), 'version': version}
+
+
+def _append_tail(csv_path, store, manifest, signature):
+    offset = manifest['offset']
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(signature['size'] - offset)
+
+    # 書き込み途中の最終行は次回に回す
+    end = data.rfind(b'\n') + 1
+    if end == 0:
+        store.update(**signature)
+        return {'status': 'unchanged', 'rows': 0, 'rejected': 0, 'duplicates': 0, 'version': store.version}
+
+    new_rows, rejected = parse_trade_csv(io.BytesIO(data[:end]), names=manifest['columns'])
+    # 取り込み済みの取引と、追記分の中で2回目以降に現れた取引は除く
+    duplicated = new_rows.duplicated(KEY_COLUMNS, keep=KEEP)
+    if len(new_rows):
+        duplicated |= _keys(new_rows).isin(_existing_keys(store, new_rows[DATE_COLUMN].min()))
+    new_rows = new_rows[~duplicated].reset_index(drop=True)
+
+    meta = dict(signature, offset=offset + end, tail_sha256=tail_hash(csv_path, offset + end))
+    if len(new_rows):
+        version = store.append(new_rows, **meta)
+    else:
+        store.update(**meta)
+        version = store.version
+    return {'status': 'appended', 'rows': len(new_rows), 'rejected': rejected,
+            'duplicates': int(duplicated.sum()), 'version': version}
+
+
+def ingest_trades(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """CSV のうちまだ取り込んでいない行をストアに取り込み、結果の要約を返す。"""
+    with _lock:
+        store = store_for(csv_path, cache_dir)
+        manifest = store.manifest()
+        signature = file_signature(csv_path)
+        summary = {'source': csv_path}
+
+        if manifest is None or 'generation' not in manifest or manifest.get('keep') != KEEP:
+            return {**summary, **_rebuild(csv_path, store, signature)}
+        if is_unchanged(signature, manifest):
+            return {**summary, 'status': 'unchanged', 'rows': 0, 'rejected': 0, 'duplicates': 0,
+                    'version': manifest['version']}
+
+        # 取り込み済みの部分が変わっていなければ、追記された分だけを読む
+        offset = manifest['offset']
+        if signature['size'] < offset or tail_hash(csv_path, offset) != manifest['tail_sha256']:
+            return {**summary, **_rebuild(csv_path, store, signature)}
+        return {**summary, **_append_tail(csv_path, store, manifest, signature)}
+
+
+def sync_trade_store(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """ストアを CSV に追いつかせてから返す。"""
+    ingest_trades(csv_path, cache_dir)
+    return store_for(csv_path, cache_dir)
+
+
+def load_trade_data(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """取引データを読み込む。ストアが新しければ CSV は解析しない。"""
+    return sync_trade_store(csv_path, cache_dir).read()
@@ -0,0 +1,126 @@
+"""基幹的農業従事者数の推計の予測区間（ブートストラップ法）。
+
+回帰モデルは残差ブートストラップで、各系列の残差を復元抽出して当てはめ直し、推計値にも残差を1つ加える。
+コーホート変化率法は、推計の各回の変化率を過去の5年間の変化率から無作為に選ぶ。
+全ての試行・系列を [試行, ..., 西暦] の配列にまとめて計算する。試行は一定数ごとのブロックに分けて
+ブロックごとに乱数の系列を割り当て、ブロックは必要に応じてプロセスプールで分担する。
+結果は都道府県ごとの試行の値として保持し、選択された都道府県の合計の百分位点を予測区間とする。
+試行の乱数は都道府県ごとに独立に引くので、合計の区間は都道府県の間の誤差を独立とみなしたものになる
+（誤差が連動する場合は実際より狭い）。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from agri_dash.cohort import cohort_draws
+from agri_dash.forecast import target_years, weighted_linear_fit
+
+# 既定の試行回数と予測区間（90%）
+DEFAULT_DRAWS = 1000
+DEFAULT_PERCENTILES = (5, 95)
+
+# 乱数の系列を分ける試行の単位（プロセスの数によらず同じ分け方にする）
+DRAW_BLOCK = 100
+
+
+def _resample(rng, residuals, valid, draws, length):
+    """系列ごとに有効な残差から復元抽出する。residuals と valid は [系列, T]、[試行, 系列, length] を返す。"""
+    # 有効な残差を各行の先頭に詰め、行ごとの個数の範囲で位置を選ぶ
+    order = np.argsort(~valid, axis=-1, kind='stable')
+    packed = np.take_along_axis(np.where(valid, residuals, 0.0), order, axis=-1)
+    counts = valid.sum(axis=-1)
+    index = (rng.random((draws, len(residuals), length)) * counts[:, None]).astype(int)
+    picked = np.take_along_axis(np.broadcast_to(packed, (draws,) + packed.shape), index, axis=-1)
+    return np.where(counts[:, None] > 0, picked, 0.0)
+
+
+def _regression_draws(rng, draws, years, values, present, targets, log=False):
+    """残差ブートストラップ。values と present は [..., 系列, 西暦]、[試行, ..., 系列, 推計年] を返す。"""
+    shape = values.shape[:-1]
+    y = values.reshape(-1, values.shape[-1])
+    valid = present.reshape(y.shape)
+    if log:
+        valid = valid & (y > 0)
+        y = np.log(np.where(valid, y, 1.0))
+    weights = valid.astype('float64')
+    x = np.asarray(years, dtype='float64')
+    t = np.asarray(targets, dtype='float64')
+
+    intercept, slope = weighted_linear_fit(x, y, weights)
+    fitted = intercept[:, None] + slope[:, None] * x
+    residuals = y - fitted
+
+    # 当てはめ直した回帰線に、推計年ごとの残差を加える
+    noise = _resample(rng, residuals, valid, draws, len(x) + len(t))
+    boot_intercept, boot_slope = weighted_linear_fit(x, fitted + noise[..., :len(x)], weights)
+    predicted = boot_intercept[..., None] + boot_slope[..., None] * t + noise[..., len(x):]
+    if log:
+        predicted = np.where(valid.any(axis=-1)[:, None], np.exp(predicted), 0.0)
+    else:
+        predicted = np.maximum(predicted, 0.0)
+    return predicted.reshape((draws,) + shape + (len(t),))
+
+
+# 推計モデル名 → 試行を作る関数 (乱数, 試行回数, 西暦, 値, 値の有無, 推計年, パラメータ)
+SIMULATORS = {
+    'linear': _regression_draws,
+    'log_linear': partial(_regression_draws, log=True),
+    'cohort': cohort_draws,
+}
+
+
+def _draw_blocks(model, blocks, years, values, present, targets, params):
+    """プロセスプールで実行する単位。blocks は (乱数の種, 試行回数) の並び。
+
+    ブロックごとに乱数を作って試行し、年齢区分を合計した [試行, 都道府県, 推計年] をつなげて返す。
+    """
+    return np.concatenate([
+        SIMULATORS[model](np.random.default_rng(seed), draws, years, values, present, targets, **params).sum(axis=1)
+        for seed, draws in blocks
+    ], axis=0)
+
+
+def simulate_draws(model, years, values, present, horizon, draws=DEFAULT_DRAWS, workers=None, seed=0, **params):
+    """(推計年, [試行, 都道府県, 推計年]) を返す。
+
+    試行は DRAW_BLOCK 回ごとのブロックに分け、ブロックごとに seed から分けた乱数の系列を使う。
+    workers が2以上ならブロックを workers 組に分けてプロセスプールで並行して計算する。
+    ブロックの分け方は workers によらないので、同じ seed なら workers を変えても同じ結果になる。
+    """
+    targets = target_years(int(np.max(years)), horizon)
+    sizes = [min(DRAW_BLOCK, draws - start) for start in range(0, draws, DRAW_BLOCK)]
+    blocks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    per_worker = -(-len(blocks) // max(1, min(workers or 1, len(blocks))))
+    groups = [blocks[start:start + per_worker] for start in range(0, len(blocks), per_worker)]
+    args = [(model, group, years, values, present, targets, params) for group in groups]
+    if len(groups) == 1:
+        results = [_draw_blocks(*args[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(groups)) as executor:
+            results = list(executor.map(_draw_blocks, *zip(*args)))
+    return targets, np.concatenate(results, axis=0)
+
+
+class ForecastBands:
+    """推計のブートストラップ試行を都道府県ごとに保持し、選択された都道府県の合計の予測区間を返す。"""
+
+    def __init__(self, prefectures, targets, draws):
+        self.prefectures = list(prefectures)
+        self.targets = targets
+        self.draws = draws
+        self._positions = {prefecture: i for i, prefecture in enumerate(self.prefectures)}
+
+    @classmethod
+    def from_cube(cls, cube, model, horizon, by_age=False, draws=DEFAULT_DRAWS, workers=None, seed=0, **params):
+        years, values, present = cube.history(by_age or model == 'cohort')
+        targets, samples = simulate_draws(model, years, values, present, horizon,
+                                          draws=draws, workers=workers, seed=seed, **params)
+        return cls(cube.prefectures, targets, samples)
+
+    def interval(self, prefectures, percentiles=DEFAULT_PERCENTILES):
+        """(推計年, 下限, 上限) を返す。"""
+        index = [self._positions[prefecture] for prefecture in prefectures if prefecture in self._positions]
+        totals = self.draws[:, index].sum(axis=1)
+        lower, upper = np.percentile(totals, percentiles, axis=0)
+        return self.targets, lower, upper
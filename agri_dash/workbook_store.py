@@ -0,0 +1,163 @@
+"""Excel ワークブックを Feather に変換して保持するストア。
+
+convert（python -m agri_dash.convert）で data/ 以下と直下の .xlsx/.xls を一度だけ読み込み、
+シートごとに .cache/workbooks/ の Feather ファイルに書き出す。マニフェストには元ファイルの
+SHA-256・更新時刻・サイズと、シート名・列の型・行数を記録する。
+ダッシュボードは read_excel で Feather だけを読み、元ファイルがマニフェストの記録から変わっている
+（マニフェストが古い）場合や、変換されていない場合だけ Excel を読む。
+
+数値と文字列（「-」など）が混在する列は Arrow の型にできないため、値を JSON の文字列にして保存し、
+読み込み時に元の型（int・float・str）に戻す。pd.read_excel と同じ DataFrame を返す。
+"""
+import glob
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from agri_dash.columnar_store import file_signature, is_unchanged, read_json, write_json
+
+DEFAULT_CACHE_DIR = './.cache'
+STORE_DIRNAME = 'workbooks'
+MANIFEST_NAME = 'manifest.json'
+MIXED = 'mixed'
+
+# 変換の対象（data/ 以下と直下のワークブック）
+SOURCE_PATTERNS = ('./data/**/*.xlsx', './data/**/*.xls', './*.xlsx', './*.xls')
+
+
+def source_files(patterns=SOURCE_PATTERNS):
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(pattern, recursive=True))
+    return sorted(files)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_dir(cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, STORE_DIRNAME)
+
+
+def source_key(path):
+    """マニフェストでの元ファイルのキー（作業ディレクトリからの相対パス）。"""
+    return os.path.relpath(os.path.abspath(path)).replace(os.sep, '/')
+
+
+def read_manifest(cache_dir=DEFAULT_CACHE_DIR):
+    return read_json(os.path.join(store_dir(cache_dir), MANIFEST_NAME)) or {}
+
+
+def _encode(df):
+    """DataFrame を Arrow の表にする。型が混在する列は JSON の文字列にし、(表, 列の型) を返す。"""
+    columns, dtypes = {}, {}
+    for name in df.columns:
+        column = df[name]
+        if column.dtype == object and column.map(type).nunique() > 1:
+            columns[name] = pa.array([json.dumps(value, ensure_ascii=False) for value in column], pa.string())
+            dtypes[name] = MIXED
+        else:
+            columns[name] = pa.Array.from_pandas(column)
+            dtypes[name] = str(column.dtype)
+    return pa.table(columns), dtypes
+
+
+def _decode(table, dtypes):
+    df = table.to_pandas()
+    for name, dtype in dtypes.items():
+        if dtype == MIXED:
+            df[name] = pd.Series([json.loads(value) for value in df[name]], index=df.index, dtype=object)
+    return df
+
+
+def convert_workbook(path, cache_dir=DEFAULT_CACHE_DIR):
+    """ワークブックの全シートを Feather に書き出し、マニフェストの記録を返す。
+
+    途中で失敗した場合は、書き出したシートのファイルを消してから例外を送出する。
+    """
+    directory = store_dir(cache_dir)
+    stem = hashlib.sha1(source_key(path).encode('utf-8')).hexdigest()[:12]
+    workbook = pd.read_excel(path, sheet_name=None)
+    os.makedirs(directory, exist_ok=True)
+    sheets = []
+    tmp_path = None
+    try:
+        for index, (name, df) in enumerate(workbook.items()):
+            table, dtypes = _encode(df)
+            file_name = f'{stem}-{index}.feather'
+            tmp_path = os.path.join(directory, file_name + '.tmp')
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, os.path.join(directory, file_name))
+            sheets.append({'name': name, 'file': file_name, 'dtypes': dtypes, 'rows': len(df)})
+    except BaseException:
+        for file_path in [tmp_path] + [os.path.join(directory, sheet['file']) for sheet in sheets]:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        raise
+    return dict(file_signature(path), sha256=file_hash(path), sheets=sheets)
+
+
+def convert_all(paths=None, cache_dir=DEFAULT_CACHE_DIR, force=False):
+    """ワークブックを変換してマニフェストを更新し、ファイルごとの結果の要約を返す。
+
+    記録と内容（SHA-256）が同じファイルは変換しない（更新時刻だけ変わった場合は記録を更新する）。
+    読み込めないファイル（xlrd が無い .xls など）は status が 'error' の要約にして残りの変換を続け、
+    マニフェストには変換できたファイルだけを記録する（失敗したファイルの以前の記録は消す）。
+    """
+    manifest = read_manifest(cache_dir)
+    summaries = []
+    for path in (source_files() if paths is None else paths):
+        key = source_key(path)
+        try:
+            entry = manifest.get(key)
+            signature = file_signature(path)
+            if not force and entry and (is_unchanged(signature, entry) or entry.get('sha256') == file_hash(path)):
+                entry.update(signature)
+                summaries.append({'source': key, 'status': 'unchanged', 'sheets': len(entry['sheets'])})
+                continue
+            manifest[key] = convert_workbook(path, cache_dir)
+        except Exception as e:
+            manifest.pop(key, None)
+            summaries.append({'source': key, 'status': 'error', 'error': f'{type(e).__name__}: {e}'})
+            continue
+        summaries.append({'source': key, 'status': 'converted', 'sheets': len(manifest[key]['sheets']),
+                          'rows': sum(sheet['rows'] for sheet in manifest[key]['sheets'])})
+    os.makedirs(store_dir(cache_dir), exist_ok=True)
+    write_json(os.path.join(store_dir(cache_dir), MANIFEST_NAME), manifest)
+    return summaries
+
+
+def read_sheet(path, sheet_name=0, cache_dir=DEFAULT_CACHE_DIR):
+    """変換済みのシートを読む。変換されていないか、元ファイルが記録から変わっていれば None。
+
+    sheet_name はシートの番号か名前。
+    """
+    entry = read_manifest(cache_dir).get(source_key(path))
+    if not entry or not os.path.exists(path):
+        return None
+    if not is_unchanged(file_signature(path), entry) and entry.get('sha256') != file_hash(path):
+        return None
+    sheets = entry['sheets']
+    if isinstance(sheet_name, int):
+        sheet = sheets[sheet_name] if sheet_name < len(sheets) else None
+    else:
+        sheet = next((sheet for sheet in sheets if sheet['name'] == sheet_name), None)
+    file_path = sheet and os.path.join(store_dir(cache_dir), sheet['file'])
+    if not file_path or not os.path.exists(file_path):
+        return None
+    return _decode(feather.read_table(file_path), sheet['dtypes'])
+
+
+def read_excel(path, sheet_name=0, cache_dir=DEFAULT_CACHE_DIR):
+    """変換済みなら Feather から、そうでなければ Excel からシートを読む（pd.read_excel と同じ結果）。"""
+    df = read_sheet(path, sheet_name, cache_dir)
+    return df if df is not None else pd.read_excel(path, sheet_name=sheet_name)
@@ -0,0 +1,137 @@
+"""基幹的農業従事者数の集計キューブ。
+
+実測値（年代別）と推定値を、区分（実測値・推定値）× 対象年齢区分 × 都道府県 × 西暦 の
+4次元配列に一度だけ足し込んでおく。地域カテゴリは都道府県の軸のまとまりとして扱う。
+推定値は forecast のモデルで推計したものを with_forecast で入れる（モデルごとに別のキューブになる）。
+画面の選択（地域カテゴリ・都道府県・年齢区分）に対する集計は、この配列の一部を取り出して
+足し合わせるだけで済む。
+値が存在するかどうかは別の真偽値配列で持ち、値のない西暦はグラフに含めない。
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from agri_dash.prefecture_store import (AGE_GROUP_COLUMN, CORE_WORKERS, REGION_COLUMN, TOTAL_AGE_GROUP,
+                                        VALUE_COLUMN, YEAR_COLUMN)
+from agri_dash.regions import NATIONAL, REGION_MAPPING
+
+ACTUAL = '実測値'
+FORECAST = '推定値'
+KINDS = (ACTUAL, FORECAST)
+
+
+class WorkerCube:
+    def __init__(self, prefecture_store, region_mapping=REGION_MAPPING):
+        self.age_groups = prefecture_store.age_groups(CORE_WORKERS)
+        self.prefectures = prefecture_store.prefectures
+        self.region_mapping = region_mapping
+        # 年代別でない推定値も入れられるよう、対象年齢区分の軸には「全体」も含める
+        self._age_axis = self.age_groups + [TOTAL_AGE_GROUP]
+
+        actual = prefecture_store.query(CORE_WORKERS, age_groups=self.age_groups)
+        self.years = np.unique(actual[YEAR_COLUMN].to_numpy())
+
+        shape = (len(KINDS), len(self._age_axis), len(self.prefectures), len(self.years))
+        self.sums = np.zeros(shape)
+        self.present = np.zeros(shape, dtype=bool)
+        self._add(KINDS.index(ACTUAL), actual)
+
+    def _add(self, kind, df):
+        ages = pd.Categorical(df[AGE_GROUP_COLUMN], categories=self._age_axis).codes
+        prefectures = pd.Categorical(df[REGION_COLUMN], categories=self.prefectures).codes
+        years = np.searchsorted(self.years, df[YEAR_COLUMN].to_numpy())
+        # 全国の行は都道府県の合計なので足し込まない
+        keep = (ages >= 0) & (prefectures >= 0)
+        index = (kind, ages[keep], prefectures[keep], years[keep])
+        np.add.at(self.sums, index, np.nan_to_num(df[VALUE_COLUMN].to_numpy()[keep]))
+        self.present[index] = True
+
+    def history(self, by_age=True):
+        """実測値の (西暦, 値, 値の有無) を返す。
+
+        値と値の有無は by_age なら [対象年齢区分, 都道府県, 西暦]、
+        そうでなければ年齢区分を合計した [1, 都道府県, 西暦]。
+        """
+        kind = KINDS.index(ACTUAL)
+        found = self.present[kind].any(axis=(0, 1))
+        ages = slice(0, len(self.age_groups))
+        values = self.sums[kind][ages][..., found]
+        present = self.present[kind][ages][..., found]
+        if not by_age:
+            values = values.sum(axis=0, keepdims=True)
+            present = present.any(axis=0, keepdims=True)
+        return self.years[found], values, present
+
+    def with_forecast(self, years, values):
+        """推定値の区分に推計値を入れたキューブを返す。元のキューブは変更しない。
+
+        values は history の値と同じ形（[対象年齢区分, 都道府県, 推計年] か [1, 都道府県, 推計年]）で、
+        年齢区分を合計した推計値は対象年齢区分「全体」に入れる。推計値は実測値のある系列にだけ入れる。
+        """
+        by_age = len(values) == len(self.age_groups)
+        _, _, history_present = self.history(by_age)
+        has_history = history_present.any(axis=-1)[..., None]
+        ages = slice(0, len(self.age_groups)) if by_age else slice(len(self.age_groups), len(self._age_axis))
+
+        cube = copy.copy(self)
+        cube.years = np.union1d(self.years, years)
+        shape = (len(KINDS), len(self._age_axis), len(self.prefectures), len(cube.years))
+        cube.sums = np.zeros(shape)
+        cube.present = np.zeros(shape, dtype=bool)
+
+        own = np.searchsorted(cube.years, self.years)
+        cube.sums[..., own] = self.sums
+        cube.present[..., own] = self.present
+        targets = np.searchsorted(cube.years, years)
+        forecast = KINDS.index(FORECAST)
+        cube.sums[forecast, ages][..., targets] = np.where(has_history, values, 0.0)
+        cube.present[forecast, ages][..., targets] = has_history
+        return cube
+
+    def prefectures_in(self, region_category):
+        """地域カテゴリに含まれる都道府県（名前順）。全国なら全ての都道府県。"""
+        if region_category == NATIONAL:
+            return sorted(self.prefectures)
+        return sorted(pref for pref in self.prefectures if self.region_mapping.get(pref) == region_category)
+
+    def _positions(self, names, axis):
+        wanted = set(names)
+        return np.array([i for i, name in enumerate(axis) if name in wanted], dtype=np.intp)
+
+    def groups(self, prefectures, by_region_category):
+        """選択された都道府県を、都道府県ごと（または地域カテゴリごと）にまとめた [(名前, 都道府県のリスト)]。
+
+        並びは都道府県の軸の順（北から南）で、地域カテゴリはその中での出現順。
+        """
+        selected = [self.prefectures[i] for i in self._positions(prefectures, self.prefectures)]
+        if not by_region_category:
+            return [(pref, [pref]) for pref in selected]
+        groups = {}
+        for pref in selected:
+            groups.setdefault(self.region_mapping.get(pref), []).append(pref)
+        return list(groups.items())
+
+    def available_age_groups(self, prefectures):
+        """選択された都道府県に実測値がある対象年齢区分。"""
+        present = self.present[KINDS.index(ACTUAL)][:, self._positions(prefectures, self.prefectures)]
+        has_data = present.any(axis=(1, 2))
+        return [group for group, found in zip(self.age_groups, has_data) if found]
+
+    def by_prefecture(self, year, kinds=KINDS):
+        """ある西暦の都道府県ごとの合計（都道府県名を索引とする Series。値のない都道府県は NaN）。"""
+        kind_index = np.array([KINDS.index(kind) for kind in kinds], dtype=np.intp)
+        position = np.flatnonzero(self.years == year)
+        sums = self.sums[kind_index][..., position].sum(axis=(0, 1, 3))
+        present = self.present[kind_index][..., position].any(axis=(0, 1, 3))
+        return pd.Series(np.where(present, sums, np.nan), index=self.prefectures)
+
+    def total(self, prefectures, kinds=KINDS, age_groups=None):
+        """都道府県・区分・対象年齢区分を絞り込んで西暦ごとに合計し、(西暦, 合計) の配列を返す。"""
+        kind_index = np.array([KINDS.index(kind) for kind in kinds], dtype=np.intp)
+        age_index = (self._positions(age_groups, self._age_axis) if age_groups is not None
+                     else np.arange(len(self._age_axis)))
+        pref_index = self._positions(prefectures, self.prefectures)
+        block = np.ix_(kind_index, age_index, pref_index, np.arange(len(self.years)))
+        found = self.present[block].any(axis=(0, 1, 2))
+        return self.years[found], self.sums[block].sum(axis=(0, 1, 2))[found]
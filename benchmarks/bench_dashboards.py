@@ -0,0 +1,362 @@
+"""各ダッシュボードの処理（読み込み・絞り込み・集計・グラフの組み立てと JSON への変換）のベンチマーク。
+
+Streamlit を起動せずに、各ダッシュボードと同じ処理を代表的な画面の状態（シナリオ）で実行し、
+段階ごとの時間（繰り返しの中央値）と tracemalloc で測ったメモリのピーク（段階の開始時からの増分）を表示する。
+グラフはダッシュボードと同じ agri_dash.charts の関数で組み立てる。
+段階は load（ストア・ワークブックの読み込みと索引の作成）、aggregate（集計・推計・相関の計算）、
+filter（画面の選択での切り出し）、figure（go.Figure の組み立て。野菜取引データでは系列の切り出しと間引きを含む）、
+json（Plotly の JSON への変換）で、シナリオによってはない段階もある。
+Arrow が確保するメモリ（Feather の読み込み）は tracemalloc では測れない。
+
+野菜取引データのシナリオは、2015-2024_rev2.csv の取引を都市を増やして --scale 倍にした合成データでも測る
+（増やした都市は「仙台2」のように番号を付け、価格と数量に乱数で揺らぎを加える）。
+
+--save-baseline で結果を基準として保存し、--baseline で基準と比べる。時間かメモリが基準より
+--tolerance の割合を超えて増えた段階や、基準にない段階があれば一覧を表示し、終了コード 1 で終わる。
+基準のファイルがないか読み込めない場合は、測る前にエラーで終わる。
+
+    python benchmarks/bench_dashboards.py [--scale 1 --scale 10] [--scenario veg_items] [--repeat 5]
+                                          [--save-baseline [PATH]] [--baseline [PATH]] [--tolerance 0.3]
+"""
+import argparse
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agri_dash import market_store, trade_store  # noqa: E402
+from agri_dash.charts import prefectures, rice, vegetables, workers  # noqa: E402
+from agri_dash.columnar_store import ColumnarStore, read_json, write_json  # noqa: E402
+from agri_dash.correlation import CorrelationEngine  # noqa: E402
+from agri_dash.forecast import DEFAULT_HORIZON, run_forecast  # noqa: E402
+from agri_dash.macro_panel import FX_COLUMN, MacroPanel  # noqa: E402
+from agri_dash.prefecture_map import load_geometry, map_figure  # noqa: E402
+from agri_dash.prefecture_store import CORE_WORKERS, PrefectureStore  # noqa: E402
+from agri_dash.rice_workbooks import MAIN, RiceWorkbooks  # noqa: E402
+from agri_dash.rollups import MEAN_COLUMN, VALUE_COLUMNS, compute_rollup  # noqa: E402
+from agri_dash.trade_index import CITY_COLUMN, TradeIndex  # noqa: E402
+from agri_dash.uncertainty import ForecastBands  # noqa: E402
+from agri_dash.worker_cube import ACTUAL, WorkerCube  # noqa: E402
+
+TRADES_PATH = './2015-2024_rev2.csv'
+EXCHANGE_PATH = './USD_JPY 2015-2024.7.csv'
+WTI_PATH = './WTI_2015-2024.7.csv'
+
+DEFAULT_BASELINE = './.cache/bench_dashboards_baseline.json'
+DEFAULT_SCALES = (1, 10)
+DEFAULT_TOLERANCE = 0.3
+
+# これより小さい増分は誤差として劣化とみなさない
+MIN_REGRESSION_MS = 2.0
+MIN_REGRESSION_MIB = 1.0
+
+# 合成データで価格・数量に加える揺らぎ（対数正規分布の標準偏差）
+NOISE = 0.05
+
+
+# ======= 合成データ =======
+def scale_trades(trades, scale, seed=0):
+    """都市を scale 倍に増やした取引データを返す。scale が1なら元のデータのまま。"""
+    if scale == 1:
+        return trades
+    rng = np.random.default_rng(seed)
+    cities = trades[CITY_COLUMN].astype(str)
+    frames = [trades.assign(**{CITY_COLUMN: cities})]
+    for copy in range(2, scale + 1):
+        frames.append(trades.assign(**{
+            CITY_COLUMN: cities + str(copy),
+            '価格': trades['価格'] * rng.lognormal(0, NOISE, len(trades)),
+            '数量': (trades['数量'] * rng.lognormal(0, NOISE, len(trades))).round(),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    for column in trade_store.CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def trade_fixture(scale, directory):
+    """(倍率を掛けた取引データのストア, 為替のストア, WTI のストア) を用意する。"""
+    trades = trade_store.sync_trade_store(TRADES_PATH).read()
+    store = ColumnarStore(os.path.join(directory, f'trades_x{scale}'))
+    store.replace(scale_trades(trades, scale))
+    return store, market_store.sync_market_store(EXCHANGE_PATH), market_store.sync_market_store(WTI_PATH)
+
+
+# ======= 野菜取引データのダッシュボード =======
+def load_trades(state):
+    state['trades'] = state['store'].read()
+    state['index'] = TradeIndex(state['trades'])
+    state['macro'] = MacroPanel(state['index'].dates, state['exchange'].read(), state['wti'].read())
+
+
+def item_figures(state, index, price_column='価格'):
+    """1都市・全品目・全期間の価格（為替と WTI を重ねる）と数量の図（「野菜ごとの比較」）。"""
+    city = state['index'].cities[0]
+    fig_items, fig_quantity, _ = vegetables.item_figures(index, state['macro'], city, state['index'].items, None, None,
+                                                         price_column=price_column)
+    state['figures'] = [fig_items, fig_quantity]
+
+
+def veg_items_stages():
+    """日次、1都市・全品目・全期間、為替と WTI を重ねる（「野菜ごとの比較」の既定の状態）。"""
+    return [('load', load_trades), ('figure', lambda state: item_figures(state, state['index']))]
+
+
+def veg_monthly_stages():
+    """月次の集計表（価格は平均）で「野菜ごとの比較」を表示する。集計は取引データが作り直されたときの全体の集計。"""
+    def rollup(state):
+        state['series_index'] = TradeIndex(compute_rollup(state['trades'], 'monthly'), value_columns=VALUE_COLUMNS)
+
+    return [('load', load_trades), ('aggregate', rollup),
+            ('figure', lambda state: item_figures(state, state['series_index'], MEAN_COLUMN))]
+
+
+def veg_cities_stages():
+    """1品目・全都市・全期間（「都市ごとの比較」の既定の状態）。"""
+    def figures(state):
+        index = state['index']
+        state['figures'] = list(vegetables.city_figures(index, index.items[0], index.cities, None, None)[:2])
+
+    return [('load', load_trades), ('figure', figures)]
+
+
+def veg_correlation_stages():
+    """為替との相関（全都市×全品目のヒートマップと、1都市3品目のローリング・時差相関）。"""
+    def load(state):
+        load_trades(state)
+        state['engine'] = CorrelationEngine(state['index'], state['macro'])
+
+    def aggregate(state):
+        engine = state['engine']
+        state['cross'] = engine.cross('pearson', 20)[FX_COLUMN]
+        state['rolling'] = engine.rolling('pearson', 60)[FX_COLUMN]
+
+    def figures(state):
+        index, engine = state['index'], state['engine']
+        fig_heatmap = vegetables.correlation_heatmap(engine, index.cities, index.items, state['cross'], 20, FX_COLUMN)
+        fig_rolling, fig_cross = vegetables.correlation_figures(engine, index.cities[0], index.items[:3],
+                                                                state['rolling'], state['cross'], FX_COLUMN, 60, 20)
+        state['figures'] = [fig_heatmap, fig_rolling, fig_cross]
+
+    return [('load', load), ('aggregate', aggregate), ('figure', figures)]
+
+
+# ======= 都道府県別のダッシュボード =======
+def load_prefectures(state):
+    state['prefecture_store'] = PrefectureStore.from_excel()
+    state['cube'] = WorkerCube(state['prefecture_store'])
+
+
+def farm_forecast_stages(model='linear', by_age=False):
+    """全国・全都道府県の実測値と推定値（90%予測区間つき）。"""
+    def aggregate(state):
+        cube = state['cube']
+        years, values = run_forecast(model, *cube.history(by_age), horizon=DEFAULT_HORIZON)
+        state['forecast'] = cube.with_forecast(years, values)
+        state['bands'] = ForecastBands.from_cube(cube, model, DEFAULT_HORIZON, by_age)
+
+    def filter_interval(state):
+        state['prefectures'] = state['cube'].prefectures_in('全国')
+        state['interval'] = state['bands'].interval(state['prefectures'])
+
+    def figure(state):
+        state['figures'] = [workers.actual_and_forecast(state['forecast'], state['prefectures'], True,
+                                                        state['interval'])]
+
+    return [('load', load_prefectures), ('aggregate', aggregate), ('filter', filter_interval), ('figure', figure)]
+
+
+def farm_map_stages():
+    """全都道府県の基幹的農業従事者数の地図（実測の最終年）。"""
+    def load(state):
+        load_prefectures(state)
+        state['geometry'] = load_geometry()
+
+    def filter_year(state):
+        cube = state['cube']
+        state['values'] = cube.by_prefecture(cube.history()[0][-1], kinds=[ACTUAL])
+
+    def figure(state):
+        state['figures'] = [map_figure(state['values'], CORE_WORKERS, '人数', geometry=state['geometry'],
+                                       value_format=',.0f')]
+
+    return [('load', load), ('filter', filter_year), ('figure', figure)]
+
+
+def prefecture_dash_stages():
+    """全都道府県の平均年齢と基幹的農業従事者数の推移（streamlit_dash.py、系列をまとめて表示）。"""
+    def figure(state):
+        store = state['prefecture_store']
+        state['figures'] = [prefectures.age_and_workers(store, '基幹的農業従事者', store.regions, by_metric=True)]
+
+    return [('load', lambda state: state.update(prefecture_store=PrefectureStore.from_excel())), ('figure', figure)]
+
+
+def rice_stages():
+    """稲作の経営概要（資本金＆粗収益＆所得の図。経営概要のワークブックだけを読む）。"""
+    def load(state):
+        state['workbooks'] = RiceWorkbooks.from_excel()
+        state['workbooks'].workbook(MAIN)
+
+    return [('load', load),
+            ('figure', lambda state: state.update(figures=[rice.capital_income(state['workbooks'])]))]
+
+
+def to_json(state):
+    state['payloads'] = [fig.to_json() for fig in state['figures']]
+
+
+# シナリオ名 → (ダッシュボード, 段階のリストを返す関数, 取引データの倍率を変えて測るか)
+SCENARIOS = {
+    'veg_items': ('vegetable_dash_streamlit.py', veg_items_stages, True),
+    'veg_cities': ('vegetable_dash_streamlit.py', veg_cities_stages, True),
+    'veg_monthly': ('vegetable_dash_streamlit.py', veg_monthly_stages, True),
+    'veg_correlation': ('vegetable_dash_streamlit.py', veg_correlation_stages, True),
+    'farm_forecast': ('基幹的農業従事者_dash.py', farm_forecast_stages, False),
+    'farm_cohort': ('基幹的農業従事者_dash.py', lambda: farm_forecast_stages('cohort', by_age=True), False),
+    'farm_map': ('基幹的農業従事者_dash.py', farm_map_stages, False),
+    'prefectures': ('streamlit_dash.py', prefecture_dash_stages, False),
+    'rice': ('稲作10aあたりの経営概要_dash.py', rice_stages, False),
+}
+
+
+# ======= 計測 =======
+def run_stages(stages, context):
+    """段階を順に1回実行し、段階ごとの時間（ms）を返す。"""
+    state = dict(context)
+    times = {}
+    for stage, run in stages:
+        start = time.perf_counter()
+        run(state)
+        times[stage] = (time.perf_counter() - start) * 1000
+    return times, state
+
+
+def peak_memory(stages, context):
+    """段階を順に1回実行し、段階ごとのメモリのピーク（段階の開始時からの増分、MiB）を返す。"""
+    state = dict(context)
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for stage, run in stages:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            run(state)
+            peaks[stage] = (tracemalloc.get_traced_memory()[1] - current) / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def measure(stages, context, repeat):
+    """{段階: {'ms': 中央値, 'peak_mib': ピーク}} を返す。
+
+    1回目は Plotly の検証クラスの読み込みなど初回だけの処理を含むので、時間の集計から除く。
+    """
+    runs = [run_stages(stages, context)[0] for _ in range(repeat + 1)][1:]
+    peaks = peak_memory(stages, context)
+    return {stage: {'ms': statistics.median(run[stage] for run in runs), 'peak_mib': peaks[stage]}
+            for stage, _ in stages}
+
+
+def regressions(results, baseline, tolerance):
+    """基準より tolerance の割合を超えて遅く（大きく）なった (キー, 項目, 基準, 今回) のリスト。
+
+    基準にないキーは比べない（missing_from で別に調べる）。
+    """
+    found = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for field, floor in (('ms', MIN_REGRESSION_MS), ('peak_mib', MIN_REGRESSION_MIB)):
+            if current[field] > base[field] * (1 + tolerance) and current[field] - base[field] > floor:
+                found.append((key, field, base[field], current[field]))
+    return found
+
+
+def missing_from(results, baseline):
+    """今回の結果のうち基準にないキーのリスト。"""
+    return [key for key in results if key not in baseline]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='各ダッシュボードの処理の段階ごとの時間とメモリを測る')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='測るシナリオ（複数指定可、省略時は全て）')
+    parser.add_argument('--scale', action='append', type=int,
+                        help=f'取引データの倍率（複数指定可、省略時は {" と ".join(map(str, DEFAULT_SCALES))}）')
+    parser.add_argument('--repeat', type=int, default=5, help='時間を測る繰り返し回数')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='結果を基準として保存する')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help='基準と比べ、劣化があれば失敗する')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='劣化とみなす増加の割合')
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    if not os.path.exists(TRADES_PATH):
+        parser.error(f'{TRADES_PATH} がありません')
+    scenarios = args.scenario or list(SCENARIOS)
+    scales = args.scale or list(DEFAULT_SCALES)
+    baseline = {}
+    if args.baseline:
+        saved = read_json(args.baseline)
+        if not isinstance(saved, dict) or not isinstance(saved.get('results'), dict):
+            parser.error(f'基準 {args.baseline} がないか、読み込めません')
+        baseline = saved['results']
+
+    results = {}
+    print(f"{'シナリオ':<16} {'倍率':>4} {'段階':<10} {'時間(ms)':>10} {'ピーク(MiB)':>12} {'基準比':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in scenarios:
+            _, build, scaled = SCENARIOS[name]
+            for scale in (scales if scaled else [1]):
+                context = {}
+                if scaled:
+                    context['store'], context['exchange'], context['wti'] = trade_fixture(scale, directory)
+                stages = build() + [('json', to_json)]
+                for stage, result in measure(stages, context, args.repeat).items():
+                    key = f'{name}@x{scale}/{stage}'
+                    results[key] = result
+                    base = baseline.get(key)
+                    ratio = f"{result['ms'] / base['ms']:>7.2f}x" if base and base['ms'] else ''
+                    print(f"{name:<16} {scale:>4} {stage:<10} {result['ms']:>10.1f} {result['peak_mib']:>12.1f} "
+                          f"{ratio:>8}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        write_json(args.save_baseline, {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': results,
+        })
+        print(f'基準を保存しました: {args.save_baseline}')
+
+    if args.baseline:
+        found = regressions(results, baseline, args.tolerance)
+        missing = missing_from(results, baseline)
+        if found:
+            print(f'\n基準より {args.tolerance:.0%} を超えて劣化した段階があります:')
+            for key, field, base, current in found:
+                unit = 'ms' if field == 'ms' else 'MiB'
+                print(f'  {key} {field}: {base:.1f}{unit} → {current:.1f}{unit}')
+        if missing:
+            print(f'\n基準 {args.baseline} にない段階があります（--save-baseline で基準を保存し直してください）:')
+            for key in missing:
+                print(f'  {key}')
+        if found or missing:
+            sys.exit(1)
+        print(f'基準からの劣化はありません（許容 {args.tolerance:.0%}）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""系列ごとのトレースと、まとめたトレース（agri_dash.trace_packing）の比較。
+
+都道府県別の平均年齢（折れ線）と基幹的農業従事者数（棒）の図を、選択する都道府県の数を変えて組み立て、
+トレース数・JSON の大きさ・組み立てと JSON への変換にかかる時間を表示する。
+ブラウザでの描画時間は測れないため、描画コストの目安としてトレース数と JSON の大きさを見る。
+
+    python benchmarks/bench_trace_packing.py [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agri_dash.prefecture_store import CORE_AVERAGE_AGE, CORE_WORKERS, PrefectureStore  # noqa: E402
+from agri_dash.trace_packing import legend_entries, packed_bar, packed_lines, series_colors  # noqa: E402
+
+
+def per_series_figure(store, prefectures):
+    fig = go.Figure()
+    for prefecture in prefectures:
+        years, average_age = store.series(CORE_AVERAGE_AGE, prefecture)
+        fig.add_trace(go.Scatter(x=years, y=average_age, mode='lines+markers', name=prefecture, yaxis='y1'))
+        years, workers = store.series(CORE_WORKERS, prefecture)
+        fig.add_trace(go.Bar(x=years, y=workers, name=prefecture, yaxis='y2', opacity=0.6))
+    fig.update_layout(yaxis2=dict(overlaying='y', side='right'))
+    return fig
+
+
+def packed_figure(store, prefectures):
+    colors = series_colors(prefectures)
+    fig = go.Figure()
+    fig.add_trace(packed_lines([(p, *store.series(CORE_AVERAGE_AGE, p), colors[p]) for p in prefectures],
+                               yaxis='y1'))
+    fig.add_trace(packed_bar([(p, *store.series(CORE_WORKERS, p), colors[p], 0.6) for p in prefectures],
+                             barmode='group', yaxis='y2'))
+    fig.add_traces(legend_entries(colors))
+    fig.update_layout(yaxis2=dict(overlaying='y', side='right'), barmode='overlay')
+    return fig
+
+
+def measure(build, repeat):
+    """(トレース数, JSON のバイト数, 組み立ての時間 ms, JSON への変換の時間 ms) を返す。"""
+    build_time = serialize_time = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build()
+        built = time.perf_counter()
+        payload = fig.to_json()
+        serialize_time += time.perf_counter() - built
+        build_time += built - start
+    return len(fig.data), len(payload.encode('utf-8')), build_time / repeat * 1000, serialize_time / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='トレースをまとめた場合の図の大きさと組み立て時間を比べる')
+    parser.add_argument('--repeat', type=int, default=20, help='1条件あたりの繰り返し回数')
+    args = parser.parse_args(argv)
+
+    store = PrefectureStore.from_excel()
+    print(f"{'都道府県数':>8} {'方式':<6} {'トレース':>8} {'JSON(KB)':>10} {'組み立て(ms)':>12} {'JSON変換(ms)':>12}")
+    for count in (5, 10, 20, 47):
+        prefectures = store.prefectures[:count]
+        for label, build in (('系列ごと', per_series_figure), ('まとめ', packed_figure)):
+            traces, size, build_ms, serialize_ms = measure(lambda: build(store, prefectures), args.repeat)
+            print(f'{count:>8} {label:<6} {traces:>8} {size / 1024:>10.1f} {build_ms:>12.1f} {serialize_ms:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
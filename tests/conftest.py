@@ -0,0 +1,5 @@
+import os
+import sys
+
+# リポジトリの直下（agri_dash のある場所）から import する
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
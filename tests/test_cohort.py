@@ -0,0 +1,51 @@
+"""コーホート変化率法の推計を、3区分（5歳幅・10歳幅・上限なし）の手計算の例で確かめるテスト。"""
+import numpy as np
+import pytest
+
+from agri_dash import cohort
+
+YEARS = np.array([2010, 2015, 2020])
+# 区分ごと（15~19, 20代, 70歳以上）の人数 [西暦, 区分]
+COUNTS = np.array([[10.0, 30.0, 100.0],
+                   [10.0, 40.0, 100.0],
+                   [12.0, 24.0, 96.0]])
+
+
+@pytest.fixture
+def three_bands(monkeypatch):
+    monkeypatch.setattr(cohort, 'AGE_BANDS', ['15~19', '20代', '70歳以上'])
+    monkeypatch.setattr(cohort, 'SHIFT', cohort.shift_matrix([5, 10, None]))
+    monkeypatch.setattr(cohort, 'YOUNG_BANDS', 1)
+
+
+def forecast(targets, **params):
+    """1つの都道府県の推計 [推計年, 区分]。"""
+    values = COUNTS.T[:, None, :]
+    return cohort.cohort_forecast(YEARS, values, np.ones(values.shape, dtype=bool), targets, **params)[:, 0].T
+
+
+def test_shift_matrix_moves_five_years_of_each_band():
+    # 15~19 は全員が20代へ、20代は上側5歳分が70歳以上（上限なし）へ移り、70歳以上はそのまま残る
+    np.testing.assert_allclose(cohort.shift_matrix([5, 10, None]), [[1.0, 0.0, 0.0],
+                                                                     [1.0, 0.5, 0.0],
+                                                                     [0.0, 0.5, 1.0]])
+
+
+def test_change_ratios_by_hand(three_bands):
+    counts, present = COUNTS[None], np.ones((1,) + COUNTS.shape, dtype=bool)
+    # 2015→2020 の元の人数は [10, 10 + 20, 20 + 100]
+    np.testing.assert_allclose(cohort.change_ratios(counts, present, window=1), [[1.2, 0.8, 0.8]])
+    # 2010→2015 の元の人数 [10, 10 + 15, 15 + 100] も合わせた合計の比
+    np.testing.assert_allclose(cohort.change_ratios(counts, present), [[22 / 20, 64 / 55, 196 / 235]])
+
+
+def test_cohort_forecast_by_hand(three_bands):
+    # 2025年の元の人数は [12, 12 + 12, 12 + 96]、2030年は [14.4, 14.4 + 9.6, 9.6 + 86.4]
+    np.testing.assert_allclose(forecast([2025, 2030], window=1), [[14.4, 19.2, 86.4],
+                                                                  [17.28, 19.2, 76.8]])
+    # 70歳以上の減少分（2割）を半分にすると 108 × 0.9
+    np.testing.assert_allclose(forecast([2025], window=1, elderly_exit=0.5), [[14.4, 19.2, 97.2]])
+    # 新規就農（15~19）を2倍にしても、同じ期の20代には効かない
+    np.testing.assert_allclose(forecast([2025], window=1, young_entry=2.0), [[28.8, 19.2, 86.4]])
+    # 途中の推計年を飛ばしても同じ値を返す
+    np.testing.assert_allclose(forecast([2030], window=1), [[17.28, 19.2, 76.8]])
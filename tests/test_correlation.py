@@ -0,0 +1,41 @@
+"""相関の計算（CorrelationEngine）を pandas の相関と比べるテスト。"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agri_dash.correlation import CorrelationEngine
+from agri_dash.macro_panel import FX_COLUMN, WTI_COLUMN, MacroPanel
+from agri_dash.trade_index import TradeIndex
+
+
+def test_correlation_engine_matches_pandas():
+    rng = np.random.default_rng(0)
+    trade_dates = pd.bdate_range('2023-01-02', periods=200)
+    rows = []
+    for city in ('仙台', '東京'):
+        for item in ('きゅうり', 'トマト'):
+            # 取引のない日を混ぜる
+            dates = trade_dates[rng.random(len(trade_dates)) > 0.1]
+            rows.append(pd.DataFrame({'日付': dates, '都市名': city, '品目名': item,
+                                      '価格': 100 + rng.normal(size=len(dates)).cumsum(), '数量': 1.0}))
+    trades = pd.concat(rows, ignore_index=True)
+    market = {name: pd.DataFrame({'日付': trade_dates, '終値': 50 + rng.normal(size=len(trade_dates)).cumsum()})
+              for name in (FX_COLUMN, WTI_COLUMN)}
+
+    index = TradeIndex(trades)
+    panel = MacroPanel(index.dates, market[FX_COLUMN], market[WTI_COLUMN])
+    engine = CorrelationEngine(index, panel)
+    window, max_lag = 30, 5
+    rolling = engine.rolling('pearson', window, use_returns=False)
+    cross = engine.cross('pearson', max_lag, use_returns=False)
+    assert engine.rolling('pearson', window, use_returns=False) is rolling
+
+    for key in index.offsets:
+        prices = pd.Series(engine.prices[engine.row(*key)], index=trade_dates)
+        for name in (FX_COLUMN, WTI_COLUMN):
+            macro = pd.Series(panel.values[name], index=trade_dates)
+            expected = prices.rolling(window, min_periods=window // 2).corr(macro)
+            np.testing.assert_allclose(rolling[name][engine.row(*key)], expected.to_numpy(), atol=1e-8)
+            for lag in (-max_lag, 0, 3, max_lag):
+                expected = prices.corr(macro.shift(lag))
+                assert cross[name][engine.row(*key), lag + max_lag] == pytest.approx(expected, abs=1e-8)
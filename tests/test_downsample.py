@@ -0,0 +1,37 @@
+"""min/max バケット法による間引きのテスト。"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agri_dash.downsample import downsample, point_budget
+
+
+def test_point_budget_scales_with_width():
+    assert point_budget() == 1400
+    assert point_budget(1000, points_per_pixel=1) == 1000
+
+
+@pytest.mark.parametrize('length, max_points', [(10_000, 1400), (1401, 1400), (5000, 7), (100, 3), (100, 2)])
+def test_downsample_keeps_budget_ends_and_extremes(length, max_points):
+    rng = np.random.default_rng(0)
+    x = pd.date_range('2015-01-01', periods=length, freq='D')
+    y = rng.normal(size=length)
+    # 端以外に際立った山と谷を置く（上限が4点未満なら先頭と末尾だけを残す）
+    y[length // 3], y[2 * length // 3] = 100.0, -100.0
+
+    sampled_x, sampled_y = downsample(x, y, max_points)
+    assert len(sampled_y) <= max_points
+    assert sampled_x[0] == x[0] and sampled_x[-1] == x[-1]
+    assert sampled_y[0] == y[0] and sampled_y[-1] == y[-1]
+    if max_points >= 4:
+        assert 100.0 in sampled_y and -100.0 in sampled_y
+    # 残した点は元の点で、順序も保つ
+    positions = x.get_indexer(sampled_x)
+    assert (np.diff(positions) > 0).all()
+    np.testing.assert_array_equal(y[positions], sampled_y)
+
+
+def test_downsample_returns_short_series_unchanged():
+    x, y = np.arange(5), np.arange(5.0)
+    sampled_x, sampled_y = downsample(x, y, 5)
+    assert sampled_x is x and sampled_y is y
@@ -0,0 +1,67 @@
+"""将来推計（系列をまとめた最小二乗法）のテスト。"""
+import numpy as np
+import pytest
+
+from agri_dash import forecast
+
+YEARS = np.arange(1995, 2021, 5)
+
+
+@pytest.fixture
+def series():
+    """[都道府県, 西暦] の人数と値の有無（欠けた年、観測が1点、観測なし、負に外挿される系列を含む）。"""
+    rng = np.random.default_rng(0)
+    values = np.array([
+        1000 - 20.0 * (YEARS - 1995),
+        rng.uniform(500, 900, len(YEARS)),
+        rng.uniform(100, 200, len(YEARS)),
+        300 - 10.0 * (YEARS - 1995) + rng.normal(0, 5, len(YEARS)),
+        np.full(len(YEARS), 50.0),
+        np.zeros(len(YEARS)),
+    ])
+    present = np.ones(values.shape, dtype=bool)
+    present[1, [1, 4]] = False
+    present[2, 1:] = False
+    present[5] = False
+    return values, present
+
+
+def polyfit_forecast(values, present, targets):
+    """以前の推計と同じく、都道府県ごとに実測のある年だけで直線を当てはめ、負の値を0に丸める。"""
+    predicted = []
+    for row, mask in zip(values, present):
+        if mask.sum() >= 2:
+            slope, intercept = np.polyfit(YEARS[mask], row[mask], 1)
+        else:
+            slope, intercept = 0.0, row[mask].mean() if mask.any() else 0.0
+        predicted.append(np.maximum(intercept + slope * targets, 0.0))
+    return np.array(predicted)
+
+
+def test_linear_forecast_matches_per_prefecture_fit(series):
+    values, present = series
+    targets = forecast.target_years(YEARS[-1], 2050)
+    predicted = forecast.linear_forecast(YEARS, values, present, targets)
+    np.testing.assert_allclose(predicted, polyfit_forecast(values, present, targets), rtol=1e-9, atol=1e-6)
+    # 欠けた年の値は当てはめに使わない
+    changed = values.copy()
+    changed[~present] = 1e6
+    np.testing.assert_allclose(forecast.linear_forecast(YEARS, changed, present, targets), predicted)
+    # 年齢区分の次元があっても系列ごとに当てはめる
+    stacked = forecast.linear_forecast(YEARS, np.stack([values, values]), np.stack([present, present]), targets)
+    np.testing.assert_allclose(stacked, np.stack([predicted, predicted]))
+
+
+@pytest.mark.parametrize('horizon, expected', [
+    (2050, [2025, 2030, 2035, 2040, 2045, 2050]),
+    (2037, [2025, 2030, 2035]),
+    (2025, [2025]),
+])
+def test_run_forecast_places_targets_after_last_year(series, horizon, expected):
+    values, present = series
+    targets, predicted = forecast.run_forecast('linear', YEARS, values, present, horizon)
+    assert targets.tolist() == expected
+    assert predicted.shape == (len(values), len(expected))
+    # 1つ目の系列は 1995年に1000人、5年ごとに100人減る直線なので、2045年で0になり以降も0
+    np.testing.assert_allclose(predicted[0], np.maximum(1000 - 20.0 * (targets - 1995), 0.0))
+    np.testing.assert_allclose(predicted[4], 50.0)
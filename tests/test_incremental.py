@@ -0,0 +1,129 @@
+"""取引データ・為替/原油のストアへの差分の取り込みと、集計表の差分更新のテスト。"""
+import pandas as pd
+import pytest
+
+from agri_dash import market_store, rollups, trade_store
+
+TRADE_HEADER = '日付,都市名,品目名,価格,数量\n'
+
+
+def trade_lines(dates, cities=('仙台', '東京'), items=('きゅうり', 'トマト'), price=100.0):
+    lines = []
+    for i, date in enumerate(dates):
+        for j, city in enumerate(cities):
+            for k, item in enumerate(items):
+                lines.append(f'{date:%Y-%m-%d},{city},{item},{price + i + 10 * j + 20 * k},{1000 + i}\n')
+    return lines
+
+
+def market_lines(dates, start=100.0):
+    # 日付の降順、見出しは BOM 付きで各行の末尾に空の列が5つある
+    return [f'{date.year}/{date.month}/{date.day},{start + i:.2f},,,,,\n'
+            for i, date in enumerate(sorted(dates, reverse=True))]
+
+
+def by_key(rollup):
+    """(都市, 品目, 期間) の値の順に並べた集計表（カテゴリの順序の違いを無視して比べるため）。"""
+    rollup = rollup.astype({column: object for column in (rollups.CITY_COLUMN, rollups.ITEM_COLUMN)})
+    return rollup.sort_values(rollups.KEY_COLUMNS).reset_index(drop=True)
+
+
+def write(path, text, mode='w'):
+    with open(path, mode, encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def trade_csv(tmp_path):
+    path = tmp_path / 'trades.csv'
+    write(path, TRADE_HEADER + ''.join(trade_lines(pd.date_range('2024-01-01', '2024-03-31', freq='B'))))
+    return str(path)
+
+
+def test_trade_append_skips_duplicate_rows(trade_csv, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    assert trade_store.ingest_trades(trade_csv, cache_dir)['status'] == 'rebuilt'
+    before = trade_store.store_for(trade_csv, cache_dir).read()
+
+    # 新しい日付の行に、取り込み済みの行と追記分の中で重複する行を混ぜる
+    new_dates = pd.date_range('2024-04-01', '2024-04-10', freq='B')
+    new_lines = trade_lines(new_dates)
+    write(trade_csv, ''.join(trade_lines(pd.date_range('2024-03-29', '2024-03-29')) + new_lines + new_lines[:3]),
+          mode='a')
+
+    summary = trade_store.ingest_trades(trade_csv, cache_dir)
+    assert summary['status'] == 'appended'
+    assert summary['rows'] == len(new_lines)
+    assert summary['duplicates'] == 4 + 3
+
+    after = trade_store.store_for(trade_csv, cache_dir).read()
+    assert len(after) == len(before) + len(new_lines)
+    assert not after.duplicated(trade_store.KEY_COLUMNS).any()
+    pd.testing.assert_frame_equal(after.iloc[:len(before)].reset_index(drop=True), before,
+                                  check_categorical=False)
+    assert trade_store.ingest_trades(trade_csv, cache_dir)['status'] == 'unchanged'
+
+
+def test_trade_append_matches_rebuild_when_duplicates_conflict(trade_csv, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    trade_store.ingest_trades(trade_csv, cache_dir)
+
+    # 取り込み済みの取引と、追記分の中の取引を、価格を変えてもう一度書き足す
+    new_lines = trade_lines(pd.date_range('2024-04-01', '2024-04-05', freq='B'))
+    write(trade_csv, ''.join(trade_lines(pd.date_range('2024-03-28', '2024-03-29'), price=500.0)
+                             + new_lines + trade_lines(pd.date_range('2024-04-03', '2024-04-03'), price=900.0)),
+          mode='a')
+    assert trade_store.ingest_trades(trade_csv, cache_dir)['status'] == 'appended'
+
+    incremental = trade_store.store_for(trade_csv, cache_dir).read()
+    assert trade_store.ingest_trades(trade_csv, str(tmp_path / 'rebuilt'))['status'] == 'rebuilt'
+    rebuilt = trade_store.store_for(trade_csv, str(tmp_path / 'rebuilt')).read()
+    pd.testing.assert_frame_equal(incremental, rebuilt, check_categorical=False)
+    assert incremental['価格'].max() < 500.0
+
+
+def test_trade_rewrite_rebuilds_store(trade_csv, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    trade_store.ingest_trades(trade_csv, cache_dir)
+    write(trade_csv, TRADE_HEADER + ''.join(trade_lines(pd.date_range('2024-01-01', '2024-01-31', freq='B'),
+                                                        price=200.0)))
+    summary = trade_store.ingest_trades(trade_csv, cache_dir)
+    assert summary['status'] == 'rebuilt'
+    assert trade_store.store_for(trade_csv, cache_dir).read()['価格'].min() == 200.0
+
+
+def test_market_prepend_appends_new_rows(tmp_path):
+    path = tmp_path / 'USD_JPY.csv'
+    cache_dir = str(tmp_path / 'cache')
+    dates = pd.date_range('2024-01-01', '2024-06-28', freq='B')
+    old, new = dates[:-5], dates[-5:]
+    write(path, '﻿日付け,終値,,,,,\n' + ''.join(market_lines(old)))
+    assert market_store.ingest_market(str(path), cache_dir)['status'] == 'rebuilt'
+
+    # 新しい日付の行を先頭に書き足す
+    write(path, '﻿日付け,終値,,,,,\n' + ''.join(market_lines(new, start=200.0) + market_lines(old)))
+    summary = market_store.ingest_market(str(path), cache_dir)
+    assert summary['status'] == 'appended'
+    assert summary['rows'] == len(new)
+
+    stored = market_store.store_for(str(path), cache_dir).read()
+    expected = market_store.read_market_csv(str(path)).sort_values(market_store.DATE_COLUMN).reset_index(drop=True)
+    pd.testing.assert_frame_equal(stored, expected)
+    assert market_store.ingest_market(str(path), cache_dir)['status'] == 'unchanged'
+
+
+@pytest.mark.parametrize('granularity', list(rollups.FREQUENCIES))
+def test_incremental_rollup_matches_full_recompute(trade_csv, tmp_path, granularity):
+    cache_dir = str(tmp_path / 'cache')
+    trade_store.ingest_trades(trade_csv, cache_dir)
+    assert rollups.sync_rollup(trade_csv, granularity, cache_dir)['status'] == 'rebuilt'
+
+    # 集計済みの最後の期間の途中から行を追記し、新しい都市も加える
+    write(trade_csv, ''.join(trade_lines(pd.date_range('2024-04-01', '2024-05-15', freq='B'))
+                             + trade_lines(pd.date_range('2024-05-01', '2024-05-15', freq='B'), cities=('大阪',))),
+          mode='a')
+    trades = trade_store.sync_trade_store(trade_csv, cache_dir).read()
+    assert rollups.sync_rollup(trade_csv, granularity, cache_dir, trades=trades)['status'] == 'updated'
+
+    incremental = rollups.store_for(trade_csv, granularity, cache_dir).read()
+    pd.testing.assert_frame_equal(by_key(incremental), by_key(rollups.compute_rollup(trades, granularity)))
@@ -0,0 +1,30 @@
+"""静的な書き出しで、失敗したダッシュボード・ビューを記録して残りを書き出すことのテスト。"""
+import json
+
+import plotly.graph_objects as go
+
+from agri_dash import page_export
+
+
+def test_export_all_records_failures_and_continues(tmp_path, monkeypatch):
+    def rice_views():
+        return [('成功', lambda: [go.Figure(go.Scatter(x=[1, 2], y=[3, 4]))]),
+                ('失敗', lambda: [1 / 0]),
+                ('図なし', lambda: [])]
+
+    def broken_views():
+        raise FileNotFoundError('no data')
+
+    monkeypatch.setattr(page_export, 'VIEWS', {'rice': rice_views, 'rice_overview': broken_views})
+    entries = list(page_export.export_all(str(tmp_path), ['rice_overview', 'rice']))
+
+    assert [(entry['dashboard'], entry['view'], entry['status']) for entry in entries] == [
+        ('rice_overview', None, 'error'), ('rice', '成功', 'ok'), ('rice', '失敗', 'error'), ('rice', '図なし', 'ok')]
+    assert 'FileNotFoundError' in entries[0]['error']
+    assert 'ZeroDivisionError' in entries[2]['error']
+
+    manifest = json.loads((tmp_path / 'manifest.json').read_text(encoding='utf-8'))
+    assert [entry['view'] for entry in manifest] == ['成功', '図なし']
+    assert json.loads((tmp_path / 'rice' / '01-1.json').read_text(encoding='utf-8'))['data'][0]['y'] == [3, 4]
+    assert (tmp_path / 'rice' / '03.html').exists()
+    assert not (tmp_path / 'rice' / '02.html').exists()
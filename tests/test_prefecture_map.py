@@ -0,0 +1,97 @@
+"""都道府県境界の間引き・キャッシュと、地図の Figure のテスト（小さな合成の GeoJSON を使う）。"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agri_dash import prefecture_map
+
+
+def ring(x, y, radius, points=200):
+    """中心 (x, y)、半径 radius の円を points 個の点で近似した閉じた輪。"""
+    angles = np.linspace(0, 2 * np.pi, points)
+    coordinates = np.c_[x + radius * np.cos(angles), y + radius * np.sin(angles)].tolist()
+    coordinates[-1] = coordinates[0]
+    return coordinates
+
+
+def feature(properties, geometry_type, coordinates):
+    return {'type': 'Feature', 'properties': properties,
+            'geometry': {'type': geometry_type, 'coordinates': coordinates}}
+
+
+@pytest.fixture
+def geojson():
+    return {'type': 'FeatureCollection', 'features': [
+        feature({'nam_ja': '東京都'}, 'Polygon', [ring(139.7, 35.7, 0.3)]),
+        # 本島と、間引くと点が足りなくなる小さな島
+        feature({'name_ja': '北海道'}, 'MultiPolygon', [[ring(142.8, 43.4, 1.5)], [ring(141.0, 45.2, 0.001, 8)]]),
+        feature({'name': 'Unknown'}, 'Polygon', [ring(0.0, 0.0, 1.0)]),
+        feature({'nam_ja': '沖縄県'}, 'Point', [127.7, 26.2]),
+    ]}
+
+
+@pytest.fixture
+def geojson_path(tmp_path, geojson):
+    path = tmp_path / 'japan_prefectures.geojson'
+    path.write_text(json.dumps(geojson), encoding='utf-8')
+    return str(path)
+
+
+def count_points(feature):
+    return sum(len(r) for polygon in feature['geometry']['coordinates'] for r in polygon)
+
+
+def test_simplify_geojson_keeps_prefectures_and_drops_points(geojson):
+    simplified = prefecture_map.simplify_geojson(geojson)
+    features = {f['id']: f for f in simplified['features']}
+    assert list(features) == ['東京', '北海道']
+    assert all(f['geometry']['type'] == 'MultiPolygon' for f in features.values())
+
+    # 小さな島は捨て、残った輪は閉じたまま点を減らす
+    assert len(features['北海道']['geometry']['coordinates']) == 1
+    for name in ('東京', '北海道'):
+        assert 4 <= count_points(features[name]) < 200
+        for polygon in features[name]['geometry']['coordinates']:
+            for r in polygon:
+                assert r[0] == r[-1]
+
+
+def test_load_geometry_caches_simplified_geojson(geojson_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    assert prefecture_map.load_geometry(str(tmp_path / 'missing.geojson'), cache_dir) is None
+
+    geometry = prefecture_map.load_geometry(geojson_path, cache_dir)
+    assert [f['id'] for f in geometry['features']] == ['東京', '北海道']
+
+    # 元ファイルが変わらなければキャッシュから返す
+    def fail(*args, **kwargs):
+        raise AssertionError('simplify_geojson called again')
+    monkeypatch.setattr(prefecture_map, 'simplify_geojson', fail)
+    assert prefecture_map.load_geometry(geojson_path, cache_dir) == geometry
+    monkeypatch.undo()
+
+    # 元ファイルが変われば間引き直す
+    with open(geojson_path, encoding='utf-8') as f:
+        source = json.load(f)
+    source['features'] = source['features'][:1]
+    with open(geojson_path, 'w', encoding='utf-8') as f:
+        json.dump(source, f)
+    assert [f['id'] for f in prefecture_map.load_geometry(geojson_path, cache_dir)['features']] == ['東京']
+
+
+def test_map_figure_uses_choropleth_with_geometry(geojson_path, tmp_path):
+    geometry = prefecture_map.load_geometry(geojson_path, str(tmp_path / 'cache'))
+    values = pd.Series({'東京': 1200.0, '北海道': 3400.0, '沖縄': np.nan})
+    fig = prefecture_map.map_figure(values, '基幹的農業従事者数', '人数', geometry=geometry)
+    assert len(fig.data) == 1
+    trace = fig.data[0]
+    assert trace.type == 'choropleth'
+    assert list(trace.locations) == ['東京', '北海道']
+    assert list(trace.z) == [1200.0, 3400.0]
+    assert trace.geojson['features'] == geometry['features']
+
+    fig = prefecture_map.map_figure(values, '基幹的農業従事者数', '人数')
+    assert [trace.type for trace in fig.data] == ['scatter']
+    assert list(fig.data[0].text) == ['東京', '北海道']
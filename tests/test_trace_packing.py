@@ -0,0 +1,36 @@
+"""系列をまとめた棒グラフの積み上げ位置のテスト。"""
+import numpy as np
+
+from agri_dash.trace_packing import packed_bar, stack_base
+
+
+def test_stack_base_by_hand():
+    # 系列0: 2020, 2025 / 系列1: 2025, 2020（x が逆順）/ 系列2: 2025 だけ
+    x = np.array([2020, 2025, 2025, 2020, 2025])
+    y = np.array([10.0, 20.0, 5.0, 7.0, 1.0])
+    index = np.array([0, 0, 1, 1, 2])
+    np.testing.assert_array_equal(stack_base(x, y, index), [0.0, 0.0, 20.0, 10.0, 25.0])
+
+
+def test_stack_base_matches_running_totals():
+    rng = np.random.default_rng(0)
+    x = rng.choice(np.arange(1995, 2025, 5), size=200)
+    y = rng.uniform(0, 100, size=200)
+    index = np.sort(rng.integers(0, 15, size=200))
+    # 同じ x で、前の系列の棒と、同じ系列で元の並びが前の棒の高さの合計
+    positions = np.arange(len(x))
+    expected = [y[(x == x[i]) & ((index < index[i]) | ((index == index[i]) & (positions < i)))].sum()
+                for i in range(len(x))]
+    np.testing.assert_allclose(stack_base(x, y, index), expected)
+    assert len(stack_base(np.empty(0), np.empty(0), np.empty(0, dtype=int))) == 0
+
+
+def test_packed_bar_stacks_series_in_order():
+    series = [('東京', [2020, 2025], [3.0, np.nan], 'red', None),
+              ('大阪', [2020, 2025], [4.0, 6.0], 'blue', 0.5)]
+    bar = packed_bar(series)
+    np.testing.assert_array_equal(bar.base, [0.0, 0.0, 3.0, 0.0])
+    # 欠けた値は高さ0の棒にする
+    np.testing.assert_array_equal(bar.y, [3.0, 0.0, 4.0, 6.0])
+    assert list(bar.customdata) == ['東京', '東京', '大阪', '大阪']
+    assert list(bar.marker.opacity) == [1.0, 1.0, 0.5, 0.5]
@@ -0,0 +1,54 @@
+"""(都市名, 品目名, 日付) の索引からの切り出しのテスト。"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from agri_dash.trade_index import DATE_COLUMN, TradeIndex
+
+
+@pytest.fixture
+def trades():
+    # 日付・都市・品目が順不同に並んだ取引
+    dates = pd.date_range('2024-01-01', '2024-01-10')
+    rows = [(date, city, item) for item in ('トマト', 'きゅうり') for city in ('東京', '仙台') for date in dates]
+    df = pd.DataFrame(rows, columns=[DATE_COLUMN, '都市名', '品目名'])
+    df['価格'] = np.arange(len(df), dtype='float64')
+    df['数量'] = 10 * np.arange(len(df))
+    return df.sample(frac=1.0, random_state=0).reset_index(drop=True)
+
+
+def expected(trades, city, item, start=None, end=None):
+    rows = trades[(trades['都市名'] == city) & (trades['品目名'] == item)].sort_values(DATE_COLUMN)
+    if start is not None:
+        rows = rows[rows[DATE_COLUMN] >= pd.Timestamp(start)]
+    if end is not None:
+        rows = rows[rows[DATE_COLUMN] <= pd.Timestamp(end)]
+    return rows
+
+
+@pytest.mark.parametrize('start, end', [
+    (None, None),
+    ('2024-01-03', '2024-01-05'),
+    ('2024-01-03 12:00', None),
+    (None, pd.Timestamp('2024-01-01')),
+    ('2023-12-01', '2023-12-31'),
+])
+def test_slice_matches_filtered_rows(trades, start, end):
+    index = TradeIndex(trades)
+    assert index.cities == list(pd.unique(trades['都市名']))
+    assert (index.first_date, index.last_date) == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-10'))
+    for city in ('東京', '仙台'):
+        for item in ('トマト', 'きゅうり'):
+            rows = expected(trades, city, item, start, end)
+            data = index.slice(city, item, start, end)
+            assert isinstance(data[DATE_COLUMN], pd.DatetimeIndex)
+            assert list(data[DATE_COLUMN]) == list(rows[DATE_COLUMN])
+            np.testing.assert_array_equal(data['価格'], rows['価格'])
+            np.testing.assert_array_equal(data['数量'], rows['数量'])
+
+
+def test_slice_of_unknown_pair_is_empty(trades):
+    index = TradeIndex(trades)
+    assert index.span('大阪', 'トマト') == (0, 0)
+    data = index.slice('東京', 'なす', '2024-01-01', '2024-01-10')
+    assert len(data[DATE_COLUMN]) == 0 and len(data['価格']) == 0
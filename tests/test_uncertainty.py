@@ -0,0 +1,53 @@
+"""予測区間のブートストラップ試行が、乱数の種とプロセス数に対して再現できることのテスト。"""
+import numpy as np
+import pytest
+
+from agri_dash import uncertainty
+from agri_dash.cohort import AGE_BANDS
+
+YEARS = np.arange(1995, 2021, 5)
+# ブロック（DRAW_BLOCK 回）で割り切れない試行回数にする
+DRAWS = 2 * uncertainty.DRAW_BLOCK + 50
+
+
+def history(model):
+    """[年齢区分, 都道府県, 西暦] の人数と値の有無。コーホート変化率法以外は年齢区分を合計した1区分にする。"""
+    rng = np.random.default_rng(1)
+    shape = (len(AGE_BANDS) if model == 'cohort' else 1, 3, len(YEARS))
+    values = rng.uniform(50, 150, shape) * np.linspace(1.0, 0.6, len(YEARS))
+    present = np.ones(shape, dtype=bool)
+    present[..., 1, 2] = False
+    return values, present
+
+
+@pytest.mark.parametrize('model', ['linear', 'log_linear', 'cohort'])
+def test_draws_are_reproducible_for_a_seed(model):
+    values, present = history(model)
+    targets, draws = uncertainty.simulate_draws(model, YEARS, values, present, 2040, draws=DRAWS, seed=7)
+    assert targets.tolist() == [2025, 2030, 2035, 2040]
+    assert draws.shape == (DRAWS, 3, len(targets))
+    np.testing.assert_array_equal(
+        uncertainty.simulate_draws(model, YEARS, values, present, 2040, draws=DRAWS, seed=7)[1], draws)
+    assert not np.array_equal(
+        uncertainty.simulate_draws(model, YEARS, values, present, 2040, draws=DRAWS, seed=8)[1], draws)
+
+
+@pytest.mark.parametrize('model', ['linear', 'cohort'])
+def test_draws_do_not_depend_on_workers(model):
+    values, present = history(model)
+    _, serial = uncertainty.simulate_draws(model, YEARS, values, present, 2040, draws=DRAWS, seed=3)
+    for workers in (1, 2, 3):
+        _, parallel = uncertainty.simulate_draws(model, YEARS, values, present, 2040, draws=DRAWS, workers=workers,
+                                                 seed=3)
+        np.testing.assert_array_equal(parallel, serial)
+
+
+def test_interval_is_percentile_of_selected_totals():
+    values, present = history('linear')
+    targets, draws = uncertainty.simulate_draws('linear', YEARS, values, present, 2040, draws=DRAWS)
+    bands = uncertainty.ForecastBands(['北海道', '青森', '岩手'], targets, draws)
+    years, lower, upper = bands.interval(['北海道', '岩手', '東京'])
+    assert years is targets
+    expected_lower, expected_upper = np.percentile(draws[:, [0, 2]].sum(axis=1), (5, 95), axis=0)
+    np.testing.assert_allclose(lower, expected_lower)
+    np.testing.assert_allclose(upper, expected_upper)
@@ -0,0 +1,45 @@
+"""ワークブックの Feather ストアで、読み込んだ表が pd.read_excel と同じになることのテスト。"""
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from agri_dash import workbook_store
+
+
+def sheet():
+    return pd.DataFrame({
+        '年度': [2019, 2020, 2021, 2022],
+        '金額（円）': [1.5, np.nan, 3.25, 4.0],
+        '区分': ['北海道', '東北', '関東', '近畿'],
+        # 数値と「-」などの文字列が混在する列
+        '面積（a）': [120, 35.5, '-', '…'],
+    })
+
+
+def test_encode_decode_round_trip(tmp_path):
+    df = sheet()
+    table, dtypes = workbook_store._encode(df)
+    assert dtypes == {'年度': 'int64', '金額（円）': 'float64', '区分': 'object', '面積（a）': workbook_store.MIXED}
+
+    # Feather に書いて読み戻しても、混在する列の値と型は元のまま
+    path = str(tmp_path / 'sheet.feather')
+    feather.write_feather(table, path, compression='uncompressed')
+    decoded = workbook_store._decode(feather.read_table(path), dtypes)
+    pd.testing.assert_frame_equal(decoded, df)
+    assert [type(value) for value in decoded['面積（a）']] == [int, float, str, str]
+
+
+def test_read_excel_matches_pandas(tmp_path):
+    path = str(tmp_path / 'book.xlsx')
+    with pd.ExcelWriter(path) as writer:
+        sheet().to_excel(writer, sheet_name='集計', index=False)
+        sheet().head(2).to_excel(writer, sheet_name='抜粋', index=False)
+    cache_dir = str(tmp_path / 'cache')
+    assert workbook_store.read_sheet(path, cache_dir=cache_dir) is None
+
+    summary = workbook_store.convert_all([path], cache_dir)
+    assert [entry['status'] for entry in summary] == ['converted']
+    for sheet_name in (0, '抜粋'):
+        stored = workbook_store.read_sheet(path, sheet_name, cache_dir)
+        pd.testing.assert_frame_equal(stored, pd.read_excel(path, sheet_name=sheet_name))
+    assert workbook_store.read_sheet(path, '存在しない', cache_dir) is None
@@ -1,281 +1,188 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-
-# 野菜取引価格と数量のデータを読み込み
-df = pd.read_csv('./2015-2024_rev2.csv')
-
-# 為替レートデータの読み込み
-exchange_df = pd.read_csv('./USD_JPY 2015-2024.7.csv')
-
-# WTI原油データの読み込み
-wti_df = pd.read_csv('./WTI_2015-2024.7.csv')
-
-# 日付列をdatetime型に変換
-df['日付'] = pd.to_datetime(df['日付'])
-exchange_df['日付け'] = pd.to_datetime(exchange_df['日付け'], format='%Y/%m/%d')
-wti_df['日付'] = pd.to_datetime(wti_df['日付'], format='%Y/%m/%d')
-
-# 必要な列を選択
-exchange_df = exchange_df[['日付け', '終値']]
-wti_df = wti_df[['日付', '終値']]
-
-# 野菜の種類に対応する色を定義
-color_map = {
-    'だいこん': 'lightgray',
-    'にんじん': 'orange',
-    'はくさい': 'limegreen',
-    'キャベツ': 'mediumseagreen',
-    'ほうれんそう': 'forestgreen',
-    'ねぎ': 'cyan',
-    'ブロッコリー': 'darkolivegreen',
-    'レタス': 'springgreen',
-    'きゅうり': 'mediumaquamarine',
-    'なす': 'mediumpurple',
-    'トマト': 'tomato',
-    'ピーマン': 'lightgreen',
-    'ばれいしょ': 'saddlebrown',
-    'さといも': 'slategray',
-    'たまねぎ': 'goldenrod'
-}
+
+from agri_dash import data_access, profiling
+from agri_dash.charts import vegetables as vegetable_charts
+from agri_dash.charts.vegetables import GRANULARITY_LABELS, MACRO_LABELS, PRICE_LABELS
+from agri_dash.downsample import point_budget
+from agri_dash.rollups import bucket_floor
+from agri_dash.selection import Selection, section
+
+# 再実行ごとの段階別の計測（AGRI_DASH_PROFILE を設定したときだけ有効）
+profile = profiling.start('vegetable_dash_streamlit')
+profile.stage('load')
+
+# 野菜取引価格と数量のデータを (都市名, 品目名, 日付) の索引として読み込み
+# （型付きキャッシュが新しければCSVは解析しない）
+trade_index = data_access.load_trade_index('./2015-2024_rev2.csv')
+
+# 為替レートとWTI原油価格を取引日ごとにas-of結合した表を読み込み
+macro_panel = data_access.load_macro_panel('./2015-2024_rev2.csv', './USD_JPY 2015-2024.7.csv',
+                                           './WTI_2015-2024.7.csv')
+
+# グラフ1系列あたりに送る最大点数（グラフの横幅に応じて山と谷を残して間引く）
+max_points = point_budget()
+downsample_note = '※ 点数が多い系列は区間ごとの最大値・最小値に間引いて表示しています。期間を狭めると元の解像度で表示されます。'
+
+profile.stage('widgets')
 
 # タイトル
 st.title("野菜取引データの可視化")
 
-# ======= 野菜ごとの比較 =======
-st.header("野菜ごとの比較")
-
-# 野菜の選択
-selected_items = []
-st.write("品目を選択してください:")
-
-# "すべての品目を選択する" チェックボックス
-all_selected_items = st.checkbox('すべての品目を選択する', key='items')
-
-# 3列のレイアウトを作成
-cols_items = st.columns(3)
-items = df['品目名'].unique()
-
-# チェックボックスを3列に配置
-for i, item in enumerate(items):
-    col = cols_items[i % 3]  # 3列に分割
-    if col.checkbox(item, value=all_selected_items, key=f'item_{item}'):
-        selected_items.append(item)
-
-# 日付範囲を指定
-start_date = st.date_input('開始日', df['日付'].min(), key='start_date')
-end_date = st.date_input('終了日', df['日付'].max(), key='end_date')
-
-# 都市の選択
-selected_city = st.selectbox('都市を選択してください', df['都市名'].unique(), key='selected_city_items')
-
-# 為替レートとWTI原油価格の表示を切り替えるチェックボックス
-show_exchange_rate = st.checkbox('為替レートの表示', value=True, key='show_exchange_rate')
-show_wti = st.checkbox('WTI原油価格の表示', value=True, key='show_wti')
-
-# 野菜価格および数量グラフを作成
-if selected_items:
-    filtered_data_items = df[(df['都市名'] == selected_city) & 
-                             (df['品目名'].isin(selected_items)) & 
-                             (df['日付'] >= pd.to_datetime(start_date)) & 
-                             (df['日付'] <= pd.to_datetime(end_date))]
-
-    fig_items = go.Figure()
-    fig_quantity = go.Figure()
-    
-    for item in selected_items:
-        item_data = filtered_data_items[filtered_data_items['品目名'] == item]
-        
-        # 価格グラフ
-        fig_items.add_trace(go.Scatter(
-            x=item_data['日付'], 
-            y=item_data['価格'], 
-            mode='lines',
-            name=item,
-            hovertemplate=item + ' : %{y:.2f}<extra></extra>',
-            line=dict(color=color_map[item])
-        ))
-
-        # 数量グラフ
-        fig_quantity.add_trace(go.Scatter(
-            x=item_data['日付'], 
-            y=item_data['数量'],  # 数量列に基づいてグラフを作成
-            mode='lines',
-            name=item,
-            hovertemplate=item + ' : %{y:.0f}<extra></extra>',
-            line=dict(color=color_map[item])
-        ))
-
-    # 為替レートを表示
-    if show_exchange_rate:
-        exchange_data_filtered = exchange_df[(exchange_df['日付け'] >= pd.to_datetime(start_date)) & 
-                                             (exchange_df['日付け'] <= pd.to_datetime(end_date))]
-        fig_items.add_trace(go.Scatter(
-            x=exchange_data_filtered['日付け'],
-            y=exchange_data_filtered['終値'],
-            mode='lines',
-            name='為替レート (USD/JPY)',
-            hovertemplate='USD/JPY : %{y:.2f}<extra></extra>',
-            line=dict(color='blue', dash='dash'),
-            yaxis='y2'  # 右側に為替レートのy軸を配置
-        ))
-
-    # WTI原油価格を表示
-    if show_wti:
-        wti_data_filtered = wti_df[(wti_df['日付'] >= pd.to_datetime(start_date)) & 
-                                   (wti_df['日付'] <= pd.to_datetime(end_date))]
-        fig_items.add_trace(go.Scatter(
-            x=wti_data_filtered['日付'],
-            y=wti_data_filtered['終値'],
-            mode='lines',
-            name='WTI原油価格',
-            hovertemplate='WTI : %{y:.2f}<extra></extra>',
-            line=dict(color='black', dash='dot'),
-            yaxis='y3'  # さらに右側にWTI原油価格のy軸を配置
-        ))
-
-    # 価格グラフのレイアウト設定
-    fig_items.update_layout(
-        title=f'{selected_city}の選択された野菜の価格、為替レート、WTI原油価格の推移',
-        xaxis_title='日付',
-        yaxis_title='価格',
-        yaxis2=dict(
-            title='為替レート (USD/JPY)',
-            overlaying='y',  # y軸と重ねて表示
-            side='right',
-            showgrid=show_exchange_rate  
-        ),
-        yaxis3=dict(
-            title='WTI原油価格',
-            overlaying='y',  
-            side='right',
-            position=1.0,  # 右側にWTI原油価格のy軸を配置
-            showgrid=show_wti  
-        ),
-        hovermode='x unified',
-        legend=dict(
-            x=1.2,  
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            font=dict(size=10)
-        ),
-        margin=dict(r=180)
-    )
-
-    # 数量グラフのレイアウト設定
-    fig_quantity.update_layout(
-        title=f'{selected_city}の選択された野菜の取引数量の推移',
-        xaxis_title='日付',
-        yaxis_title='取引数量',
-        hovermode='x unified',
-        legend=dict(
-            x=1.2,  
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            font=dict(size=10)
-        ),
-        margin=dict(r=180)
-    )
-
-    # グラフをStreamlitで表示
-    st.plotly_chart(fig_items)
-    st.plotly_chart(fig_quantity)
+# 表示モードの選択
+analysis_mode = st.sidebar.radio('表示モード', ['推移の比較', '為替・原油との相関分析'], key='analysis_mode')
+
+# ======= 為替・原油との相関分析 =======
+if analysis_mode == '為替・原油との相関分析':
+    st.header("為替・原油との相関分析")
+
+    # 全ての (都市, 品目) の相関をまとめて計算するエンジン（結果はパラメータごとにキャッシュされる）
+    profile.stage('load')
+    correlation_engine = data_access.load_correlation_engine('./2015-2024_rev2.csv', './USD_JPY 2015-2024.7.csv',
+                                                             './WTI_2015-2024.7.csv')
+    profile.stage('widgets')
+    method_labels = {'pearson': 'ピアソン', 'spearman': 'スピアマン'}
+
+    col_macro, col_method, col_value = st.columns(3)
+    macro_name = col_macro.selectbox('比較する指標', list(MACRO_LABELS), format_func=MACRO_LABELS.get, key='corr_macro')
+    method = col_method.selectbox('相関係数', list(method_labels), format_func=method_labels.get, key='corr_method')
+    use_returns = col_value.selectbox('比較する値', ['変化率', '価格水準'], key='corr_value') == '変化率'
+    window = st.slider('ローリング相関の窓幅（取引日）', 20, 250, 60, step=10, key='corr_window')
+    max_lag = st.slider('時差相関の最大時差（取引日）', 0, 60, 20, key='corr_max_lag')
+
+    profile.stage('aggregate')
+    cross = correlation_engine.cross(method, max_lag, use_returns=use_returns)[macro_name]
+    rolling = correlation_engine.rolling(method, window, use_returns=use_returns)[macro_name]
+
+    # 全ての都市×品目の相関（時差0）
+    profile.stage('figure')
+    fig_heatmap = vegetable_charts.correlation_heatmap(correlation_engine, trade_index.cities, trade_index.items, cross,
+                                                       max_lag, macro_name)
+    profile.stage('render')
+    st.plotly_chart(fig_heatmap)
+    profile.stage('widgets')
+
+    # 都市と品目を選んでローリング相関と時差相関を表示
+    corr_city = st.selectbox('都市を選択してください', trade_index.cities, key='corr_city')
+    corr_items = st.multiselect('品目を選択してください', trade_index.items, default=trade_index.items[:3],
+                                key='corr_items')
+
+    if corr_items:
+        profile.stage('figure')
+        fig_rolling, fig_cross = vegetable_charts.correlation_figures(correlation_engine, corr_city, corr_items,
+                                                                      rolling, cross, macro_name, window, max_lag,
+                                                                      max_points)
+        profile.stage('render')
+        st.plotly_chart(fig_rolling)
+        st.plotly_chart(fig_cross)
+        if method == 'spearman':
+            st.caption('※ スピアマン相関は全期間で付けた順位から計算しているため、ローリング相関は近似値です。')
+    else:
+        st.warning("少なくとも1つの品目を選択してください。")
+
+    profile.finish()
+    st.stop()
+
+# 集計単位の選択（週次・月次・年次は事前に集計した表を読むだけで、表示のたびに集計し直さない）
+granularity = st.sidebar.selectbox('集計単位', list(GRANULARITY_LABELS), format_func=GRANULARITY_LABELS.get,
+                                   key='granularity')
+if granularity == 'daily':
+    series_index = trade_index
+    price_column = '価格'
 else:
-    st.warning("少なくとも1つの品目を選択してください。")
+    profile.stage('aggregate')
+    series_index = data_access.load_rollup_index('./2015-2024_rev2.csv', granularity)
+    profile.stage('widgets')
+    price_column = st.sidebar.selectbox('価格の集計方法', list(PRICE_LABELS), format_func=PRICE_LABELS.get,
+                                        key='price_aggregate')
+period_suffix = vegetable_charts.period_suffix(granularity, price_column)
+
+# 日付範囲を指定（両方の比較で共通なのでサイドバーに置く）
+start_date = st.sidebar.date_input('開始日', trade_index.first_date, key='start_date')
+end_date = st.sidebar.date_input('終了日', trade_index.last_date, key='end_date')
+
+# 集計表では開始日を含む期間から表示する
+series_start = start_date if granularity == 'daily' else bucket_floor(start_date, granularity)
+
+# 「野菜ごとの比較」と「都市ごとの比較」はそれぞれフラグメントにし、片方の操作ではその比較だけを再実行する
+# （サイドバーの集計単位・期間を変えたときは全体を再実行する）
+# ======= 野菜ごとの比較 =======
+@st.fragment
+def item_comparison():
+    fragment_profile = profiling.fragment(profile, 'item_comparison')
+    st.header("野菜ごとの比較")
+
+    # 野菜の選択（チェックボックスを3列に配置し、変更は「適用」でまとめて確定する）
+    st.write("品目を選択してください:")
+    items = trade_index.items
+    selected_items = Selection('items', items, widget_prefix='item_').render(columns=3)
+
+    # 都市の選択
+    selected_city = st.selectbox('都市を選択してください', trade_index.cities, key='selected_city_items')
+
+    # 為替レートとWTI原油価格の表示を切り替えるチェックボックス
+    show_exchange_rate = st.checkbox('為替レートの表示', value=True, key='show_exchange_rate')
+    show_wti = st.checkbox('WTI原油価格の表示', value=True, key='show_wti')
+
+    if selected_items:
+        # 選択・期間・表示の切り替えが前回と同じなら、組み立て済みのグラフをそのまま使う
+        fragment_profile.stage('figure')
+        fig_items, fig_quantity, items_downsampled = section(
+            'item_figures',
+            (tuple(selected_items), selected_city, start_date, series_start, end_date, show_exchange_rate, show_wti,
+             price_column, period_suffix, max_points, series_index, macro_panel),
+            lambda: vegetable_charts.item_figures(series_index, macro_panel, selected_city, selected_items, start_date,
+                                                  end_date, series_start, price_column, period_suffix,
+                                                  show_exchange_rate, show_wti, max_points)
+        )
+
+        # グラフをStreamlitで表示
+        fragment_profile.stage('render')
+        st.plotly_chart(fig_items)
+        st.plotly_chart(fig_quantity)
+        if items_downsampled:
+            st.caption(downsample_note)
+    else:
+        st.warning("少なくとも1つの品目を選択してください。")
+    fragment_profile.finish(st)
 
-# ======= 都市ごとの比較 =======
-st.header("都市ごとの比較")
-
-# 野菜の選択（都市ごとの比較用）
-selected_vegetable = st.selectbox('比較する品目を選択してください', items, key='selected_vegetable')
-
-# 都市の選択
-selected_cities = []
-st.write("都市を選択してください:")
-
-# "すべての都市を選択する" チェックボックス
-all_selected_cities = st.checkbox('すべての都市を選択する', key='cities')
-
-# 3列のレイアウトを作成
-cols_cities = st.columns(3)
-cities = df['都市名'].unique()
-
-# チェックボックスを3列に配置
-for i, city in enumerate(cities):
-    col = cols_cities[i % 3]  # 3列に分割
-    if col.checkbox(city, value=all_selected_cities, key=f'city_{city}'):
-        selected_cities.append(city)
-
-# 都市間比較グラフを作成
-if selected_cities:
-    filtered_data_cities = df[(df['都市名'].isin(selected_cities)) & 
-                              (df['品目名'] == selected_vegetable) & 
-                              (df['日付'] >= pd.to_datetime(start_date)) & 
-                              (df['日付'] <= pd.to_datetime(end_date))]
-
-    # 都市ごとの価格グラフ
-    fig_cities_price = go.Figure()
-    
-    for city in selected_cities:
-        city_data = filtered_data_cities[filtered_data_cities['都市名'] == city]
-        fig_cities_price.add_trace(go.Scatter(
-            x=city_data['日付'],
-            y=city_data['価格'],
-            mode='lines',
-            name=city,
-            hovertemplate=city + ' : %{y:.2f}<extra></extra>'
-        ))
-
-    # 都市ごとの取引数量グラフ
-    fig_cities_quantity = go.Figure()
-
-    for city in selected_cities:
-        city_data = filtered_data_cities[filtered_data_cities['都市名'] == city]
-        fig_cities_quantity.add_trace(go.Scatter(
-            x=city_data['日付'],
-            y=city_data['数量'],
-            mode='lines',
-            name=city,
-            hovertemplate=city + ' : %{y:.0f}<extra></extra>'
-        ))
-
-    # 価格グラフのレイアウト設定
-    fig_cities_price.update_layout(
-        title=f'選択された品目「{selected_vegetable}」の都市間価格比較',
-        xaxis_title='日付',
-        yaxis_title='価格',
-        hovermode='x unified',
-        legend=dict(
-            x=1.2,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            font=dict(size=10)
-        ),
-        margin=dict(r=180)
-    )
-
-    # 数量グラフのレイアウト設定
-    fig_cities_quantity.update_layout(
-        title=f'選択された品目「{selected_vegetable}」の都市間取引数量比較',
-        xaxis_title='日付',
-        yaxis_title='取引数量',
-        hovermode='x unified',
-        legend=dict(
-            x=1.2,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            font=dict(size=10)
-        ),
-        margin=dict(r=180)
-    )
-
-    # グラフをStreamlitで表示
-    st.plotly_chart(fig_cities_price)
-    st.plotly_chart(fig_cities_quantity)
-else:
-    st.warning("少なくとも1つの都市を選択してください。")
 
+# ======= 都市ごとの比較 =======
+@st.fragment
+def city_comparison():
+    fragment_profile = profiling.fragment(profile, 'city_comparison')
+    st.header("都市ごとの比較")
+
+    # 野菜の選択（都市ごとの比較用）
+    selected_vegetable = st.selectbox('比較する品目を選択してください', trade_index.items, key='selected_vegetable')
+
+    # 都市の選択（チェックボックスを3列に配置し、変更は「適用」でまとめて確定する）
+    st.write("都市を選択してください:")
+    cities = trade_index.cities
+    selected_cities = Selection('cities', cities, widget_prefix='city_').render(columns=3)
+
+    if selected_cities:
+        # 選択・期間が前回と同じなら、組み立て済みのグラフをそのまま使う
+        fragment_profile.stage('figure')
+        fig_cities_price, fig_cities_quantity, cities_downsampled = section(
+            'city_figures',
+            (tuple(selected_cities), selected_vegetable, series_start, end_date, price_column, period_suffix,
+             max_points, series_index),
+            lambda: vegetable_charts.city_figures(series_index, selected_vegetable, selected_cities, series_start,
+                                                  end_date, price_column, period_suffix, max_points)
+        )
+
+        # グラフをStreamlitで表示
+        fragment_profile.stage('render')
+        st.plotly_chart(fig_cities_price)
+        st.plotly_chart(fig_cities_quantity)
+        if cities_downsampled:
+            st.caption(downsample_note)
+    else:
+        st.warning("少なくとも1つの都市を選択してください。")
+    fragment_profile.finish(st)
+
+
+item_comparison()
+city_comparison()
+
+profile.finish()
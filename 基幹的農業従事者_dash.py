@@ -1,49 +1,31 @@
-import pandas as pd
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 import openpyxl
 
-# データファイルのパス
-data_file_path = './data/都道府県別_基幹的農業従事者数_年代別_1995-2020_5年毎/基幹的農業従事者数_統合データ.xlsx'
-average_age_file_path = './data/都道府県別_基幹的農業従事者の平均年齢_1995-2020_5年毎.xlsx'
-forecast_file_path = './data/推定基幹的農業従事者数_2025-2050.xlsx'
+from agri_dash import data_access, profiling
+from agri_dash.charts import workers as worker_charts
+from agri_dash.cohort import DEFAULT_CONDITIONS
+from agri_dash.forecast import AGE_MODELS, DEFAULT_HORIZON, MODELS, describe
+from agri_dash.prefecture_map import map_figure
+from agri_dash.prefecture_store import CORE_AVERAGE_AGE, CORE_WORKERS
+from agri_dash.regions import REGION_ORDER
+from agri_dash.selection import Selection
+from agri_dash.uncertainty import DEFAULT_DRAWS, DEFAULT_PERCENTILES
+from agri_dash.worker_cube import ACTUAL
 
-# データを読み込み
-df = pd.read_excel(data_file_path)
-average_age_df = pd.read_excel(average_age_file_path)
-forecast_df = pd.read_excel(forecast_file_path)
+# 再実行ごとの段階別の計測（AGRI_DASH_PROFILE を設定したときだけ有効）
+profile = profiling.start('基幹的農業従事者_dash')
+profile.stage('load')
 
-# 数値型に変換（エラー処理込み）
-df['基幹的農業従事者数'] = pd.to_numeric(df['基幹的農業従事者数'], errors='coerce')
-forecast_df['推定基幹的農業従事者数'] = pd.to_numeric(forecast_df['推定基幹的農業従事者数'], errors='coerce')
+# 都道府県別のデータを (地域, 西暦, 対象年齢区分, 指標) の縦持ちの表として読み込む
+prefecture_store = data_access.load_prefecture_store()
 
-# 推定データを結合
-forecast_df.rename(columns={'推定基幹的農業従事者数': '基幹的農業従事者数'}, inplace=True)
-combined_df = pd.concat([df, forecast_df], ignore_index=True)
-
-# 地域カテゴリ定義
-region_mapping = {
-    '北海道': '北海道-東北',
-    '青森': '北海道-東北', '岩手': '北海道-東北', '宮城': '北海道-東北', '秋田': '北海道-東北',
-    '山形': '北海道-東北', '福島': '北海道-東北',
-    '茨城': '関東', '栃木': '関東', '群馬': '関東', '埼玉': '関東', '千葉': '関東',
-    '東京': '関東', '神奈川': '関東',
-    '新潟': '中部', '富山': '中部', '石川': '中部', '福井': '中部', '山梨': '中部',
-    '長野': '中部', '岐阜': '中部', '静岡': '中部', '愛知': '中部',
-    '三重': '近畿', '滋賀': '近畿', '京都': '近畿', '大阪': '近畿', '兵庫': '近畿',
-    '奈良': '近畿', '和歌山': '近畿',
-    '鳥取': '中国', '島根': '中国', '岡山': '中国', '広島': '中国', '山口': '中国',
-    '徳島': '四国', '香川': '四国', '愛媛': '四国', '高知': '四国',
-    '福岡': '九州-沖縄', '佐賀': '九州-沖縄', '長崎': '九州-沖縄', '熊本': '九州-沖縄',
-    '大分': '九州-沖縄', '宮崎': '九州-沖縄', '鹿児島': '九州-沖縄', '沖縄': '九州-沖縄'
-}
-
-# 地域カテゴリ列の追加
-combined_df['地域カテゴリ'] = combined_df['地域'].map(region_mapping)
+# 基幹的農業従事者数を 区分 × 対象年齢区分 × 都道府県 × 西暦 の配列に集計したもの（データが変わるまで使い回す）
+worker_cube = data_access.load_worker_cube()
 
 # 地域カテゴリ順序
-region_order = ['全国', '北海道-東北', '関東', '中部', '近畿', '中国', '四国', '九州-沖縄']
+region_order = REGION_ORDER
+
+profile.stage('widgets')
 
 # Streamlitアプリ
 st.title("基幹的農業従事者数の可視化")
@@ -51,211 +33,160 @@ st.sidebar.header("オプション")
 
 # グラフ選択
 st.sidebar.subheader("表示するグラフを選択してください")
-graph_options = ['基幹的農業従事者数（実測値と推定値）', '基幹的農業従事者数と平均年齢']
+graph_options = ['基幹的農業従事者数（実測値と推定値）', '基幹的農業従事者数と平均年齢', '年齢構成の将来推計（コーホート）',
+                 '都道府県別の地図']
 selected_graph = st.sidebar.radio("グラフタイプを選択", graph_options)
 
 # 地域カテゴリ選択
 st.sidebar.subheader("地域カテゴリを選択してください")
 selected_region_category = st.sidebar.selectbox("地域カテゴリ", options=region_order)
 
-# 地域カテゴリでフィルタリング
-filtered_data = combined_df[combined_df['地域カテゴリ'] == selected_region_category] if selected_region_category != '全国' else combined_df
-
-# 都道府県選択
+# 都道府県選択（地域カテゴリに含まれる都道府県。初めは全て選択し、変更は「適用」でまとめて確定する）
 st.sidebar.subheader("都道府県を選択してください")
-prefectures = sorted(filtered_data['地域'].unique())
-prefectures = [pref for pref in prefectures if pref != '全国']  # 全国を除外
-
-selected_prefectures = []
-all_prefectures = st.sidebar.checkbox("全ての都道府県を選択", value=True)
-
-if all_prefectures:
-    selected_prefectures = prefectures
-else:
-    for prefecture in prefectures:
-        if st.sidebar.checkbox(prefecture, value=False):
-            selected_prefectures.append(prefecture)
+prefectures = worker_cube.prefectures_in(selected_region_category)
+selected_prefectures = Selection(f'prefectures_{selected_region_category}', prefectures,
+                                 default=prefectures).render(st.sidebar, columns=2)
+
+
+def cohort_conditions():
+    """コーホート変化率法の試算条件（スライダー）。変えるたびにその条件で推計し直す。"""
+    st.sidebar.subheader("試算の条件を設定してください")
+    return dict(
+        young_entry=st.sidebar.slider("若年層（15〜39歳）の新規就農の倍率", 0.0, 3.0,
+                                      DEFAULT_CONDITIONS['young_entry'], step=0.1),
+        elderly_exit=st.sidebar.slider("70歳以上の離農の倍率", 0.0, 2.0, DEFAULT_CONDITIONS['elderly_exit'], step=0.1),
+        window=st.sidebar.slider("変化率の算出に使う直近の期間数（5年単位）", 1, 5, DEFAULT_CONDITIONS['window']),
+    )
 
-# 都道府県でフィルタリング
-filtered_data = filtered_data[filtered_data['地域'].isin(selected_prefectures)]
 
 if selected_graph == '基幹的農業従事者数（実測値と推定値）':
-    # 実測値と推定値のデータ分割
-    actual_data = filtered_data[filtered_data['西暦'] <= 2020]
-    forecast_data = filtered_data[filtered_data['西暦'] > 2020]
-
-    # カラーマップ生成
-    if selected_region_category == '全国':
-        group_column = '地域カテゴリ'
-        color_map = px.colors.qualitative.Set2
-    else:
-        group_column = '地域'
-        color_map = px.colors.qualitative.Plotly
-
-    colors = {group: color_map[i % len(color_map)] for i, group in enumerate(filtered_data[group_column].unique())}
-
-    # グラフ作成
-    fig = go.Figure()
-
-    # 合計値計算用
-    total_per_year = filtered_data.groupby('西暦')['基幹的農業従事者数'].sum().reset_index()
-
-    # 実測値を積み上げ
-    for group in filtered_data[group_column].unique():
-        group_data = actual_data[actual_data[group_column] == group]
-        grouped_region = group_data.groupby('西暦')['基幹的農業従事者数'].sum().reset_index()
-        fig.add_trace(go.Bar(
-            x=grouped_region['西暦'],
-            y=grouped_region['基幹的農業従事者数'],
-            name=f"{group}（実測値）",
-            marker_color=colors[group]
-        ))
-
-    # 推定値を積み上げ
-    for group in filtered_data[group_column].unique():
-        group_data = forecast_data[forecast_data[group_column] == group]
-        grouped_region = group_data.groupby('西暦')['基幹的農業従事者数'].sum().reset_index()
-        fig.add_trace(go.Bar(
-            x=grouped_region['西暦'],
-            y=grouped_region['基幹的農業従事者数'],
-            name=f"{group}（推定値）",
-            marker_color=colors[group],
-            marker=dict(opacity=0.6)
-        ))
-
-    # 合計値をテキストで追加
-    fig.add_trace(go.Scatter(
-        x=total_per_year['西暦'],
-        y=total_per_year['基幹的農業従事者数'],
-        mode='text',
-        text=total_per_year['基幹的農業従事者数'].apply(lambda x: f"{x:,.0f}"),  # 合計値の表示
-        textposition='top center',
-        showlegend=False
-    ))
-
-    # レイアウト調整
-    fig.update_layout(
-        title="基幹的農業従事者数（実測値と推定値）",
-        xaxis=dict(title='年', tickmode='linear', dtick=5),
-        yaxis=dict(title='基幹적農業従事者数'),
-        barmode='stack',  # 積み上げ棒グラフ
-        width=1000,
-        height=600,
-        legend=dict(title='凡例')
-    )
+    # 推計モデルの選択（推計はモデル・条件ごとに一度だけ行い、以降は使い回す）
+    st.sidebar.subheader("推計方法を選択してください")
+    forecast_model = st.sidebar.selectbox("推計モデル", list(MODELS), format_func=lambda model: MODELS[model][0])
+    # 年齢区分ごとの人数を使うモデルは、常に都道府県×年齢区分ごとに推計する
+    by_age = (forecast_model in AGE_MODELS
+              or st.sidebar.radio("推計の単位", ['都道府県ごと', '都道府県×年齢区分ごと']) == '都道府県×年齢区分ごと')
+    horizon = st.sidebar.slider("推計の最終年", 2025, 2050, DEFAULT_HORIZON, step=5)
+    forecast_conditions = cohort_conditions() if forecast_model in AGE_MODELS else {}
+    show_interval = st.sidebar.checkbox("90%予測区間を表示", value=True)
+    profile.stage('aggregate')
+    forecast_cube = data_access.load_worker_forecast(forecast_model, horizon, by_age=by_age, **forecast_conditions)
+
+    # 予測区間（ブートストラップの試行は条件ごとに一度だけ計算して使い回す）
+    interval = None
+    if show_interval and selected_prefectures:
+        bands = data_access.load_worker_bands(forecast_model, horizon, by_age=by_age, **forecast_conditions)
+        interval = bands.interval(selected_prefectures)
+
+    # 全国では地域カテゴリごと、それ以外は都道府県ごとにまとめて色分けする
+    profile.stage('figure')
+    fig = worker_charts.actual_and_forecast(forecast_cube, selected_prefectures, selected_region_category == '全国',
+                                            interval)
 
     # グラフ表示
+    profile.stage('render')
     st.plotly_chart(fig)
     
     # 説明文追加
     st.write("推定方法")
-    st.write("・線形回帰を使用")
-    st.write("  ・1995年から2020年のデータを基に、基幹的農業従事者数の直線的な減少傾向をモデル化")
-    st.write("  ・モデルに基づき、2025年から2050年まで5年ごとの数値を推定")
-    st.write("  ・推定値が負になる場合は、0に丸める")
+    actual_years = worker_cube.history()[0]
+    for line in describe(forecast_model, actual_years, forecast_cube.years[forecast_cube.years > actual_years[-1]]):
+        st.write(line)
+    if by_age:
+        st.write("  ・都道府県×年齢区分ごとに推定し、それらを合計して表示")
+    if show_interval:
+        lower, upper = DEFAULT_PERCENTILES
+        st.write(f"  ・網掛けは{upper - lower}%予測区間（ブートストラップ法で{DEFAULT_DRAWS:,}回試行した合計の"
+                 f"{lower}〜{upper}パーセンタイル）")
+        st.write("  ・予測区間は都道府県ごとの推計の誤差を互いに独立とみなして合計しているため、"
+                 "都道府県の間で誤差が連動する場合は実際より狭くなる")
 
 elif selected_graph == '基幹的農業従事者数と平均年齢':
-    # 実測値のみをフィルタリング
-    actual_data = filtered_data[filtered_data['西暦'] <= 2020]
-
-    # 年齢区分選択
-    if '対象年齢区分' in actual_data.columns:
-        age_groups = actual_data['対象年齢区分'].unique()
-        selected_age_groups = []
+    # 年齢区分選択（選択された都道府県に実測値のある区分）
+    if worker_cube.age_groups:
+        age_groups = worker_cube.available_age_groups(selected_prefectures)
 
+        # 初めは全て選択し、変更は「適用」でまとめて確定する
         st.sidebar.subheader("対象年齢区分を選択してください")
-        all_age_groups = st.sidebar.checkbox("全ての年齢区分を選択", value=True)
-
-        if all_age_groups:
-            selected_age_groups = list(age_groups)
-        else:
-            for age_group in age_groups:
-                if st.sidebar.checkbox(age_group, value=False):
-                    selected_age_groups.append(age_group)
+        selected_age_groups = Selection('age_groups', age_groups, default=age_groups).render(st.sidebar, columns=2)
 
         # 年齢区分でフィルタリング
-        if selected_age_groups:
-            actual_data = actual_data[actual_data['対象年齢区分'].isin(selected_age_groups)]
-
-        # 各年齢区分の合計値を計算
-        grouped_data = actual_data.groupby(['西暦', '対象年齢区分'])['基幹的農業従事者数'].sum().reset_index()
-
-        # 各年の合計値を計算
-        total_per_year = actual_data.groupby('西暦')['基幹的農業従事者数'].sum().reset_index()
-
-        # グラフ作成
-        fig = go.Figure()
-
-        # 棒グラフ追加（年齢区分ごとの人数をラベルとして表示）
-        for age_group in grouped_data['対象年齢区分'].unique():
-            age_group_data = grouped_data[grouped_data['対象年齢区分'] == age_group]
-            fig.add_trace(go.Bar(
-                x=age_group_data['西暦'],
-                y=age_group_data['基幹的農業従事者数'],
-                name=age_group,
-                text=age_group_data['基幹的農業従事者数'],  # ラベルに人数を表示
-                texttemplate='%{text:.0f}',  # 横表示
-                textposition='inside'
-            ))
-
-        # 合計値をテキストで表示（棒グラフの上部）
-        fig.add_trace(go.Scatter(
-            x=total_per_year['西暦'],
-            y=total_per_year['基幹的農業従事者数'],
-            mode='text',
-            text=total_per_year['基幹的農業従事者数'].apply(lambda x: f"{x:,.0f}"),  # 合計値の表示
-            textposition='top center',
-            showlegend=False  # 凡例に表示しない
-        ))
-
-        # 平均年齢の折れ線グラフを追加（条件付き）
-        line_data = None
-        line_label = None
-
-        if len(selected_prefectures) == 1:  # 単一都道府県が選択された場合
-            selected_prefecture = selected_prefectures[0]
-            line_data = average_age_df[average_age_df['地域'] == selected_prefecture]
-            line_label = f"{selected_prefecture} 平均年齢"
-        elif selected_region_category == '全国' and selected_prefectures:  # 全国が選択され、都道府県も選択されている場合
-            line_data = average_age_df[average_age_df['地域'] == '全国']
-            line_label = "全国 平均年齢"
-
-        # 折れ線グラフを追加
-        if line_data is not None and not line_data.empty:
-            fig.add_trace(go.Scatter(
-                x=line_data['西暦'],
-                y=line_data['基幹的農業従事者の平均年齢'],
-                mode='lines+markers',
-                name=line_label,
-                yaxis="y2",
-                line=dict(color='red', width=2),
-                marker=dict(size=8)
-            ))
+        if not selected_age_groups:
+            selected_age_groups = list(age_groups)
 
-        # レイアウト調整（凡例を右側に移動）
-        fig.update_layout(
-            title="基幹的農業従事者数と平均年齢",
-            xaxis=dict(title='年', tickmode='linear', dtick=5),
-            yaxis=dict(title='基幹的農業従事者数'),
-            yaxis2=dict(
-                title='平均年齢',
-                overlaying='y',
-                side='right'
-            ),
-            barmode='stack',
-            width=1000,
-            height=600,
-            legend=dict(
-                x=1.12,  # グラフの右側にずらす
-                y=1,  # 上端に配置
-                bordercolor="Black",
-                borderwidth=1
-            )
-        )
+        # グラフ作成（1つの都道府県か全国を選んだときは平均年齢の折れ線を重ねる）
+        profile.stage('figure')
+        fig = worker_charts.workers_and_average_age(worker_cube, prefecture_store, selected_prefectures,
+                                                    selected_age_groups, selected_region_category)
 
         # グラフ表示
+        profile.stage('render')
         st.plotly_chart(fig)
     else:
         st.write("対象年齢区分のデータが存在しません。")
+
+elif selected_graph == '年齢構成の将来推計（コーホート）':
+    # 条件を変えるとその場で全都道府県×年齢区分を推計し直す（1回の推計は1ミリ秒未満）
+    horizon = st.sidebar.slider("推計の最終年", 2025, 2050, DEFAULT_HORIZON, step=5)
+    conditions = cohort_conditions()
+    profile.stage('aggregate')
+    cohort_cube = data_access.load_worker_forecast('cohort', horizon, by_age=True, **conditions)
+
+    if worker_cube.age_groups:
+        # グラフ作成（年齢区分ごとの色は実測値と推定値で揃える）
+        profile.stage('figure')
+        fig = worker_charts.cohort(cohort_cube, selected_prefectures)
+        profile.stage('render')
+        st.plotly_chart(fig)
+
+        # 説明文追加
+        st.write("推定方法")
+        actual_years = worker_cube.history()[0]
+        for line in describe('cohort', actual_years, cohort_cube.years[cohort_cube.years > actual_years[-1]]):
+            st.write(line)
+    else:
+        st.write("対象年齢区分のデータが存在しません。")
+
+elif selected_graph == '都道府県別の地図':
+    # 選択された都道府県の値を1つのトレースで塗り分ける
+    st.sidebar.subheader("地図に表示する指標を選択してください")
+    map_metrics = [CORE_WORKERS, CORE_AVERAGE_AGE, '推計減少率']
+    map_metric = st.sidebar.radio("指標", map_metrics)
+    actual_years = worker_cube.history()[0]
+
+    if map_metric == '推計減少率':
+        # 実測の最終年から推計年までの減少率（%）
+        forecast_model = st.sidebar.selectbox("推計モデル", list(MODELS), format_func=lambda model: MODELS[model][0])
+        forecast_conditions = cohort_conditions() if forecast_model in AGE_MODELS else {}
+        profile.stage('aggregate')
+        forecast_cube = data_access.load_worker_forecast(forecast_model, DEFAULT_HORIZON,
+                                                         by_age=forecast_model in AGE_MODELS, **forecast_conditions)
+        map_years = [int(year) for year in forecast_cube.years if year > actual_years[-1]]
+        map_year = st.sidebar.select_slider("西暦", options=map_years, value=map_years[-1])
+        profile.stage('filter')
+        values = worker_charts.decline_rate(worker_cube, forecast_cube, map_year)
+        title = f"基幹的農業従事者数の推計減少率（{int(actual_years[-1])}年→{map_year}年、{MODELS[forecast_model][0]}）"
+        colorbar_title, value_format = '減少率（%）', '.1f'
+    elif map_metric == CORE_AVERAGE_AGE:
+        map_years = prefecture_store.metric_years(CORE_AVERAGE_AGE)
+        map_year = st.sidebar.select_slider("西暦", options=map_years, value=map_years[-1])
+        values = prefecture_store.snapshot(CORE_AVERAGE_AGE, map_year)
+        title = f"{CORE_AVERAGE_AGE}（{map_year}年）"
+        colorbar_title, value_format = '平均年齢（歳）', '.1f'
+    else:
+        map_years = [int(year) for year in actual_years]
+        map_year = st.sidebar.select_slider("西暦", options=map_years, value=map_years[-1])
+        values = worker_cube.by_prefecture(map_year, kinds=[ACTUAL])
+        title = f"{CORE_WORKERS}（{map_year}年）"
+        colorbar_title, value_format = '人数', ',.0f'
+
+    profile.stage('figure')
+    values = values[values.index.isin(selected_prefectures)]
+    fig = map_figure(values, title, colorbar_title, geometry=data_access.load_prefecture_geometry(),
+                     value_format=value_format)
+    profile.stage('render')
+    st.plotly_chart(fig)
 else:
     st.write("対象年齢区分のデータが存在しません。")
+
+profile.finish()